@@ -0,0 +1,42 @@
+import os
+import random
+
+SYLLABLES = ["ka", "lo", "mi", "ren", "tor", "vas", "qui", "zel", "dra", "pho", "nix", "bel", "sut", "gam", "ory", "lex"]
+RELATIONS = ["was founded by", "is located in", "depends on", "was replaced by", "is measured in", "is maintained by", "was invented in", "competes with"]
+FILLER = [
+    "Several reports discuss this in more depth.", "The details are summarised in the appendix.",
+    "Observers have noted the implications for related systems.", "This has been stable for many years.",
+    "Further analysis is ongoing.", "The topic is frequently revisited in internal reviews.",
+]
+
+def _word(rng: random.Random, syllables: int = 3) -> str:
+    return "".join(rng.choice(SYLLABLES) for _ in range(syllables))
+
+def generate_corpus(output_dir: str, documents: int = 200, facts_per_document: int = 12, seed: int = 0) -> list[dict]:
+    """
+    Writes `documents` synthetic text files made of invented entities and facts, and returns
+    the facts as {"entity", "relation", "value", "source"} so queries with a known answer
+    document can be generated from them.
+    """
+    rng = random.Random(seed)
+    os.makedirs(output_dir, exist_ok=True)
+    facts = []
+    for d in range(documents):
+        entity = _word(rng).capitalize()
+        path = os.path.join(output_dir, f"doc_{d:05d}.txt")
+        sentences = [f"{entity} is the subject of this document."]
+        for _ in range(facts_per_document):
+            relation, value = rng.choice(RELATIONS), _word(rng).capitalize()
+            sentences.append(f"{entity} {relation} {value}. {rng.choice(FILLER)}")
+            facts.append({"entity": entity, "relation": relation, "value": value, "source": path})
+        with open(path, "w") as f:
+            f.write("\n\n".join(" ".join(sentences[i:i + 3]) for i in range(0, len(sentences), 3)))
+    return facts
+
+def generate_queries(facts: list[dict], count: int, seed: int = 0) -> list[dict]:
+    """Samples {"query", "source"} pairs; `source` is the document that holds the answer."""
+    rng = random.Random(seed + 1)
+    return [
+        {"query": f"What does the knowledge base say {fact['entity']} {fact['relation']}?", "source": fact["source"]}
+        for fact in rng.sample(facts, min(count, len(facts)))
+    ]
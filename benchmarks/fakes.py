@@ -0,0 +1,313 @@
+import re
+import json
+import time
+import zlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, quote, urlsplit
+import numpy as np
+from langchain_core.messages import AIMessage, AIMessageChunk
+
+def _between(text: str, start: str, end: str) -> str:
+    match = re.search(re.escape(start) + r"\s*(.*?)\s*" + re.escape(end), text, re.S)
+    return match.group(1).strip() if match else ""
+
+class FakeLLM:
+    """
+    Deterministic chat-model stand-in. It recognises each HyDRA agent prompt and answers
+    in the format that agent expects, after a fixed call latency plus a per-output-token delay.
+    """
+    def __init__(self, latency_ms: float = 50.0, token_latency_ms: float = 1.0, web_task_every: int = 4):
+        self.latency = latency_ms / 1000
+        self.token_latency = token_latency_ms / 1000
+        self.web_task_every = web_task_every
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _respond(self, prompt: str) -> str:
+        if "master strategist" in prompt:
+            query = _between(prompt, "User Query:", "JSON Plan:")
+            plan = [{"task": query, "depends_on": []}, {"task": f"Key facts: {query}", "depends_on": []}]
+            if self.web_task_every and zlib.crc32(query.encode("utf-8")) % self.web_task_every == 0:
+                plan.append({"task": f"Search the web for recent news: {query}", "depends_on": []})
+            return json.dumps(plan)
+        if "Adaptive Coordinator" in prompt:
+            sub_task = _between(prompt, "**Sub-Task to Delegate:**", "Best Executor:")
+            return "DeepSearchAgent" if "search the web" in sub_task.lower() else "AdvancedVectorSearchAgent"
+        if "retrieval strategist" in prompt:
+            query = _between(prompt, "Query:", "Strategy:")
+            return "hyde" if len(query.split()) > 8 else "direct"
+        if "Hypothetical Answer Paragraph" in prompt:
+            query = _between(prompt, "Query:", "Hypothetical Answer Paragraph:")
+            return f"{query} The {query} is described in detail in the knowledge base. " * 2
+        if "Synthesis Agent" in prompt:
+            query = _between(prompt, "**Original User Query:**", "Final Answer:")
+            context = _between(prompt, "**Aggregated Context from Sub-Tasks:**", "**Original User Query:**")
+            return f"Based on the retrieved context, here is the answer to '{query}'. " + " ".join(context.split()[:120])
+        if "user behavior analyst" in prompt:
+            return "[]"
+        return "OK"
+
+    def _message(self, prompt) -> AIMessage:
+        text = str(prompt)
+        content = self._respond(text)
+        with self._lock:
+            self.calls += 1
+        usage = {"input_tokens": len(text.split()), "output_tokens": len(content.split()), "total_tokens": len(text.split()) + len(content.split())}
+        return AIMessage(content=content, usage_metadata=usage)
+
+    def invoke(self, prompt, *args, **kwargs) -> AIMessage:
+        message = self._message(prompt)
+        time.sleep(self.latency + self.token_latency * message.usage_metadata["output_tokens"])
+        return message
+
+    def batch(self, prompts: list, *args, **kwargs) -> list:
+        # Calls in a batch run concurrently, so the batch takes as long as its slowest call.
+        messages = [self._message(prompt) for prompt in prompts]
+        time.sleep(self.latency + self.token_latency * max((m.usage_metadata["output_tokens"] for m in messages), default=0))
+        return messages
+
+    def stream(self, prompt, *args, **kwargs):
+        message = self._message(prompt)
+        time.sleep(self.latency)
+        words = message.content.split(" ")
+        for i, word in enumerate(words):
+            time.sleep(self.token_latency)
+            usage = message.usage_metadata if i == len(words) - 1 else None
+            yield AIMessageChunk(content=word + (" " if i < len(words) - 1 else ""), usage_metadata=usage)
+
+class StubSearchServer:
+    """
+    Local HTTP stand-in for a web search engine, served to the 'http' web search backend.
+    GET /search?q=...&max_results=N returns canned JSON hits after `latency_ms`, and every
+    hit links to GET /page/<n>, a small HTML page served after `page_latency_ms`.
+    """
+    def __init__(self, latency_ms: float = 100.0, page_latency_ms: float = 50.0):
+        self.latency_ms = latency_ms
+        self.page_latency_ms = page_latency_ms
+        self.requests = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                stub.requests += 1
+                url = urlsplit(self.path)
+                if url.path == "/search":
+                    params = parse_qs(url.query)
+                    query, max_results = params.get("q", [""])[0], int(params.get("max_results", ["5"])[0])
+                    time.sleep(stub.latency_ms / 1000)
+                    body, content_type = json.dumps([
+                        {"title": f"Result {i + 1} for {query}", "body": f"Recent coverage of {query} (item {i + 1}).", "href": f"{stub.url}/page/{i + 1}?q={quote(query)}"}
+                        for i in range(max_results)
+                    ]), "application/json"
+                elif url.path.startswith("/page/"):
+                    time.sleep(stub.page_latency_ms / 1000)
+                    topic = parse_qs(url.query).get("q", [""])[0]
+                    body, content_type = (
+                        f"<html><head><title>{topic}</title><script>var x = 1;</script></head>"
+                        f"<body><nav>Home | About</nav><h1>{topic}</h1><p>A longer article about {topic}, page {url.path[6:]}.</p></body></html>"
+                    ), "text/html; charset=utf-8"
+                else:
+                    self.send_error(404)
+                    return
+                data = body.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                try:
+                    self.wfile.write(data)
+                except ConnectionError:
+                    pass  # The client gave up on this call (deadline exceeded).
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, name="stub-search", daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+_CLAUSE_SPLIT = re.compile(r'\s+and\s+(?=(?:[^"]*"[^"]*")*[^"]*$)')
+_CLAUSE = re.compile(r'^\s*(\w+)(?:\["([^"]+)"\])?\s*(==|!=|not in|in)\s*(.+?)\s*$')
+
+def parse_filter(expression: str):
+    """Compiles the subset of Milvus boolean expressions HyDRA uses (==, !=, `in` and `not in`, joined by `and`)."""
+    if not expression or not expression.strip():
+        return lambda row: True
+    clauses = []
+    for clause in _CLAUSE_SPLIT.split(expression.strip()):
+        match = _CLAUSE.match(clause)
+        if not match:
+            raise ValueError(f"LocalMilvusClient cannot evaluate filter clause: {clause!r}")
+        field, key, op, literal = match.groups()
+        clauses.append((field, key, op, json.loads(literal)))
+
+    def matches(row: dict) -> bool:
+        for field, key, op, value in clauses:
+            actual = row.get(field)
+            if key is not None:
+                actual = (actual or {}).get(key)
+            if (op == "==" and actual != value) or (op == "!=" and actual == value) or (op == "in" and actual not in value) or (op == "not in" and actual in value):
+                return False
+        return True
+    return matches
+
+def _sparse_terms(vector) -> dict:
+    """Accepts a {index: weight} dict or a one-row scipy sparse vector."""
+    if isinstance(vector, dict):
+        return {int(k): float(v) for k, v in vector.items()}
+    coo = vector.tocoo()
+    columns = coo.coords[-1] if hasattr(coo, "coords") else coo.col
+    return {int(c): float(v) for c, v in zip(columns, coo.data)}
+
+class LocalMilvusClient:
+    """
+    In-process stand-in for the MilvusClient calls HyDRA makes: exact (brute-force) dense
+    search with NumPy, an inverted index for sparse vectors, and RRF for hybrid_search.
+    """
+    def __init__(self):
+        self.collections = {}
+        self.search_payload_bytes = 0
+        self._lock = threading.RLock()
+
+    def _collection(self, collection_name: str) -> dict:
+        if collection_name not in self.collections:
+            raise ValueError(f"Collection '{collection_name}' does not exist.")
+        return self.collections[collection_name]
+
+    def has_collection(self, collection_name: str, **kwargs) -> bool:
+        return collection_name in self.collections
+
+    def create_collection(self, collection_name: str, *args, **kwargs):
+        with self._lock:
+            schema = kwargs.get("schema")
+            fields = [field.name for field in schema.fields] if schema is not None else []
+            self.collections.setdefault(collection_name, {"rows": {}, "next_id": 1, "indexes": {}, "fields": fields})
+
+    def describe_collection(self, collection_name: str, **kwargs) -> dict:
+        return {"collection_name": collection_name, "fields": [{"name": name} for name in self._collection(collection_name).get("fields", [])]}
+
+    def drop_collection(self, collection_name: str, **kwargs):
+        with self._lock:
+            self.collections.pop(collection_name, None)
+
+    def get_collection_stats(self, collection_name: str, **kwargs) -> dict:
+        return {"row_count": len(self._collection(collection_name)["rows"])}
+
+    def flush(self, collection_name: str, **kwargs):
+        pass
+
+    def insert(self, collection_name: str, data: list[dict], **kwargs) -> dict:
+        with self._lock:
+            collection = self._collection(collection_name)
+            ids = []
+            for row in data:
+                row = dict(row)
+                if "id" not in row:
+                    row["id"] = collection["next_id"]
+                    collection["next_id"] += 1
+                collection["rows"][row["id"]] = row
+                ids.append(row["id"])
+            collection["indexes"].clear()
+        return {"insert_count": len(ids), "ids": ids}
+
+    def upsert(self, collection_name: str, data: list[dict], **kwargs) -> dict:
+        result = self.insert(collection_name, data)
+        return {"upsert_count": result["insert_count"]}
+
+    def delete(self, collection_name: str, ids: list = None, filter: str = None, **kwargs) -> dict:
+        with self._lock:
+            collection = self._collection(collection_name)
+            if ids is not None:
+                doomed = [i for i in ids if i in collection["rows"]]
+            else:
+                matches = parse_filter(filter)
+                doomed = [i for i, row in collection["rows"].items() if matches(row)]
+            for i in doomed:
+                del collection["rows"][i]
+            collection["indexes"].clear()
+        return {"delete_count": len(doomed)}
+
+    def query(self, collection_name: str, filter: str = "", output_fields: list = None, limit: int = None, ids: list = None, **kwargs) -> list[dict]:
+        with self._lock:
+            rows = list(self._collection(collection_name)["rows"].values())
+        matches = parse_filter(filter)
+        selected = [row for row in rows if (ids is None or row["id"] in ids) and matches(row)]
+        return [self._entity(row, output_fields, with_id=True) for row in selected[:limit]]
+
+    @staticmethod
+    def _entity(row: dict, output_fields: list, with_id: bool = False) -> dict:
+        entity = {field: row.get(field) for field in (output_fields or [])}
+        if with_id:
+            entity["id"] = row["id"]
+        return entity
+
+    def _index(self, collection_name: str, field: str):
+        """Builds (and caches until the next write) the dense matrix or sparse inverted index of a field."""
+        with self._lock:
+            collection = self._collection(collection_name)
+            if field not in collection["indexes"]:
+                ids = list(collection["rows"])
+                vectors = [collection["rows"][i].get(field) for i in ids]
+                if vectors and vectors[0] is not None and not isinstance(vectors[0], (list, np.ndarray)):
+                    postings = {}
+                    for position, vector in enumerate(vectors):
+                        for term, weight in _sparse_terms(vector).items():
+                            postings.setdefault(term, []).append((position, weight))
+                    collection["indexes"][field] = ("sparse", ids, postings)
+                else:
+                    matrix = np.asarray(vectors, dtype=np.float32) if vectors else np.zeros((0, 0), dtype=np.float32)
+                    collection["indexes"][field] = ("dense", ids, matrix)
+            return collection["indexes"][field], dict(collection["rows"])
+
+    def _scores(self, collection_name: str, field: str, query_vector) -> tuple[list, np.ndarray, dict]:
+        (kind, ids, index), rows = self._index(collection_name, field)
+        if kind == "dense":
+            scores = index @ np.asarray(query_vector, dtype=np.float32) if len(ids) else np.zeros(0, dtype=np.float32)
+        else:
+            scores = np.zeros(len(ids), dtype=np.float32)
+            for term, weight in _sparse_terms(query_vector).items():
+                for position, doc_weight in index.get(term, ()):
+                    scores[position] += weight * doc_weight
+        return ids, scores, rows
+
+    def _top(self, collection_name: str, field: str, query_vector, limit: int, filter: str) -> list[tuple]:
+        ids, scores, rows = self._scores(collection_name, field, query_vector)
+        matches = parse_filter(filter)
+        ranked = []
+        for position in np.argsort(-scores, kind="stable"):
+            row = rows[ids[position]]
+            if matches(row):
+                ranked.append((row, float(scores[position])))
+                if len(ranked) == limit:
+                    break
+        return ranked
+
+    def search(self, collection_name: str, data: list, anns_field: str = None, filter: str = "", limit: int = 10, output_fields: list = None, **kwargs) -> list[list[dict]]:
+        return [
+            [{"id": row["id"], "distance": score, "entity": self._entity(row, output_fields)} for row, score in self._top(collection_name, anns_field, vector, limit, filter)]
+            for vector in data
+        ]
+
+    def hybrid_search(self, collection_name: str, reqs: list, rerank=None, limit: int = 10, output_fields: list = None, **kwargs) -> list[list[dict]]:
+        rrf_k = getattr(rerank, "_k", 60)
+        results = []
+        for q in range(len(reqs[0].data)):
+            fused, rows = {}, {}
+            for req in reqs:
+                for rank, (row, _) in enumerate(self._top(collection_name, req.anns_field, req.data[q], req.limit, getattr(req, "expr", "") or "")):
+                    fused[row["id"]] = fused.get(row["id"], 0.0) + 1.0 / (rrf_k + rank + 1)
+                    rows[row["id"]] = row
+            ranked = sorted(fused.items(), key=lambda item: item[1], reverse=True)[:limit]
+            results.append([{"id": i, "distance": score, "entity": self._entity(rows[i], output_fields)} for i, score in ranked])
+        # Approximates the response size of a real server: ids and scores plus the requested scalar fields.
+        self.search_payload_bytes += sum(16 + sum(len(str(value).encode("utf-8")) for value in hit["entity"].values()) for hits in results for hit in hits)
+        return results
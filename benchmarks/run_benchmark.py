@@ -0,0 +1,218 @@
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def latency_summary(seconds: list[float]) -> dict:
+    from src.core.batch_runner import percentile
+    if not seconds:
+        return {"count": 0}
+    return {
+        "count": len(seconds), "mean_ms": 1000 * sum(seconds) / len(seconds),
+        "p50_ms": 1000 * percentile(seconds, 50), "p95_ms": 1000 * percentile(seconds, 95), "p99_ms": 1000 * percentile(seconds, 99),
+    }
+
+def prepare_config(args, workdir: str, search_url: str) -> dict:
+    """Loads the profile and points every stateful side effect at the scratch directory."""
+    from src.utils.config_loader import ConfigLoader
+    config = ConfigLoader.load(args.profile)
+    if args.embedding == "hashing":
+        config['embedding']['backend'] = "hashing"
+    config['embedding']['workers'] = args.workers
+    config.setdefault('llm_cache', {})['enabled'] = False
+    config.setdefault('semantic_cache', {})['enabled'] = False
+    config.setdefault('retrieval', {}).setdefault('cache', {})['persist'] = False
+    if args.chunk_store != "profile":
+        config['milvus']['chunk_store'] = {"enabled": args.chunk_store == "on"}
+    config.setdefault('learning', {})['wal_path'] = os.path.join(workdir, "learning_wal.jsonl")
+    config.setdefault('observability', {})['trace_path'] = None
+    config['web_search'] = {
+        **config.get('web_search', {}), "backend": "http", "url": f"{search_url}/search",
+        "fetch_pages": args.web_fetch_pages, "cache": {"enabled": False},
+    }
+    return config
+
+def bench_ingestion(args, workdir: str, client) -> tuple[dict, list[dict]]:
+    from benchmarks.corpus import generate_corpus
+    from data_processing.ingest import ingest_data
+    corpus_dir = os.path.join(workdir, "corpus")
+    facts = generate_corpus(corpus_dir, documents=args.documents, seed=args.seed)
+    summary = ingest_data(corpus_dir, None, batch_size=args.batch_size, workers=args.workers, client=client)
+    return {
+        "documents": args.documents, "chunks": summary["inserted"], "failed": summary["failed"],
+        "seconds": summary["total_seconds"], "chunks_per_second": summary["inserted"] / summary["total_seconds"] if summary["total_seconds"] else 0.0,
+        "embedding_chunks_per_second": summary["embedding_chunks_per_second"],
+    }, facts
+
+def bench_retrieval(args, queries: list[dict]) -> dict:
+    from src.services.component_registry import ComponentRegistry
+    retriever = ComponentRegistry.get_retriever()
+    for item in queries[:5]:
+        retriever.invoke(item["query"])
+    retriever.cache.embeddings.clear()
+    retriever.cache.results.clear()
+
+    latencies, hits = [], 0
+    payload_before = retriever.milvus_client.search_payload_bytes
+    for item in queries:
+        start = time.perf_counter()
+        documents = retriever.invoke(item["query"])
+        latencies.append(time.perf_counter() - start)
+        hits += any(doc.metadata.get("source") == item["source"] for doc in documents)
+    payload_bytes = retriever.milvus_client.search_payload_bytes - payload_before
+
+    # A second, concurrent pass exercises the query batcher; caches are cleared so it is not served from memory.
+    retriever.cache.embeddings.clear()
+    retriever.cache.results.clear()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.retrieval_concurrency) as pool:
+        list(pool.map(lambda item: retriever.invoke(item["query"]), queries))
+    concurrent_seconds = time.perf_counter() - start
+    return {
+        "queries": len(queries), "top_k": retriever.top_k_final, "hit_rate": hits / len(queries) if queries else 0.0,
+        "sequential": latency_summary(latencies),
+        "search_payload_bytes_per_query": payload_bytes / len(queries) if queries else 0.0,
+        "concurrent": {"concurrency": args.retrieval_concurrency, "qps": len(queries) / concurrent_seconds if concurrent_seconds else 0.0},
+        "rerank": retriever.rerank_policy.stats(),
+        "batching": retriever.batcher.stats(),
+    }
+
+def bench_end_to_end(args, queries: list[dict]) -> dict:
+    from src.core.reasoning_loop import ReasoningLoop
+    from src.services.component_registry import ComponentRegistry
+    loop = ReasoningLoop("benchmark", "benchmark_user", "benchmark_session")
+    latencies, stages = [], {}
+    for item in queries:
+        timings = {}
+        start = time.perf_counter()
+        loop.run(item["query"], callback=lambda message, category: None, timings=timings)
+        latencies.append(time.perf_counter() - start)
+        for stage, seconds in timings.items():
+            stages.setdefault(stage, []).append(seconds)
+    start = time.perf_counter()
+    ComponentRegistry.shutdown()
+    memory_cache = ComponentRegistry.get_memory_cache()
+    return {
+        "queries": len(queries), "latency": latency_summary(latencies),
+        "stages": {stage: latency_summary(seconds) for stage, seconds in stages.items()},
+        "learning_flush_seconds": time.perf_counter() - start,
+        "memory_cache": memory_cache.stats() if memory_cache is not None else None,
+    }
+
+def flatten(results: dict, prefix: str = "") -> dict:
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+def print_comparison(baseline_path: str, results: dict):
+    with open(baseline_path, "r") as f:
+        baseline = flatten(json.load(f)["results"])
+    current = flatten(results)
+    print(f"\nComparison with {baseline_path}:")
+    print(f"{'metric':<48} {'baseline':>12} {'current':>12} {'change':>8}")
+    for metric in sorted(set(baseline) & set(current)):
+        before, after = baseline[metric], current[metric]
+        change = f"{(after - before) / before:+.1%}" if before else "n/a"
+        print(f"{metric:<48} {before:>12.2f} {after:>12.2f} {change:>8}")
+
+def run(args) -> dict:
+    workdir = tempfile.mkdtemp(prefix="hydra-bench-")
+    # Manifests and collection generations are read from these at import time.
+    os.environ["HYDRA_MANIFEST_DIR"] = os.path.join(workdir, "manifests")
+    os.environ["HYDRA_CACHE_DIR"] = os.path.join(workdir, "cache")
+    os.environ["HYDRA_CHUNK_STORE_DIR"] = os.path.join(workdir, "chunks")
+
+    from benchmarks.fakes import FakeLLM, StubSearchServer, LocalMilvusClient
+    from benchmarks.corpus import generate_queries
+    from src.services.component_registry import ComponentRegistry
+    from src.services.milvus_setup import MEMORY_COLLECTION
+
+    search_server = StubSearchServer(latency_ms=args.web_latency_ms, page_latency_ms=args.page_latency_ms)
+    try:
+        config = prepare_config(args, workdir, search_server.url)
+        client = LocalMilvusClient()
+        client.create_collection(config['milvus']['collection_name'])
+        client.create_collection(MEMORY_COLLECTION)
+        llm = FakeLLM(latency_ms=args.llm_latency_ms, token_latency_ms=args.token_latency_ms)
+        ComponentRegistry.override("milvus", client)
+        ComponentRegistry.override("llm", llm)
+
+        print("Benchmarking ingestion...")
+        ingestion, facts = bench_ingestion(args, workdir, client)
+        queries = generate_queries(facts, args.queries, seed=args.seed)
+        print("Benchmarking retrieval...")
+        retrieval = bench_retrieval(args, queries)
+        print("Benchmarking end-to-end ReasoningLoop.run...")
+        end_to_end = bench_end_to_end(args, queries[:args.e2e_queries])
+        end_to_end["llm_calls"] = llm.calls
+        end_to_end["web_requests"] = search_server.requests
+    finally:
+        ComponentRegistry.clear_overrides()
+        search_server.close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        "meta": {
+            "commit": git_commit(), "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"), "profile": args.profile,
+            "python": platform.python_version(), "platform": platform.platform(), "cpu_count": os.cpu_count(),
+        },
+        "parameters": {k: v for k, v in vars(args).items() if k not in ("out", "baseline")},
+        "results": {"ingestion": ingestion, "retrieval": retrieval, "end_to_end": end_to_end},
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline end-to-end benchmark of HyDRA with a fake LLM, a local vector store and a local stub search server.")
+    parser.add_argument("--profile", type=str, default="development", help="Deployment profile whose pipeline settings are benchmarked.")
+    parser.add_argument("--embedding", choices=["hashing", "profile"], default="hashing", help="'hashing' needs no model download; 'profile' loads the profile's real BGE-M3 backend.")
+    parser.add_argument("--documents", type=int, default=200, help="Synthetic documents to generate and ingest.")
+    parser.add_argument("--queries", type=int, default=200, help="Retrieval queries to time.")
+    parser.add_argument("--e2e-queries", type=int, default=20, help="Queries to run through ReasoningLoop.run.")
+    parser.add_argument("--batch-size", type=int, default=128, help="Ingestion micro-batch size.")
+    parser.add_argument("--workers", type=int, default=1, help="Embedding worker processes for ingestion.")
+    parser.add_argument("--retrieval-concurrency", type=int, default=16, help="Threads used for the concurrent retrieval pass.")
+    parser.add_argument("--llm-latency-ms", type=float, default=50.0, help="Fixed latency of each fake LLM call.")
+    parser.add_argument("--token-latency-ms", type=float, default=1.0, help="Extra fake LLM latency per output token.")
+    parser.add_argument("--web-latency-ms", type=float, default=100.0, help="Latency of each search on the local stub search server.")
+    parser.add_argument("--page-latency-ms", type=float, default=50.0, help="Latency of each result page fetched from the stub server.")
+    parser.add_argument("--web-fetch-pages", type=int, default=2, help="Top result pages fetched per web search.")
+    parser.add_argument("--chunk-store", choices=["profile", "on", "off"], default="profile", help="Keep chunk text in the local chunk store instead of Milvus ('profile' follows milvus.chunk_store).")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", type=str, default=None, help="Results file. Defaults to benchmarks/results/<timestamp>-<commit>.json.")
+    parser.add_argument("--baseline", type=str, default=None, help="A previous results file to compare against.")
+    args = parser.parse_args()
+
+    results = run(args)
+    out = args.out or os.path.join(RESULTS_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{results['meta']['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(results, f, indent=2)
+
+    r = results["results"]
+    print(f"\nIngestion: {r['ingestion']['chunks']} chunks at {r['ingestion']['chunks_per_second']:.1f} chunks/sec")
+    print(f"Retrieval: p50 {r['retrieval']['sequential']['p50_ms']:.1f} ms, p99 {r['retrieval']['sequential']['p99_ms']:.1f} ms, "
+          f"hit rate {r['retrieval']['hit_rate']:.0%}, {r['retrieval']['concurrent']['qps']:.1f} QPS concurrent")
+    print(f"End-to-end: p50 {r['end_to_end']['latency']['p50_ms']:.0f} ms, p99 {r['end_to_end']['latency']['p99_ms']:.0f} ms")
+    print(f"Results written to {out}")
+    if args.baseline:
+        print_comparison(args.baseline, r)
+
+if __name__ == "__main__":
+    sys.exit(main())
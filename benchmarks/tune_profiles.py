@@ -0,0 +1,218 @@
+import os
+import json
+import time
+import random
+import argparse
+import numpy as np
+from pymilvus import MilvusClient, DataType
+from dotenv import load_dotenv
+
+# Search-parameter grids per index type. The profile's configured values are always added.
+SWEEPS = {
+    "FLAT": {},
+    "IVF_FLAT": {"nprobe": [4, 8, 16, 32, 64, 128, 256]},
+    "HNSW": {"ef": [32, 48, 64, 96, 128, 192, 256, 384, 512]},
+    "HNSW_SQ": {"ef": [32, 48, 64, 96, 128, 192, 256, 384, 512]},
+    "IVF_RABITQ": {"nprobe": [8, 16, 32, 64, 128, 256], "refine_k": [1, 2, 4]},
+    "GPU_CAGRA": {"itopk_size": [32, 64, 128, 256], "search_width": [1, 4, 8, 16]},
+}
+
+def param_grid(index_type: str, configured: dict, k: int) -> list[dict]:
+    """Every combination of the sweep values for an index type, plus the profile's current search_params."""
+    grid = [{}]
+    for name, values in SWEEPS.get(index_type, {}).items():
+        grid = [{**params, name: value} for params in grid for value in values]
+    if configured not in grid:
+        grid.append(dict(configured))
+    # HNSW cannot return more neighbours than its candidate list holds.
+    return [params for params in grid if params.get("ef", k) >= k and params.get("itopk_size", k) >= k]
+
+def estimate_index_bytes(dense_index: dict, rows: int, dim: int) -> int:
+    """
+    Rough memory footprint of the dense index. Milvus does not report index sizes, so this
+    is derived from the index layout: vector codes plus graph links or centroids.
+    """
+    params, index_type = dense_index.get('build_params', {}), dense_index['index_type']
+    if index_type == "HNSW":
+        return rows * (dim * 4 + params.get("M", 16) * 2 * 8)
+    if index_type == "HNSW_SQ":
+        return rows * (dim * 1 + params.get("M", 16) * 2 * 8)
+    if index_type == "IVF_RABITQ":
+        refine = dim * 1 if params.get("refine") else 0
+        return rows * (dim // 8 + 8 + refine) + params.get("nlist", 1024) * dim * 4
+    if index_type == "IVF_FLAT":
+        return rows * dim * 4 + params.get("nlist", 1024) * dim * 4
+    if index_type == "GPU_CAGRA":
+        return rows * (dim * 4 + params.get("graph_degree", 64) * 4)
+    return rows * dim * 4
+
+def load_chunks(corpus_path: str, max_chunks: int, seed: int) -> list[str]:
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+    from data_processing.ingest import discover_files, split_file
+    # Same splitter settings as ingestion, so the tuned index sees the production chunk distribution.
+    text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=150)
+    chunks = [chunk["chunk_text"] for path in discover_files(corpus_path) for chunk in split_file(path, text_splitter)]
+    if len(chunks) > max_chunks:
+        chunks = random.Random(seed).sample(chunks, max_chunks)
+    return chunks
+
+def load_queries(queries_path: str | None, chunks: list[str], count: int, seed: int) -> list[str]:
+    """Reads {"query": ...} JSONL, or samples one sentence from random chunks as self-generated queries."""
+    if queries_path:
+        with open(queries_path, "r") as f:
+            return [json.loads(line)["query"] for line in f if line.strip()][:count]
+    rng = random.Random(seed + 1)
+    queries = []
+    for chunk in rng.sample(chunks, min(count, len(chunks))):
+        sentences = [s.strip() for s in chunk.replace("\n", " ").split(".") if len(s.split()) >= 5]
+        queries.append(rng.choice(sentences) if sentences else chunk[:200])
+    return queries
+
+def embed(texts: list[str], embedding_config: dict, batch_size: int = 64) -> np.ndarray:
+    from src.retrieval.backends import create_embedding_function
+    embedding_function = create_embedding_function(embedding_config)
+    dense = []
+    for start in range(0, len(texts), batch_size):
+        dense.extend(embedding_function(texts[start:start + batch_size])['dense'])
+    return np.asarray(dense, dtype=np.float32)
+
+def exact_neighbors(vectors: np.ndarray, queries: np.ndarray, metric: str, k: int) -> list[set]:
+    """Brute-force ground truth under the index's metric."""
+    if metric == "IP":
+        scores = queries @ vectors.T
+    else:
+        scores = -(np.sum(queries ** 2, axis=1, keepdims=True) - 2 * queries @ vectors.T + np.sum(vectors ** 2, axis=1))
+    top = np.argpartition(-scores, min(k, vectors.shape[0] - 1), axis=1)[:, :k]
+    return [set(int(i) for i in row) for row in top]
+
+def build_collection(client: MilvusClient, name: str, dense_index: dict, vectors: np.ndarray, insert_batch: int = 1000) -> float:
+    from src.services.milvus_setup import dense_index_params
+    if client.has_collection(name):
+        client.drop_collection(name)
+    schema = MilvusClient.create_schema(auto_id=False, enable_dynamic_field=False)
+    schema.add_field("id", DataType.INT64, is_primary=True)
+    schema.add_field("dense_vector", DataType.FLOAT_VECTOR, dim=vectors.shape[1])
+    start = time.perf_counter()
+    client.create_collection(collection_name=name, schema=schema, index_params=dense_index_params(client, dense_index))
+    for offset in range(0, len(vectors), insert_batch):
+        client.insert(collection_name=name, data=[
+            {"id": offset + i, "dense_vector": vector.tolist()} for i, vector in enumerate(vectors[offset:offset + insert_batch])
+        ])
+    client.load_collection(collection_name=name)
+    return time.perf_counter() - start
+
+def measure(client: MilvusClient, name: str, metric: str, params: dict, queries: np.ndarray, truth: list[set], k: int) -> dict:
+    search_params = {"metric_type": metric, "params": params}
+    for query in queries[:min(10, len(queries))]:
+        client.search(collection_name=name, data=[query.tolist()], anns_field="dense_vector", search_params=search_params, limit=k)
+    latencies, found = [], 0
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        hits = client.search(collection_name=name, data=[query.tolist()], anns_field="dense_vector", search_params=search_params, limit=k)[0]
+        latencies.append(time.perf_counter() - start)
+        found += len({int(hit['id']) for hit in hits} & expected)
+    latencies.sort()
+    return {
+        "params": params, "recall": found / (k * len(queries)),
+        "qps": len(latencies) / sum(latencies), "p50_ms": 1000 * latencies[len(latencies) // 2],
+        "p95_ms": 1000 * latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))],
+    }
+
+def recommend(sweep: list[dict], target_ms: float) -> dict | None:
+    """The most accurate setting within the latency target; ties go to the higher QPS."""
+    within = [result for result in sweep if result["p95_ms"] <= target_ms]
+    return max(within, key=lambda result: (round(result["recall"], 3), result["qps"])) if within else None
+
+def render_recommendations(profiles: dict, targets: list[float], k: int) -> str:
+    lines = ["# Recommended milvus.search_params per latency target, generated by benchmarks/tune_profiles.py.",
+             "# Paste the block for your target into configs/deployment_profiles.yaml.", ""]
+    for target in targets:
+        lines.append(f"# --- p95 <= {target:g} ms ---")
+        for profile_name, result in profiles.items():
+            if "error" in result:
+                lines.append(f"# {profile_name}: skipped ({result['error']})")
+                continue
+            best = recommend(result["sweep"], target)
+            if best is None:
+                lines.append(f"# {profile_name}: no setting meets this target (fastest p95 {min(r['p95_ms'] for r in result['sweep']):.1f} ms)")
+                continue
+            lines += [
+                f"# {profile_name}: recall@{k} {best['recall']:.3f}, {best['qps']:.0f} QPS, p95 {best['p95_ms']:.1f} ms, "
+                f"~{result['estimated_index_bytes'] / 1024 / 1024:.0f} MB index",
+                f"{profile_name}:",
+                "  milvus:",
+                f"    search_params: {json.dumps(best['params'])}",
+            ]
+        lines.append("")
+    return "\n".join(lines)
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Sweep Milvus search parameters of each deployment profile: recall@k against exact search, QPS, p95 and index memory.")
+    parser.add_argument("--corpus", type=str, required=True, help="Directory of .txt/.md documents, chunked like ingest.py.")
+    parser.add_argument("--queries", type=str, default=None, help="Optional JSONL of {\"query\": ...}. Without it, queries are sampled from the corpus.")
+    parser.add_argument("--profiles", type=str, nargs="+", default=None, help="Profiles to tune (default: all).")
+    parser.add_argument("--num-queries", type=int, default=200)
+    parser.add_argument("--max-chunks", type=int, default=50000)
+    parser.add_argument("--k", type=int, default=20, help="Recall is measured at the retriever's candidate depth (top_k_initial).")
+    parser.add_argument("--latency-targets-ms", type=float, nargs="+", default=[5, 10, 25])
+    parser.add_argument("--embedding", choices=["profile", "hashing"], default="profile", help="Embed with the first profile's BGE-M3 backend, or the model-free hashing backend.")
+    parser.add_argument("--uri", type=str, default=os.getenv("MILVUS_URI", "http://localhost:19530"))
+    parser.add_argument("--out", type=str, default="benchmarks/results/tuning")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--keep", action="store_true", help="Keep the temporary tuning collections.")
+    args = parser.parse_args()
+
+    import yaml
+    from src.utils.config_loader import ConfigLoader
+    with open("configs/deployment_profiles.yaml", "r") as f:
+        profile_names = args.profiles or list(yaml.safe_load(f)["profiles"])
+
+    chunks = load_chunks(args.corpus, args.max_chunks, args.seed)
+    query_texts = load_queries(args.queries, chunks, args.num_queries, args.seed)
+    embedding_config = dict(ConfigLoader.load(profile_names[0])['embedding'])
+    if args.embedding == "hashing":
+        embedding_config['backend'] = "hashing"
+    print(f"Embedding {len(chunks)} chunks and {len(query_texts)} queries...")
+    vectors, queries = embed(chunks, embedding_config), embed(query_texts, embedding_config)
+
+    client = MilvusClient(uri=args.uri, token=os.getenv("MILVUS_TOKEN"))
+    profiles = {}
+    for profile_name in profile_names:
+        milvus_config = ConfigLoader.load(profile_name)['milvus']
+        dense_index = milvus_config['dense_index']
+        name = f"hydra_tune_{profile_name}"
+        print(f"[{profile_name}] building {dense_index['index_type']} over {len(vectors)} vectors...")
+        try:
+            build_seconds = build_collection(client, name, dense_index, vectors)
+        except Exception as e:
+            print(f"[{profile_name}] skipped: {e}")
+            profiles[profile_name] = {"index": dense_index, "error": " ".join(str(e).split())}
+            continue
+
+        truth = exact_neighbors(vectors, queries, dense_index['metric_type'], args.k)
+        sweep = []
+        for params in param_grid(dense_index['index_type'], milvus_config['search_params'], args.k):
+            result = measure(client, name, dense_index['metric_type'], params, queries, truth, args.k)
+            result["configured"] = params == milvus_config['search_params']
+            sweep.append(result)
+            print(f"[{profile_name}] {json.dumps(params):<40} recall@{args.k} {result['recall']:.3f}  {result['qps']:7.0f} QPS  p95 {result['p95_ms']:6.1f} ms")
+        profiles[profile_name] = {
+            "index": dense_index, "build_seconds": build_seconds,
+            "estimated_index_bytes": estimate_index_bytes(dense_index, len(vectors), vectors.shape[1]), "sweep": sweep,
+        }
+        if not args.keep:
+            client.drop_collection(name)
+
+    os.makedirs(args.out, exist_ok=True)
+    with open(os.path.join(args.out, "tuning_results.json"), "w") as f:
+        json.dump({
+            "dataset": {"chunks": len(vectors), "queries": len(queries), "dim": int(vectors.shape[1]), "k": args.k, "embedding": args.embedding},
+            "profiles": profiles,
+        }, f, indent=2)
+    with open(os.path.join(args.out, "recommended_profiles.yaml"), "w") as f:
+        f.write(render_recommendations(profiles, args.latency_targets_ms, args.k))
+    print(f"Results and recommended profile blocks written to {args.out}/")
+
+if __name__ == "__main__":
+    main()
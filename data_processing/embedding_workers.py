@@ -0,0 +1,106 @@
+import os
+import time
+import multiprocessing
+from typing import Iterator
+
+_worker_ef = None
+
+def _init_worker(embedding_config: dict, intra_op_threads: int | None):
+    """Loads one BGE-M3 copy per worker, with a capped intra-op thread count."""
+    global _worker_ef
+    if intra_op_threads:
+        # Must be set before torch spins up its thread pools.
+        os.environ["OMP_NUM_THREADS"] = str(intra_op_threads)
+        os.environ["MKL_NUM_THREADS"] = str(intra_op_threads)
+    from src.retrieval.backends import create_embedding_function
+    if intra_op_threads and embedding_config.get('backend', 'torch') == 'torch':
+        import torch
+        torch.set_num_threads(intra_op_threads)
+    _worker_ef = create_embedding_function(embedding_config, intra_op_threads=intra_op_threads)
+
+def _embed_texts(texts: list[str]) -> tuple:
+    embeddings = _worker_ef(texts)
+    return embeddings['dense'], embeddings['sparse']
+
+class EmbeddingWorkerPool:
+    """
+    Embeds ingestion micro-batches with N worker processes, each holding its own
+    BGE-M3 copy. Chunks inside a window of batches are re-batched by length so
+    similar-sized texts are padded together, then restored to their original order;
+    each batch is yielded as soon as all of its chunks are embedded. With a single
+    worker (or on GPU) the model runs in-process, one batch at a time, so nothing
+    waits on the rest of a window.
+    """
+    def __init__(self, embedding_config: dict, workers: int = 1, intra_op_threads: int = None, sort_window: int = 8):
+        self.embedding_config = embedding_config
+        # Several processes sharing one GPU only fight over its memory.
+        on_gpu = embedding_config.get('use_fp16', False) and embedding_config.get('backend', 'torch') == 'torch'
+        self.workers = 1 if on_gpu else max(1, workers)
+        self.intra_op_threads = intra_op_threads
+        self.sort_window = max(sort_window, self.workers) if self.workers > 1 else 1
+        self.embedded_chunks = 0
+        self.embedding_seconds = 0.0
+        self._pool = None
+
+    def __enter__(self):
+        if self.workers > 1:
+            ctx = multiprocessing.get_context("spawn")
+            self._pool = ctx.Pool(self.workers, initializer=_init_worker, initargs=(self.embedding_config, self.intra_op_threads))
+        else:
+            _init_worker(self.embedding_config, self.intra_op_threads)
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+    @property
+    def chunks_per_second(self) -> float:
+        return self.embedded_chunks / self.embedding_seconds if self.embedding_seconds else 0.0
+
+    def describe(self) -> str:
+        from src.retrieval.backends import describe_backend
+        threads = f", {self.intra_op_threads} threads each" if self.intra_op_threads else ""
+        return f"{self.workers} worker(s) on {describe_backend(self.embedding_config)}{threads}"
+
+    def _embed_window(self, window: list[list[dict]]) -> Iterator[list[dict]]:
+        chunks = [chunk for batch in window for chunk in batch]
+        owners = [b for b, batch in enumerate(window) for _ in batch]
+        starts = [sum(len(batch) for batch in window[:b]) for b in range(len(window))]
+        batch_size = max(len(batch) for batch in window) or 1
+        order = sorted(range(len(chunks)), key=lambda i: len(chunks[i]['chunk_text']))
+        shards = [order[i:i + batch_size] for i in range(0, len(order), batch_size)]
+        texts = [[chunks[i]['chunk_text'] for i in shard] for shard in shards]
+
+        results = self._pool.imap(_embed_texts, texts) if self._pool is not None else map(_embed_texts, texts)
+        rows = [None] * len(chunks)
+        remaining = [len(batch) for batch in window]
+        done = 0
+        for shard in shards:
+            # Only the wait for results counts as embedding time, not the consumer's work in between.
+            start = time.perf_counter()
+            dense, sparse = next(results)
+            self.embedding_seconds += time.perf_counter() - start
+            self.embedded_chunks += len(shard)
+            for k, i in enumerate(shard):
+                rows[i] = {**chunks[i], "dense_vector": dense[k], "sparse_vector": sparse[k]}
+                remaining[owners[i]] -= 1
+            # Shards finish in order, so every batch whose chunks are all done can go out now.
+            while done < len(window) and remaining[done] == 0:
+                yield rows[starts[done]:starts[done] + len(window[done])]
+                done += 1
+        for b in range(done, len(window)):
+            yield rows[starts[b]:starts[b] + len(window[b])]
+
+    def embed_batches(self, batches: Iterator[list[dict]]) -> Iterator[list[dict]]:
+        """Embeds each micro-batch and yields rows ready for insertion, in input order."""
+        window = []
+        for batch in batches:
+            window.append(batch)
+            if len(window) == self.sort_window:
+                yield from self._embed_window(window)
+                window = []
+        if window:
+            yield from self._embed_window(window)
@@ -1,115 +1,352 @@
 import os
+import json
+import time
+import queue
 import argparse
-from langchain_community.document_loaders import TextLoader, DirectoryLoader
+import threading
+from typing import Iterator
+from langchain_community.document_loaders import TextLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from pymilvus import MilvusClient
-from pymilvus.model.hybrid import BGEM3EmbeddingFunction
 from dotenv import load_dotenv
+from data_processing.embedding_workers import EmbeddingWorkerPool
 from src.utils.config_loader import ConfigLoader
+from src.services.ingestion_manifest import IngestionManifest, content_sha256
+from src.retrieval.cache import bump_collection_generation
+from src.retrieval.chunk_store import ChunkStore, chunk_store_enabled
 from tqdm import tqdm
 
-def ingest_data(data_path: str, profile: str):
+SUPPORTED_EXTENSIONS = (".txt", ".md")
+KNOWLEDGE_FIELDS = ("source", "chunk_text", "dense_vector", "sparse_vector")
+# With a local chunk store, Milvus only receives the vectors (plus its auto ids).
+VECTOR_FIELDS = ("dense_vector", "sparse_vector")
+
+def discover_files(data_path: str) -> Iterator[str]:
+    """Yields supported document paths under data_path in a stable order."""
+    for root, dirs, files in os.walk(data_path):
+        dirs.sort()
+        for name in sorted(files):
+            if name.lower().endswith(SUPPORTED_EXTENSIONS):
+                yield os.path.join(root, name)
+
+def split_file(path: str, text_splitter) -> list[dict]:
+    docs = TextLoader(path, autodetect_encoding=True).load()
+    return [
+        {"source": path, "chunk_text": chunk.page_content, "chunk_hash": content_sha256(chunk.page_content)}
+        for chunk in text_splitter.split_documents(docs)
+    ]
+
+def iter_file_changes(file_paths: Iterator[str], manifest: IngestionManifest, text_splitter, replace_unknown_sources: bool = False) -> Iterator[dict]:
     """
-    Processes and ingests documents from a specified path into the Milvus
-    knowledge base according to the selected deployment profile.
+    Diffs one file at a time against the manifest. Unchanged files are not even split.
+    For changed files, chunks whose hash is already ingested keep their Milvus id and
+    only new chunks are scheduled for embedding; chunks that disappeared are deleted.
     """
-    # 1. Load the specified deployment configuration
-    ConfigLoader.load(profile)
-    config = ConfigLoader.load()
-    embedding_config = config['embedding']
-    collection_name = config['milvus']['collection_name']
-
-    # 2. Initialize the BGE-M3 embedding function based on the profile
-    # This intelligently switches between CPU (FP32) and GPU (FP16)
-    use_gpu = embedding_config.get('use_fp16', False)
-    bge_m3_ef = BGEM3EmbeddingFunction(
-        use_fp16=use_gpu,
-        device="cuda" if use_gpu else "cpu"
-    )
-    print(f"BGE-M3 embedding function initialized on {'GPU (FP16)' if use_gpu else 'CPU (FP32)'}.")
-
-    # 3. Load Documents from the specified directory
-    print(f"Loading documents from '{data_path}'...")
-    loader = DirectoryLoader(
-        data_path, 
-        glob="**/*.{txt,md}", 
-        loader_cls=TextLoader, 
-        show_progress=True,
-        use_multithreading=True
+    for path in file_paths:
+        with open(path, "rb") as f:
+            file_hash = content_sha256(f.read())
+        entry = manifest.get(path)
+        if entry and entry.get("file_hash") == file_hash:
+            yield {"source": path, "status": "unchanged", "file_hash": file_hash, "keep": entry["chunks"], "insert": [], "delete_ids": [], "delete_source": False}
+            continue
+
+        try:
+            chunks = split_file(path, text_splitter)
+        except Exception as e:
+            print(f"\nSkipping '{path}': {e}")
+            continue
+
+        old_ids_by_hash = {}
+        for chunk_hash, chunk_id in (entry or {}).get("chunks", []):
+            old_ids_by_hash.setdefault(chunk_hash, []).append(chunk_id)
+
+        keep, insert = [], []
+        for chunk in chunks:
+            reusable_ids = old_ids_by_hash.get(chunk["chunk_hash"])
+            if reusable_ids:
+                keep.append([chunk["chunk_hash"], reusable_ids.pop()])
+            else:
+                insert.append(chunk)
+        delete_ids = [chunk_id for ids in old_ids_by_hash.values() for chunk_id in ids]
+
+        yield {
+            "source": path, "status": "changed" if entry else "new", "file_hash": file_hash,
+            "keep": keep, "insert": insert, "delete_ids": delete_ids,
+            # Without a manifest entry we cannot know which rows already exist for this file.
+            "delete_source": entry is None and replace_unknown_sources,
+        }
+
+def source_filter(source: str) -> str:
+    return f"source == {json.dumps(source)}"
+
+def print_change_report(changes: Iterator[dict], deleted_sources: callable):
+    totals = {"new": 0, "changed": 0, "unchanged": 0, "deleted": 0}
+    chunks_to_embed = chunks_to_delete = chunks_kept = 0
+    print("Planned ingestion changes (dry run):")
+    for change in changes:
+        totals[change["status"]] += 1
+        chunks_to_embed += len(change["insert"])
+        chunks_to_delete += len(change["delete_ids"])
+        chunks_kept += len(change["keep"])
+        if change["status"] != "unchanged":
+            note = " (replaces existing rows for this source)" if change["delete_source"] else ""
+            print(f"  [{change['status']:>7}] {change['source']}: +{len(change['insert'])} / -{len(change['delete_ids'])} chunks, {len(change['keep'])} kept{note}")
+    for source in deleted_sources():
+        totals["deleted"] += 1
+        print(f"  [deleted] {source}")
+    print(
+        f"Files: {totals['new']} new, {totals['changed']} changed, {totals['unchanged']} unchanged, {totals['deleted']} deleted. "
+        f"Chunks: {chunks_to_embed} to embed, {chunks_to_delete} to delete, {chunks_kept} kept."
     )
-    docs = loader.load()
-    if not docs:
-        print(f"Error: No documents found at path '{data_path}'. Please check the path and file extensions.")
-        return
 
-    print(f"Loaded {len(docs)} document(s).")
+def iter_batches(items: Iterator, batch_size: int) -> Iterator[list]:
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
 
-    # 4. Split Documents into manageable chunks
-    print("Splitting documents into chunks...")
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=150)
-    chunks = text_splitter.split_documents(docs)
-    
-    chunk_texts = [chunk.page_content for chunk in chunks]
-    sources = [chunk.metadata.get('source', 'Unknown') for chunk in chunks]
-    print(f"Created {len(chunks)} chunks.")
-
-    # 5. Generate Dense and Sparse Embeddings
-    print("Generating dense and sparse embeddings for all chunks...")
-    # The BGE-M3 function efficiently processes the list of texts
-    embeddings = bge_m3_ef(chunk_texts)
-    print("Embeddings generated successfully.")
-    
-    # 6. Prepare Data entities for Milvus
-    print("Preparing data for ingestion...")
-    data_to_insert = []
-    for i, text in enumerate(chunk_texts):
-        data_to_insert.append({
-            "source": sources[i],
-            "chunk_text": text,
-            "dense_vector": embeddings['dense'][i],
-            "sparse_vector": embeddings['sparse'][i],
-        })
-
-    # 7. Ingest data into Milvus in batches
-    print(f"Ingesting {len(data_to_insert)} chunks into Milvus collection '{collection_name}'...")
-    client = MilvusClient(uri=os.getenv("MILVUS_URI"), token=os.getenv("MILVUS_TOKEN"))
-    
-    # Batch insert for efficiency, with a progress bar
-    batch_size = 128
-    with tqdm(total=len(data_to_insert), desc="Ingesting Batches") as pbar:
-        for i in range(0, len(data_to_insert), batch_size):
-            batch = data_to_insert[i:i + batch_size]
+class MilvusBatchWriter:
+    """
+    Inserts embedded batches from a bounded queue on a background thread, so the
+    insert of batch N overlaps with the embedding of batch N+1. When the queue is
+    full the producer blocks, which keeps memory use flat regardless of corpus size.
+    """
+    _DONE = object()
+
+    def __init__(self, client: MilvusClient, collection_name: str, queue_size: int = 4, progress: tqdm = None, on_inserted: callable = None, on_failed: callable = None, fields: tuple = KNOWLEDGE_FIELDS):
+        self.client = client
+        self.collection_name = collection_name
+        self.fields = fields
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.progress = progress
+        self.on_inserted = on_inserted
+        self.on_failed = on_failed
+        self.inserted = 0
+        self.failed = 0
+        self._thread = threading.Thread(target=self._run, name="hydra-ingest-writer", daemon=True)
+
+    def _run(self):
+        while True:
+            batch = self.queue.get()
+            if batch is self._DONE:
+                break
             try:
-                res = client.insert(collection_name=collection_name, data=batch)
-                pbar.update(len(batch))
+                rows = [{field: row[field] for field in self.fields} for row in batch]
+                res = self.client.insert(collection_name=self.collection_name, data=rows)
+                self.inserted += len(batch)
+                if self.on_inserted is not None:
+                    self.on_inserted(batch, list(res["ids"]))
             except Exception as e:
                 print(f"\nAn error occurred during batch insertion: {e}")
+                self.failed += len(batch)
+                if self.on_failed is not None:
+                    self.on_failed(batch)
+            if self.progress is not None:
+                self.progress.update(len(batch))
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def put(self, batch: list[dict]):
+        self.queue.put(batch)
+
+    def __exit__(self, *exc_info):
+        self.queue.put(self._DONE)
+        self._thread.join()
+
+def ingest_data(data_path: str, profile: str | None, batch_size: int = 128, queue_size: int = 4, dry_run: bool = False, workers: int = None, client: MilvusClient = None, collection_name: str = None) -> dict | None:
+    """
+    Incrementally streams documents from a specified path into the Milvus knowledge
+    base according to the selected deployment profile:
+    file discovery -> manifest diff -> chunking -> micro-batch embedding -> batched insert.
+    Only new or changed chunks are embedded; rows of removed chunks and files are deleted.
+    Returns a summary of the run (None for dry runs or when nothing was found).
+    A client may be passed in place of the one built from MILVUS_URI, profile=None
+    keeps the configuration that is already loaded, and collection_name overrides the
+    profile's collection (e.g. to fill a new version during a blue/green rebuild).
+    With milvus.chunk_store enabled, chunk text and source go to the local chunk store
+    and Milvus only receives the vectors, unless the collection was created with text
+    fields, in which case full rows are written until it is rebuilt.
+    """
+    # 1. Load the specified deployment configuration and the ingestion manifest
+    ConfigLoader.load(profile)
+    config = ConfigLoader.load()
+    embedding_config = config['embedding']
+    collection_name = collection_name or config['milvus']['collection_name']
+    manifest = IngestionManifest.load(collection_name)
+    store = ChunkStore(collection_name) if chunk_store_enabled(config['milvus']) else None
+    client = client or MilvusClient(uri=os.getenv("MILVUS_URI"), token=os.getenv("MILVUS_TOKEN"))
+    if store is not None and "chunk_text" in {field['name'] for field in client.describe_collection(collection_name)['fields']}:
+        # The schema was created before the chunk store was enabled; slim rows would be rejected.
+        print(
+            f"Warning: Collection '{collection_name}' still stores chunk text in Milvus, so full rows are written. "
+            "Rebuild it (milvus_setup --rebuild) to move chunk text into the local chunk store."
+        )
+        store = None
+    start = time.perf_counter()
+
+    # Rows ingested before the manifest existed can only be replaced by source.
+    replace_unknown_sources = not manifest.exists and int(client.get_collection_stats(collection_name).get('row_count', 0)) > 0
+    text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=150)
+    seen_files = 0
+
+    def tracked_changes():
+        nonlocal seen_files
+        for change in iter_file_changes(discover_files(data_path), manifest, text_splitter, replace_unknown_sources):
+            manifest.mark_seen(change["source"])
+            seen_files += 1
+            yield change
+
+    def deleted_sources():
+        return manifest.unseen_sources()
+
+    if dry_run:
+        try:
+            print_change_report(tracked_changes(), deleted_sources)
+        finally:
+            manifest.close()
+        return
+
+    # 2. Configure the BGE-M3 embedding workers based on the profile
+    # This intelligently switches between CPU (FP32 or ONNX int8, multi-process) and GPU (FP16, in-process)
+    embedder = EmbeddingWorkerPool(
+        embedding_config,
+        workers=workers or embedding_config.get('workers', 1),
+        intra_op_threads=embedding_config.get('intra_op_threads')
+    )
+
+    # 3. Apply deletions per file as it is diffed, and stream only the chunks that need embedding
+    deleted_chunks = 0
+
+    def delete_chunks(ids: list):
+        if ids:
+            client.delete(collection_name=collection_name, ids=ids)
+            if store is not None:
+                store.delete(ids)
+
+    def delete_source(source: str, ids: list):
+        # Store-backed collections have no source field to filter on; their ids come from the manifest or the store.
+        if store is None:
+            client.delete(collection_name=collection_name, filter=source_filter(source))
+        else:
+            delete_chunks(ids)
+
+    def chunks_to_insert():
+        nonlocal deleted_chunks
+        for change in tracked_changes():
+            if change["status"] == "unchanged":
                 continue
+            if change["delete_source"]:
+                delete_source(change["source"], store.ids_for_source(change["source"]) if store is not None else [])
+            if change["delete_ids"]:
+                delete_chunks(change["delete_ids"])
+                deleted_chunks += len(change["delete_ids"])
+            manifest.begin_file(change["source"], change["file_hash"], change["keep"])
+            yield from change["insert"]
+
+    def record_inserted(batch: list[dict], ids: list):
+        if store is not None:
+            store.append([(chunk_id, row["source"], row["chunk_text"]) for row, chunk_id in zip(batch, ids)])
+        for row, chunk_id in zip(batch, ids):
+            manifest.add_chunks(row["source"], [[row["chunk_hash"], chunk_id]])
+        # Committed after every insert, so an interrupted run can't insert these chunks a second time.
+        manifest.save()
+
+    def record_failed(batch: list[dict]):
+        for row in batch:
+            manifest.mark_failed(row["source"])
+        manifest.save()
+
+    try:
+        # 4. Embed and ingest micro-batches, overlapping embedding with Milvus inserts
+        print(f"Streaming changed chunks from '{data_path}' into Milvus collection '{collection_name}' (batch size {batch_size})...")
+        with embedder, tqdm(desc="Ingesting Chunks", unit="chunk") as pbar:
+            print(f"BGE-M3 embedding initialized with {embedder.describe()}.")
+            with MilvusBatchWriter(client, collection_name, queue_size=queue_size, progress=pbar,
+                                   on_inserted=record_inserted, on_failed=record_failed,
+                                   fields=VECTOR_FIELDS if store is not None else KNOWLEDGE_FIELDS) as writer:
+                for batch in embedder.embed_batches(iter_batches(chunks_to_insert(), batch_size)):
+                    writer.put(batch)
+
+        # 5. Remove files that no longer exist on disk
+        removed_files = deleted_sources()
+        for source in removed_files:
+            delete_source(source, [chunk_id for _, chunk_id in manifest.get(source)["chunks"]])
+            manifest.remove(source)
 
-    print("Data ingestion complete. Flushing collection to ensure data is searchable...")
+        manifest.finalize()
+    finally:
+        # Files an interruption cut short keep no hash and are re-diffed, reusing the chunks recorded so far.
+        manifest.close()
+
+    if not seen_files and not removed_files:
+        print(f"Error: No documents found at path '{data_path}'. Please check the path and file extensions.")
+        return
+
+    print(
+        f"Ingested {writer.inserted} chunks ({writer.failed} failed), deleted {deleted_chunks} stale chunks "
+        f"and {len(removed_files)} removed file(s). Flushing collection to ensure data is searchable..."
+    )
+    if embedder.embedded_chunks:
+        print(f"Embedding throughput: {embedder.chunks_per_second:.1f} chunks/sec with {embedder.describe()}.")
     client.flush(collection_name=collection_name)
+    # Cached retrieval results for this collection are now stale in every running process.
+    bump_collection_generation(collection_name)
     print("Collection flushed successfully.")
+    return {
+        "inserted": writer.inserted, "failed": writer.failed, "deleted_chunks": deleted_chunks, "removed_files": len(removed_files),
+        "embedded_chunks": embedder.embedded_chunks, "embedding_seconds": embedder.embedding_seconds,
+        "embedding_chunks_per_second": embedder.chunks_per_second, "total_seconds": time.perf_counter() - start,
+    }
 
 if __name__ == "__main__":
     # Ensure environment variables are loaded for standalone execution
     load_dotenv()
-    
+
     parser = argparse.ArgumentParser(description="Ingest documents into the HyDRA knowledge base.")
     parser.add_argument(
-        "--path", 
-        type=str, 
-        required=True, 
+        "--path",
+        type=str,
+        required=True,
         help="Path to the directory containing documents to ingest."
     )
     parser.add_argument(
-        "--profile", 
-        type=str, 
-        required=True, 
+        "--profile",
+        type=str,
+        required=True,
         help="The deployment profile to use (e.g., 'development', 'production_balanced')."
     )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=128,
+        help="Number of chunks embedded and inserted per micro-batch."
+    )
+    parser.add_argument(
+        "--queue-size",
+        type=int,
+        default=4,
+        help="Maximum number of embedded batches waiting to be inserted."
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Number of embedding worker processes on CPU (defaults to the profile's embedding.workers)."
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Only report which files and chunks would be added, updated or deleted."
+    )
     args = parser.parse_args()
-    
+
     if not os.path.isdir(args.path):
         print(f"Error: Provided path '{args.path}' is not a valid directory.")
     else:
-        ingest_data(args.path, args.profile)
\ No newline at end of file
+        ingest_data(args.path, args.profile, batch_size=args.batch_size, queue_size=args.queue_size, dry_run=args.dry_run, workers=args.workers)
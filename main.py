@@ -1,14 +1,18 @@
 import os
+import asyncio
 import argparse
 from dotenv import load_dotenv
 from src.tui.handler import TUIHandler
 from src.utils.config_loader import ConfigLoader
+from src.services.component_registry import ComponentRegistry
+from src.services.tracing import Tracer
 from rich.console import Console
 
 def main():
     """
     Main entrypoint for the HyDRA RAG Agent application.
-    Initializes the system and starts the interactive TUI chat handler.
+    Initializes the system and starts the interactive TUI chat handler,
+    the headless API server (--serve), or an offline batch run (--batch).
     """
     # Load environment variables from a .env file
     load_dotenv()
@@ -32,6 +36,17 @@ def main():
         default="default_user", 
         help="A unique identifier for the user, used for personalization and memory."
     )
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="Run the headless HTTP/JSON API server (with SSE streaming) instead of the TUI."
+    )
+    parser.add_argument("--host", type=str, default=None, help="Server bind address. Defaults to the profile's server.host.")
+    parser.add_argument("--port", type=int, default=None, help="Server port. Defaults to the profile's server.port.")
+    parser.add_argument("--batch", type=str, default=None, help="Answer every query in this JSONL file ({\"query\": ...} per line) instead of starting the TUI.")
+    parser.add_argument("--out", type=str, default="answers.jsonl", help="Output JSONL for --batch. An existing file is resumed, not overwritten.")
+    parser.add_argument("--concurrency", type=int, default=None, help="Queries in flight for --batch. Defaults to the profile's batch.concurrency.")
+    parser.add_argument("--qps", type=float, default=None, help="LLM calls per second for --batch. Defaults to the profile's batch.llm_qps (0 disables the limit).")
     args = parser.parse_args()
 
     # --- API Key Validation ---
@@ -52,6 +67,18 @@ def main():
         console.print(f"{e}")
         return
         
+    if args.serve:
+        serve(gemini_api_key, args, console)
+        return
+    # The API server exposes /metrics itself; the other modes use a side port when one is configured.
+    metrics_port = ConfigLoader.load().get('observability', {}).get('metrics_port')
+    if metrics_port:
+        Tracer.serve_metrics(metrics_port)
+        console.print(f"[dim]Prometheus metrics at http://127.0.0.1:{metrics_port}/metrics[/dim]")
+    if args.batch:
+        run_batch(gemini_api_key, args, console)
+        return
+
     # --- Application Launch ---
     # Initializes and starts the main Terminal User Interface handler.
     try:
@@ -62,5 +89,54 @@ def main():
         console.print(f"{e}")
         console.print("Please check your configuration and ensure all services (like Milvus) are running correctly.")
 
+def serve(gemini_api_key: str, args, console: Console):
+    """Warms up the shared components once and serves every session from this process."""
+    from src.server.app import HydraServer
+
+    server_config = dict(ConfigLoader.load().get('server', {}))
+    if args.host: server_config['host'] = args.host
+    if args.port: server_config['port'] = args.port
+
+    with console.status("[bold yellow]Loading models and connections...[/bold yellow]", spinner="dots"):
+        ComponentRegistry.warm_up()
+        ComponentRegistry.get_retriever()
+    for label, seconds in ComponentRegistry.load_stats():
+        console.print(f"[dim]Loaded {label} in {seconds:.2f}s[/dim]")
+
+    server = HydraServer(gemini_api_key, server_config)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        if not ComponentRegistry.shutdown():
+            console.print("[dim]Some learning tasks are still pending; they will be resumed on the next start.[/dim]")
+        console.print("\n[bold yellow]HyDRA server stopped.[/bold yellow]")
+
+def run_batch(gemini_api_key: str, args, console: Console):
+    """Answers a JSONL file of queries with warm shared components, then prints a latency summary."""
+    from src.core.batch_runner import BatchRunner
+
+    batch_config = ConfigLoader.load().get('batch', {})
+    concurrency = args.concurrency or batch_config.get('concurrency', 4)
+    qps = args.qps if args.qps is not None else batch_config.get('llm_qps')
+    # Set before warm-up so every LLM client borrowed from the registry is limited.
+    rate_limiter = ComponentRegistry.set_llm_rate_limit(qps)
+
+    with console.status("[bold yellow]Loading models and connections...[/bold yellow]", spinner="dots"):
+        ComponentRegistry.warm_up()
+        ComponentRegistry.get_retriever()
+
+    runner = BatchRunner(gemini_api_key, concurrency=concurrency, console=console)
+    try:
+        summary = runner.run(args.batch, args.out, user_id=args.user_id)
+        runner.print_summary(summary, rate_limiter)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if not ComponentRegistry.shutdown():
+            console.print("[dim]Some learning tasks are still pending; they will be resumed on the next start.[/dim]")
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,21 +1,21 @@
 # src/agents/adaptive_coordinator.py
-import os
-import yaml
-import uuid
 from langchain_core.prompts import PromptTemplate
-from langchain_google_genai import ChatGoogleGenerativeAI
+from src.services.component_registry import ComponentRegistry
+from src.utils.config_loader import get_agent_config
+from src.services.tracing import Tracer
 from .memory_agent import HydraMemoryAgent
 from .executors.vector import AdvancedVectorSearchAgent
 from .executors.deep_search import DeepSearchAgent
 
 class AdaptiveCoordinator:
-    def __init__(self, gemini_api_key: str, user_id: str, session_id: str):
-        self.llm = ChatGoogleGenerativeAI(model="gemini-1.5-pro-latest", google_api_key=gemini_api_key, temperature=0.0)
+    def __init__(self, gemini_api_key: str, user_id: str, session_id: str, memory_agent: HydraMemoryAgent = None, learning_worker=None):
+        self.llm = ComponentRegistry.get_llm(temperature=0.0, gemini_api_key=gemini_api_key, agent='coordinator')
         self.user_id = user_id
         self.session_id = session_id
-        self.memory_agent = HydraMemoryAgent()
-        with open("configs/agents.yaml", 'r') as f:
-            self.prompt = PromptTemplate.from_template(yaml.safe_load(f)['coordinator']['delegation_prompt'])
+        self.memory_agent = memory_agent or HydraMemoryAgent()
+        self.learning_worker = learning_worker
+        self.router = ComponentRegistry.get_policy_router()
+        self.prompt = PromptTemplate.from_template(get_agent_config('coordinator')['delegation_prompt'])
         
         self.executors = {
             "AdvancedVectorSearchAgent": AdvancedVectorSearchAgent(),
@@ -23,22 +23,43 @@ class AdaptiveCoordinator:
         }
         self.executor_descriptions = "\n".join([f"- {name}: {agent.description}" for name, agent in self.executors.items()])
 
-    def delegate_task(self, sub_task: str) -> tuple[str, str, str]:
-        strategic_guidance = self.memory_agent.retrieve_strategic_guidance(self.user_id, sub_task)
-        
+    def _select_expert(self, sub_task: str, neighbors: list[dict]) -> str:
         prompt = self.prompt.format(
             executor_descriptions=self.executor_descriptions,
             sub_task=sub_task,
-            strategic_guidance=strategic_guidance
+            strategic_guidance=HydraMemoryAgent.format_strategic_guidance(neighbors)
         )
-        expert_name = self.llm.invoke(prompt).content.strip().replace("'", "").replace("\"", "")
+        return self.llm.invoke(prompt).content.strip().replace("'", "").replace("\"", "")
+
+    def delegate_task(self, sub_task: str) -> tuple[str, str, str, list[dict]]:
+        """Runs a sub-task on the chosen executor. Returns its result text, the executor, the strategy and any retrieved documents."""
+        with Tracer.span("routing", mode="llm" if self.router is None else "learned") as span:
+            if self.router is None:
+                neighbors = self.memory_agent.retrieve_policy_neighbors(self.user_id, sub_task)
+                expert_name = self._select_expert(sub_task, neighbors)
+                span.update(neighbors=len(neighbors), llm_call=True)
+            else:
+                # The learned router answers from past policy feedback; the LLM is only asked when it is unsure.
+                decision = self.router.route(self.user_id, sub_task, self.executors)
+                if decision["expert"] is not None and not decision["shadow"]:
+                    expert_name = decision["expert"]
+                else:
+                    expert_name = self._select_expert(sub_task, decision["neighbors"][:5])
+                    self.router.record_llm_decision(decision, expert_name)
+                span.update(neighbors=len(decision["neighbors"]), confidence=round(decision["confidence"], 3), llm_call=decision["expert"] is None or decision["shadow"])
+            span["executor"] = expert_name
 
         if expert_name in self.executors:
-            response_dict = self.executors[expert_name].run(sub_task) 
+            with Tracer.span("executor", executor=expert_name) as span:
+                response_dict = self.executors[expert_name].run(sub_task)
+                span.update(strategy=response_dict.get('strategy_used', 'N/A'), result_chars=len(response_dict['result'] or ""))
             result = response_dict['result']
             strategy = response_dict.get('strategy_used', 'N/A')
             score = 1.0 if result and "not found" not in result.lower() else -0.5
-            self.memory_agent.save_policy_feedback(self.user_id, self.session_id, sub_task, expert_name, strategy, score)
-            return result, expert_name, strategy
+            if self.learning_worker is not None:
+                self.learning_worker.submit_memory(HydraMemoryAgent.policy_feedback_memory(self.user_id, self.session_id, sub_task, expert_name, strategy, score))
+            else:
+                self.memory_agent.save_policy_feedback(self.user_id, self.session_id, sub_task, expert_name, strategy, score)
+            return result, expert_name, strategy, response_dict.get('documents', [])
         else:
-            return f"Error: The coordinator selected an unknown executor '{expert_name}'. Valid executors are: {list(self.executors.keys())}", "Unknown", "N/A"
\ No newline at end of file
+            return f"Error: The coordinator selected an unknown executor '{expert_name}'. Valid executors are: {list(self.executors.keys())}", "Unknown", "N/A", []
\ No newline at end of file
@@ -1,24 +1,40 @@
 # src/agents/executors/deep_search.py
-from duckduckgo_search import DDGS
+from src.services.component_registry import ComponentRegistry
+from src.services.tracing import Tracer
 
 class DeepSearchAgent:
     def __init__(self):
         self.description = "Best for complex research tasks requiring up-to-date information from the internet. Uses DuckDuckGo for privacy-first web search."
-        self.search_tool = DDGS()
+        self.searcher = ComponentRegistry.get_web_searcher()
 
     def _format_results(self, results: list) -> str:
         if not results: return "No search results found."
         formatted = ""
         for i, res in enumerate(results, 1):
-            formatted += f"Result {i}:\n  Title: {res.get('title')}\n  Snippet: {res.get('body')}\n  URL: {res.get('href')}\n\n"
+            formatted += f"Result {i}:\n  Title: {res.get('title')}\n  Snippet: {res.get('body')}\n  URL: {res.get('href')}\n"
+            if res.get('content'):
+                formatted += f"  Page: {res['content']}\n"
+            formatted += "\n"
         return formatted
 
+    def _document_items(self, results: list) -> list[dict]:
+        """Structured form of the search hits. Snippets carry no relevance score; context assembly reranks them."""
+        return [
+            {"id": res.get('href'), "source": res.get('href') or 'web', "text": f"{res.get('title')}\n{res.get('content') or res.get('body')}", "score": None}
+            for res in results or [] if res.get('content') or res.get('body')
+        ]
+
     def run(self, query: str) -> dict:
         print(f"DeepSearchAgent searching for: '{query}'")
-        try:
-            search_results = self.search_tool.text(query, max_results=5)
-            formatted_results = self._format_results(search_results)
-        except Exception as e:
-            formatted_results = f"An error occurred during web search: {e}"
-            
-        return {"result": formatted_results, "strategy_used": "web_search"}
\ No newline at end of file
+        documents = []
+        with Tracer.span("web_search", backend=self.searcher.backend.name) as span:
+            try:
+                search_results = self.searcher.search(query)
+                formatted_results = self._format_results(search_results)
+                documents = self._document_items(search_results)
+                span["results"] = len(search_results or [])
+            except Exception as e:
+                formatted_results = f"An error occurred during web search: {e}"
+                span["error"] = str(e)
+
+        return {"result": formatted_results, "strategy_used": "web_search", "documents": documents}
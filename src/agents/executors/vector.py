@@ -1,33 +1,92 @@
 # src/agents/executors/vector.py
-import os
-import yaml
-import json
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from langchain_core.prompts import PromptTemplate
-from langchain_google_genai import ChatGoogleGenerativeAI
-from src.retrieval.engine import HyDRARetriever
+from src.services.component_registry import ComponentRegistry
+from src.utils.config_loader import get_agent_config, get_config
+from src.services.tracing import Tracer
 
 class AdvancedVectorSearchAgent:
     def __init__(self):
         self.description = "Best for semantic or conceptual questions about the internal knowledge base. Can autonomously choose the best strategy (direct vs. hypothetical document) to find information."
-        self.retriever = HyDRARetriever()
-        self.llm = ChatGoogleGenerativeAI(model="gemini-1.5-pro-latest", google_api_key=os.getenv("GEMINI_API_KEY"), temperature=0.0)
+        self.retriever = ComponentRegistry.get_retriever()
+        self.llm = ComponentRegistry.get_llm(temperature=0.0, agent='advanced_vector_search_agent')
         
-        with open("configs/agents.yaml", 'r') as f:
-            config = yaml.safe_load(f)['advanced_vector_search_agent']
+        config = get_agent_config('advanced_vector_search_agent')
         
         self.strategy_prompt = PromptTemplate.from_template(config['strategy_selection_prompt'])
         self.hyde_prompt = PromptTemplate.from_template(config['hyde_generation_prompt'])
+        self._speculation_pool = ComponentRegistry.get_speculation_pool()
 
     def _decide_strategy(self, query: str) -> str:
         prompt = self.strategy_prompt.format(query=query)
-        response = self.llm.invoke(prompt).content.lower().strip()
-        return 'hyde' if 'hyde' in response else 'direct'
+        with Tracer.span("strategy_selection") as span:
+            response = self.llm.invoke(prompt).content.lower().strip()
+            span["strategy"] = 'hyde' if 'hyde' in response else 'direct'
+        return span["strategy"]
 
     def _generate_hyde_doc(self, query: str) -> str:
         prompt = self.hyde_prompt.format(query=query)
-        return self.llm.invoke(prompt).content
+        with Tracer.span("hyde") as span:
+            hyde_doc = self.llm.invoke(prompt).content
+            span["document_chars"] = len(hyde_doc)
+        return hyde_doc
+
+    def _format_documents(self, docs: list) -> str:
+        if not docs:
+            return "No relevant information found in the knowledge base."
+        return "\n\n".join([f"Source: {doc.metadata.get('source', 'N/A')}\nContent: {doc.page_content}" for doc in docs])
+
+    def _document_items(self, docs: list) -> list[dict]:
+        """Structured form of the retrieved chunks, for context assembly before synthesis."""
+        return [
+            {"id": doc.metadata.get('id'), "source": doc.metadata.get('source', 'N/A'), "text": doc.page_content, "score": doc.metadata.get('relevance_score')}
+            for doc in docs
+        ]
+
+    def _fuse(self, ranked_lists: list[list], rrf_k: int) -> list:
+        """Reciprocal Rank Fusion of several reranked document lists, deduplicated by source and content."""
+        fused = {}
+        for docs in ranked_lists:
+            for rank, doc in enumerate(docs):
+                key = (doc.metadata.get('source'), doc.page_content)
+                score, best = fused.get(key, (0.0, doc))
+                if doc.metadata.get('relevance_score', 0.0) > best.metadata.get('relevance_score', 0.0):
+                    best = doc
+                fused[key] = (score + 1.0 / (rrf_k + rank + 1), best)
+        ranked = sorted(fused.values(), key=lambda item: item[0], reverse=True)
+        return [doc for _, doc in ranked[:self.retriever.top_k_final]]
+
+    def run_speculative(self, query: str, speculative_config: dict) -> dict:
+        """
+        Skips the strategy LLM call: direct retrieval starts immediately while the HyDE document
+        is generated in parallel. If the direct results are already confident the HyDE branch is
+        abandoned, otherwise both candidate sets are fused with RRF. Abandoning only saves the
+        HyDE call if it has not started yet; a call already in flight runs to completion in the
+        background. The HyDE document is waited for at most `hyde_timeout_seconds`, after which
+        the direct results are used.
+        """
+        hyde_future = self._speculation_pool.submit(Tracer.propagate(self._generate_hyde_doc), query)
+        direct_docs = self.retriever.invoke(query)
+
+        top_score = max((doc.metadata.get('relevance_score', 0.0) for doc in direct_docs), default=0.0)
+        if direct_docs and top_score >= speculative_config.get('confidence_threshold', 0.7):
+            hyde_future.cancel()
+            return {"result": self._format_documents(direct_docs), "strategy_used": "direct", "documents": self._document_items(direct_docs)}
+
+        try:
+            hyde_doc = hyde_future.result(timeout=speculative_config.get('hyde_timeout_seconds', 20))
+        except FutureTimeoutError:
+            Tracer.annotate(hyde_timeout=True)
+            return {"result": self._format_documents(direct_docs), "strategy_used": "direct", "documents": self._document_items(direct_docs)}
+        hyde_docs = self.retriever.invoke(hyde_doc)
+        fused_docs = self._fuse([direct_docs, hyde_docs], speculative_config.get('rrf_k', 60))
+        return {"result": self._format_documents(fused_docs), "strategy_used": "hyde_fused", "documents": self._document_items(fused_docs)}
 
     def run(self, query: str) -> dict:
+        speculative_config = get_config().get('retrieval', {}).get('speculative', {})
+        if speculative_config.get('enabled', False):
+            return self.run_speculative(query, speculative_config)
+
         strategy = self._decide_strategy(query)
         
         if strategy == 'hyde':
@@ -37,6 +96,4 @@ class AdvancedVectorSearchAgent:
             
         docs = self.retriever.invoke(search_query)
         
-        result_text = "\n\n".join([f"Source: {doc.metadata.get('source', 'N/A')}\nContent: {doc.page_content}" for doc in docs]) if docs else "No relevant information found in the knowledge base."
-        
-        return {"result": result_text, "strategy_used": strategy}
\ No newline at end of file
+        return {"result": self._format_documents(docs), "strategy_used": strategy, "documents": self._document_items(docs)}
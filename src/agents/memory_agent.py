@@ -0,0 +1,147 @@
+# src/agents/memory_agent.py
+import json
+import time
+import uuid
+import numpy as np
+from src.services.component_registry import ComponentRegistry
+from src.services.milvus_setup import MEMORY_COLLECTION
+from src.retrieval.cache import collection_generation
+from src.utils.config_loader import get_config
+
+MAX_CONTENT_LENGTH = 8192
+MAX_PREFERENCES = 20
+POLICY_TYPES = ["policy_feedback", "policy_stats"]
+# Milvus caps a single query at 16384 rows; retention keeps each user's policy rows far below it.
+MAX_POLICY_ROWS = 16384
+
+class HydraMemoryAgent:
+    def __init__(self):
+        self.embedding_function = ComponentRegistry.get_embedding_function()
+        self.client = ComponentRegistry.get_milvus_client()
+        self.cache = ComponentRegistry.get_memory_cache()
+
+    def _embed(self, text: str):
+        return self.embedding_function([text])['dense'][0]
+
+    @staticmethod
+    def memory(user_id: str, session_id: str, memory_type: str, content: str, metadata: dict = None, vector_text: str = None) -> dict:
+        """Describes one memory row before it is embedded; plain JSON so it can be queued."""
+        # The creation time drives retention and compaction (see src/services/memory_maintenance.py).
+        return {
+            "user_id": user_id, "session_id": session_id, "memory_type": memory_type,
+            "content": content, "metadata": {**(metadata or {}), "created_at": time.time()}, "vector_text": vector_text or content,
+        }
+
+    @classmethod
+    def preference_memory(cls, user_id: str, preference: str, session_id: str = "global") -> dict:
+        return cls.memory(user_id, session_id, "preference", preference)
+
+    @classmethod
+    def interaction_summary_memory(cls, user_id: str, session_id: str, query: str, final_answer: str) -> dict:
+        # The knowledge collection's write generation lets the semantic answer cache skip answers built on stale data.
+        collection_name = get_config()['milvus']['collection_name']
+        metadata = {
+            "query": query, "complete": len(final_answer) <= MAX_CONTENT_LENGTH,
+            "collection": collection_name, "generation": collection_generation(collection_name),
+        }
+        return cls.memory(user_id, session_id, "interaction_summary", final_answer, metadata=metadata, vector_text=query)
+
+    @classmethod
+    def policy_feedback_memory(cls, user_id: str, session_id: str, sub_task: str, expert: str, strategy: str, score: float) -> dict:
+        metadata = {"expert": expert, "strategy": strategy, "score": score}
+        return cls.memory(user_id, session_id, "policy_feedback", sub_task, metadata=metadata)
+
+    def save_many(self, memories: list[dict]):
+        """Embeds all memories in one forward pass and writes them with a single insert."""
+        if not memories:
+            return
+        vectors = self.embedding_function([m["vector_text"] for m in memories])['dense']
+        rows = [{
+            "id": str(uuid.uuid4()),
+            "user_id": m["user_id"],
+            "session_id": m["session_id"],
+            "memory_type": m["memory_type"],
+            "content": m["content"][:MAX_CONTENT_LENGTH],
+            "vector": vector,
+            "metadata": m["metadata"],
+        } for m, vector in zip(memories, vectors)]
+        self.client.insert(collection_name=MEMORY_COLLECTION, data=rows)
+        if self.cache is not None:
+            self.cache.record(rows)
+
+    def save_preference(self, user_id: str, preference: str, session_id: str = "global"):
+        self.save_many([self.preference_memory(user_id, preference, session_id)])
+
+    def _load_preferences(self, user_id: str) -> list[str]:
+        rows = self.client.query(
+            collection_name=MEMORY_COLLECTION,
+            filter=f'user_id == {json.dumps(user_id)} and memory_type == "preference"',
+            output_fields=["content"], limit=MAX_PREFERENCES
+        )
+        return [row['content'] for row in rows]
+
+    def retrieve_preferences(self, user_id: str) -> str:
+        if self.cache is not None:
+            preferences = self.cache.preferences(user_id, lambda: self._load_preferences(user_id))[-MAX_PREFERENCES:]
+        else:
+            preferences = self._load_preferences(user_id)
+        if not preferences:
+            return "No specific preferences recorded."
+        return "\n".join(f"- {preference}" for preference in preferences)
+
+    def save_interaction_summary(self, user_id: str, session_id: str, query: str, final_answer: str):
+        self.save_many([self.interaction_summary_memory(user_id, session_id, query, final_answer)])
+
+    def save_policy_feedback(self, user_id: str, session_id: str, sub_task: str, expert: str, strategy: str, score: float):
+        self.save_many([self.policy_feedback_memory(user_id, session_id, sub_task, expert, strategy, score)])
+
+    @staticmethod
+    def _neighbor(content: str, meta: dict, similarity: float) -> dict:
+        # Raw feedback rows stand for one delegation; policy_stats rows for `count` of them, with their mean score.
+        return {
+            "sub_task": content, "expert": meta.get('expert'), "strategy": meta.get('strategy'),
+            "score": float(meta.get('score', 0.0)), "count": int(meta.get('count', 1)), "similarity": float(similarity),
+        }
+
+    def _load_policy(self, user_id: str) -> list[dict]:
+        return self.client.query(
+            collection_name=MEMORY_COLLECTION,
+            filter=f'user_id == {json.dumps(user_id)} and memory_type in {json.dumps(POLICY_TYPES)}',
+            output_fields=["content", "metadata", "vector"], limit=MAX_POLICY_ROWS
+        )
+
+    def retrieve_policy_neighbors(self, user_id: str, sub_task: str, limit: int = 5) -> list[dict]:
+        """
+        Returns the most similar past sub-tasks with the expert, strategy and score they received.
+        With the hot cache the user's policy rows are scored in-process, without a Milvus round trip.
+        """
+        if self.cache is not None:
+            rows, vectors = self.cache.policy(user_id, lambda: self._load_policy(user_id))
+            if not rows:
+                return []
+            similarities = vectors @ np.asarray(self._embed(sub_task), dtype=np.float32)
+            top = np.argsort(-similarities)[:limit]
+            return [self._neighbor(rows[i].get('content'), rows[i].get('metadata') or {}, similarities[i]) for i in top]
+
+        results = self.client.search(
+            collection_name=MEMORY_COLLECTION, data=[self._embed(sub_task)], anns_field="vector",
+            filter=f'user_id == {json.dumps(user_id)} and memory_type in {json.dumps(POLICY_TYPES)}',
+            limit=limit, output_fields=["content", "metadata"]
+        )
+        if not results or not results[0]:
+            return []
+        return [self._neighbor(hit['entity'].get('content'), hit['entity'].get('metadata') or {}, hit['distance']) for hit in results[0]]
+
+    @staticmethod
+    def format_strategic_guidance(neighbors: list[dict]) -> str:
+        if not neighbors:
+            return "No prior strategic guidance available."
+        return "\n".join(
+            f"- Similar task '{n['sub_task']}' was handled by {n['expert']}/{n['strategy']} "
+            + (f"with score {n['score']}" if n.get('count', 1) == 1 else f"{n['count']} times with average score {n['score']:.2f}")
+            + f" (similarity {n['similarity']:.2f})."
+            for n in neighbors
+        )
+
+    def retrieve_strategic_guidance(self, user_id: str, sub_task: str, limit: int = 5) -> str:
+        return self.format_strategic_guidance(self.retrieve_policy_neighbors(user_id, sub_task, limit))
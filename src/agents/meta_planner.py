@@ -1,24 +1,47 @@
 # src/agents/meta_planner.py
-import yaml
 import json
 from langchain_core.prompts import PromptTemplate
-from langchain_google_genai import ChatGoogleGenerativeAI
-import os
+from src.services.component_registry import ComponentRegistry
+from src.utils.config_loader import get_agent_config
+from src.services.tracing import Tracer, usage_attributes
 
 class MetaPlannerAgent:
     def __init__(self, gemini_api_key: str):
-        self.llm = ChatGoogleGenerativeAI(model="gemini-1.5-pro-latest", google_api_key=gemini_api_key, temperature=0.0)
-        with open("configs/agents.yaml", 'r') as f:
-            self.prompt = PromptTemplate.from_template(yaml.safe_load(f)['meta_planner']['planning_prompt'])
+        self.llm = ComponentRegistry.get_llm(temperature=0.0, gemini_api_key=gemini_api_key, agent='meta_planner')
+        self.prompt = PromptTemplate.from_template(get_agent_config('meta_planner')['planning_prompt'])
 
-    def generate_plan(self, query: str) -> list[str]:
+    def _parse_plan(self, plan: list) -> tuple[list[str], list[list[int]]]:
+        """
+        Accepts both plain string plans and {"task", "depends_on"} objects.
+        Dependencies may only point at earlier sub-tasks, which keeps the graph acyclic.
+        """
+        tasks, dependencies = [], []
+        for i, step in enumerate(plan):
+            if isinstance(step, dict):
+                tasks.append(str(step.get("task", "")))
+                deps = step.get("depends_on") or []
+                dependencies.append(sorted({d for d in deps if isinstance(d, int) and 0 <= d < i}))
+            else:
+                tasks.append(str(step))
+                dependencies.append([])
+        return tasks, dependencies
+
+    def generate_plan_graph(self, query: str) -> tuple[list[str], list[list[int]]]:
         prompt = self.prompt.format(query=query)
-        response = self.llm.invoke(prompt).content
+        message = self.llm.invoke(prompt)
+        Tracer.annotate(**usage_attributes(message))
+        response = message.content
         try:
             # Clean the response to ensure it's valid JSON
             clean_response = response.strip().replace("```json", "").replace("```", "")
             plan = json.loads(clean_response)
-            return plan if isinstance(plan, list) else [query]
+            if not isinstance(plan, list) or not plan:
+                return [query], [[]]
+            return self._parse_plan(plan)
         except json.JSONDecodeError:
             print(f"Warning: Meta-Planner failed to generate a valid JSON plan. Falling back to a single task.")
-            return [query]
\ No newline at end of file
+            return [query], [[]]
+
+    def generate_plan(self, query: str) -> list[str]:
+        tasks, _ = self.generate_plan_graph(query)
+        return tasks
@@ -0,0 +1,35 @@
+# src/agents/post_interaction_analyzer.py
+import json
+from langchain_core.prompts import PromptTemplate
+from src.services.component_registry import ComponentRegistry
+from src.utils.config_loader import get_agent_config
+from src.services.tracing import Tracer, usage_attributes
+from .memory_agent import HydraMemoryAgent
+
+class PostInteractionAnalyzer:
+    def __init__(self, gemini_api_key: str):
+        self.llm = ComponentRegistry.get_llm(temperature=0.0, gemini_api_key=gemini_api_key, agent='post_interaction_analyzer')
+        self.prompt = PromptTemplate.from_template(get_agent_config('post_interaction_analyzer')['preference_inference_prompt'])
+        self.memory_agent = HydraMemoryAgent()
+
+    def infer_preferences(self, transcript: str) -> list[str]:
+        prompt = self.prompt.format(transcript=transcript)
+        with Tracer.span("analyzer", transcript_chars=len(transcript)) as span:
+            message = self.llm.invoke(prompt)
+            span.update(usage_attributes(message))
+        response = message.content
+        try:
+            clean_response = response.strip().replace("```json", "").replace("```", "")
+            preferences = json.loads(clean_response)
+        except json.JSONDecodeError:
+            print("Warning: PostInteractionAnalyzer returned invalid JSON. No preferences learned.")
+            return []
+
+        if not isinstance(preferences, list):
+            return []
+        return [str(preference) for preference in preferences]
+
+    def analyze_and_learn(self, transcript: str, user_id: str, session_id: str) -> list[str]:
+        preferences = self.infer_preferences(transcript)
+        self.memory_agent.save_many([HydraMemoryAgent.preference_memory(user_id, p, session_id) for p in preferences])
+        return preferences
@@ -0,0 +1,78 @@
+# src/agents/router.py
+import time
+import random
+import threading
+
+class PolicyRouter:
+    """
+    Fast, local replacement for the coordinator's delegation LLM call. A kNN vote over
+    the user's most similar past sub-tasks, weighted by similarity and by the
+    HELP/SIMPSON policy score each delegation received, picks the executor. Low-confidence
+    decisions fall back to the LLM; a sample of confident ones is shadow-checked
+    against it to track the agreement rate.
+    """
+    def __init__(self, memory_agent, routing_config: dict):
+        self.memory_agent = memory_agent
+        self.k = routing_config.get('k', 10)
+        self.min_confidence = routing_config.get('min_confidence', 0.75)
+        self.min_similarity = routing_config.get('min_similarity', 0.6)
+        self.min_neighbors = routing_config.get('min_neighbors', 3)
+        self.shadow_rate = routing_config.get('shadow_rate', 0.1)
+        self._stats = {"routed": 0, "fallbacks": 0, "compared": 0, "agreed": 0, "latency_ms": 0.0, "decisions": 0}
+        self._lock = threading.Lock()
+
+    def _vote(self, neighbors: list[dict], valid_experts) -> tuple[str | None, float]:
+        votes = {}
+        support = 0
+        for n in neighbors:
+            if n['similarity'] < self.min_similarity or n['expert'] not in valid_experts:
+                continue
+            # An aggregated policy_stats neighbour carries the evidence of `count` delegations.
+            count = n.get('count', 1)
+            support += count
+            votes[n['expert']] = votes.get(n['expert'], 0.0) + n['similarity'] * n['score'] * count
+        if support < self.min_neighbors or not votes:
+            return None, 0.0
+        best = max(votes, key=votes.get)
+        total = sum(abs(v) for v in votes.values())
+        if votes[best] <= 0 or not total:
+            return None, 0.0
+        return best, votes[best] / total
+
+    def route(self, user_id: str, sub_task: str, valid_experts) -> dict:
+        """
+        Returns {"expert", "candidate", "confidence", "latency_ms", "neighbors", "shadow"}.
+        "expert" is None when the LLM should decide; "candidate" is the router's best guess either way.
+        """
+        start = time.perf_counter()
+        neighbors = self.memory_agent.retrieve_policy_neighbors(user_id, sub_task, limit=self.k)
+        candidate, confidence = self._vote(neighbors, valid_experts)
+        latency_ms = (time.perf_counter() - start) * 1000
+
+        confident = candidate is not None and confidence >= self.min_confidence
+        with self._lock:
+            self._stats["decisions"] += 1
+            self._stats["latency_ms"] += latency_ms
+            self._stats["routed" if confident else "fallbacks"] += 1
+        return {
+            "expert": candidate if confident else None, "candidate": candidate, "confidence": confidence,
+            "latency_ms": latency_ms, "neighbors": neighbors,
+            "shadow": confident and random.random() < self.shadow_rate,
+        }
+
+    def record_llm_decision(self, decision: dict, llm_expert: str):
+        """Tracks how often the router's guess matches the LLM's choice."""
+        if decision["candidate"] is None:
+            return
+        with self._lock:
+            self._stats["compared"] += 1
+            self._stats["agreed"] += int(decision["candidate"] == llm_expert)
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        decisions = stats.pop("decisions")
+        stats["avg_latency_ms"] = stats.pop("latency_ms") / decisions if decisions else 0.0
+        stats["routed_rate"] = stats["routed"] / decisions if decisions else 0.0
+        stats["agreement_rate"] = stats["agreed"] / stats["compared"] if stats["compared"] else None
+        return stats
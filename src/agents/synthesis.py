@@ -1,14 +1,28 @@
 # src/agents/synthesis.py
-import yaml
+from typing import Iterator
 from langchain_core.prompts import PromptTemplate
-from langchain_google_genai import ChatGoogleGenerativeAI
+from src.services.component_registry import ComponentRegistry
+from src.utils.config_loader import get_agent_config
+from src.services.tracing import Tracer, usage_attributes
 
 class SynthesisAgent:
     def __init__(self, gemini_api_key: str):
-        self.llm = ChatGoogleGenerativeAI(model="gemini-1.5-pro-latest", google_api_key=gemini_api_key, temperature=0.3)
-        with open("configs/agents.yaml", 'r') as f:
-            self.prompt = PromptTemplate.from_template(yaml.safe_load(f)['synthesis_agent']['final_answer_prompt'])
+        self.llm = ComponentRegistry.get_llm(temperature=0.3, gemini_api_key=gemini_api_key, agent='synthesis_agent')
+        self.prompt = PromptTemplate.from_template(get_agent_config('synthesis_agent')['final_answer_prompt'])
 
     def run(self, query: str, context: str, user_preferences: str) -> str:
         prompt_value = self.prompt.format(query=query, context=context, user_preferences=user_preferences)
-        return self.llm.invoke(prompt_value).content
\ No newline at end of file
+        response = self.llm.invoke(prompt_value)
+        Tracer.annotate(**usage_attributes(response))
+        return response.content
+
+    def stream(self, query: str, context: str, user_preferences: str) -> Iterator[str]:
+        """Yields the answer in chunks as the LLM produces them."""
+        prompt_value = self.prompt.format(query=query, context=context, user_preferences=user_preferences)
+        usage = {}
+        for chunk in self.llm.stream(prompt_value):
+            for key, count in usage_attributes(chunk).items():
+                usage[key] = usage.get(key, 0) + count
+            if chunk.content:
+                yield chunk.content
+        Tracer.annotate(**usage)
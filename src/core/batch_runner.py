@@ -0,0 +1,139 @@
+# src/core/batch_runner.py
+import os
+import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from rich.console import Console
+from rich.progress import Progress
+from rich.table import Table
+from src.core.reasoning_loop import ReasoningLoop
+
+def percentile(values: list[float], pct: float) -> float:
+    """Nearest-rank percentile."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))]
+
+def load_queries(path: str, default_user_id: str) -> list[dict]:
+    """Reads a JSONL file of {"query", "id"?, "user_id"?, "session_id"?} objects."""
+    session_id = f"batch-{os.path.splitext(os.path.basename(path))[0]}"
+    queries = []
+    with open(path, "r") as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if not isinstance(record, dict) or not str(record.get("query", "")).strip():
+                raise ValueError(f"{path}:{line_number}: every line needs a non-empty 'query'.")
+            queries.append({
+                "id": record.get("id", line_number), "query": record["query"],
+                "user_id": record.get("user_id", default_user_id), "session_id": record.get("session_id", session_id),
+            })
+    return queries
+
+def completed_ids(out_path: str) -> set:
+    """Ids already answered in a previous run of the same batch. Failed queries are retried."""
+    done = set()
+    if not os.path.exists(out_path):
+        return done
+    with open(out_path, "r") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # A torn last line from an interrupted run.
+            if record.get("error") is None:
+                done.add(json.dumps(record["id"]))
+    return done
+
+class BatchRunner:
+    """
+    Runs a file of queries through the ReasoningLoop with a fixed number of queries in flight.
+
+    All queries borrow the same warm components, and the shared retriever coalesces the
+    embedding and reranking work of concurrent queries into batches. Every answer is
+    appended to the output file as soon as it is ready, so an interrupted run resumes
+    where it stopped.
+    """
+    def __init__(self, gemini_api_key: str, concurrency: int = 4, console: Console = None):
+        self.gemini_api_key = gemini_api_key
+        self.concurrency = concurrency
+        self.console = console or Console()
+        self.loops = {}
+        self.stage_timings = {}
+        self.failed = 0
+        self._loops_lock = threading.Lock()
+        self._out_lock = threading.Lock()
+
+    def _loop(self, user_id: str, session_id: str) -> ReasoningLoop:
+        # ReasoningLoop.run keeps no per-query state, so queries of one session can share a loop.
+        with self._loops_lock:
+            key = (user_id, session_id)
+            if key not in self.loops:
+                self.loops[key] = ReasoningLoop(self.gemini_api_key, user_id, session_id)
+            return self.loops[key]
+
+    def _run_one(self, item: dict) -> dict:
+        timings = {}
+        start = time.perf_counter()
+        try:
+            answer = self._loop(item["user_id"], item["session_id"]).run(item["query"], callback=lambda message, category: None, timings=timings)
+            error = None
+        except Exception as e:
+            answer, error = None, str(e)
+        timings["total"] = time.perf_counter() - start
+        return {**item, "answer": answer, "error": error, "timings": {stage: round(s, 4) for stage, s in timings.items()}}
+
+    def _write(self, out, record: dict):
+        with self._out_lock:
+            out.write(json.dumps(record) + "\n")
+            out.flush()
+            os.fsync(out.fileno())
+            if record["error"] is None:
+                for stage, seconds in record["timings"].items():
+                    self.stage_timings.setdefault(stage, []).append(seconds)
+            else:
+                self.failed += 1
+
+    def run(self, queries_path: str, out_path: str, user_id: str = "batch_user") -> dict:
+        queries = load_queries(queries_path, user_id)
+        done = completed_ids(out_path)
+        pending = [item for item in queries if json.dumps(item["id"]) not in done]
+        if done:
+            self.console.print(f"Resuming: {len(queries) - len(pending)} of {len(queries)} queries already answered in '{out_path}'.")
+
+        start = time.perf_counter()
+        with open(out_path, "a") as out, ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="hydra-batch") as pool, Progress(console=self.console) as progress:
+            task = progress.add_task("Answering queries", total=len(pending))
+            futures = [pool.submit(self._run_one, item) for item in pending]
+            try:
+                for future in as_completed(futures):
+                    self._write(out, future.result())
+                    progress.advance(task)
+            except KeyboardInterrupt:
+                for future in futures:
+                    future.cancel()
+                self.console.print("[yellow]Interrupted. Finished answers are saved; rerun the same command to resume.[/yellow]")
+                raise
+        elapsed = time.perf_counter() - start
+        return {"total": len(queries), "skipped": len(queries) - len(pending), "processed": len(pending), "failed": self.failed, "elapsed_seconds": elapsed}
+
+    def print_summary(self, summary: dict, rate_limiter=None):
+        answered = summary["processed"] - summary["failed"]
+        throughput = answered / summary["elapsed_seconds"] if summary["elapsed_seconds"] else 0.0
+        self.console.print(
+            f"Answered [cyan]{answered}[/cyan] queries in [cyan]{summary['elapsed_seconds']:.1f}s[/cyan] "
+            f"([cyan]{throughput:.2f}[/cyan] queries/s, concurrency {self.concurrency}). "
+            f"Failed: [cyan]{summary['failed']}[/cyan], resumed past: [cyan]{summary['skipped']}[/cyan]."
+        )
+        if rate_limiter is not None:
+            self.console.print(f"LLM rate limit {rate_limiter.qps} QPS: {rate_limiter.calls} calls, {rate_limiter.waited_seconds:.1f}s spent waiting.")
+
+        table = Table(title="Stage Latency (s)", show_header=True, header_style="bold cyan")
+        for column in ["Stage", "Count", "Mean", "p50", "p95"]:
+            table.add_column(column, justify="left" if column == "Stage" else "right")
+        for stage, values in self.stage_timings.items():
+            table.add_row(stage, str(len(values)), f"{sum(values) / len(values):.2f}", f"{percentile(values, 50):.2f}", f"{percentile(values, 95):.2f}")
+        self.console.print(table)
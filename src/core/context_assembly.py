@@ -0,0 +1,111 @@
+# src/core/context_assembly.py
+import re
+import hashlib
+from src.services.component_registry import ComponentRegistry
+from src.retrieval.backends import score_pairs
+
+CHARS_PER_TOKEN = 4
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (about four characters per token for English text)."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+def simhash(text: str, shingle_size: int = 3) -> int:
+    """64-bit SimHash over word shingles. Near-duplicate texts differ in only a few bits."""
+    words = re.findall(r"\w+", text.lower())
+    shingles = [" ".join(words[i:i + shingle_size]) for i in range(max(1, len(words) - shingle_size + 1))]
+    weights = [0] * 64
+    for shingle in shingles:
+        value = int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(64):
+            weights[bit] += 1 if value >> bit & 1 else -1
+    return sum(1 << bit for bit in range(64) if weights[bit] > 0)
+
+def format_sub_task(sub_task: str, expert: str, strategy: str, result: str) -> str:
+    return f"Result for sub-task '{sub_task}' (using {expert}/{strategy}):\n{result}\n---\n"
+
+class ContextAssembler:
+    """
+    Builds the synthesis context from the structured documents of every sub-task.
+
+    Documents retrieved by several sub-tasks (same chunk id, or near-duplicate text by
+    SimHash distance) are kept once, under the first sub-task that found them. Web
+    snippets, which carry no relevance score, are scored with the shared reranker
+    against their sub-task. The best document of each sub-task is packed first, then
+    the rest by score until `max_tokens` is reached. Sub-tasks without documents keep
+    their result text.
+    """
+    def __init__(self, context_config: dict):
+        self.max_tokens = context_config.get('max_tokens', 6000)
+        self.near_duplicate_bits = context_config.get('near_duplicate_bits', 3)
+        self.rerank_unscored = context_config.get('rerank_unscored', True)
+
+    def _score_unscored(self, items: list[dict]):
+        unscored = [item for item in items if item["score"] is None]
+        if not unscored:
+            return
+        scores = score_pairs(ComponentRegistry.get_reranker(), [(item["sub_task"], item["text"]) for item in unscored]) if self.rerank_unscored else []
+        for rank, item in enumerate(unscored):
+            # Without a reranker pass, web snippets keep their search-engine order below scored chunks.
+            item["score"] = scores[rank] if scores else -1.0 - rank / len(unscored)
+
+    def _deduplicate(self, items: list[dict]) -> tuple[list[dict], int]:
+        kept, seen_ids = [], {}
+        for item in items:
+            match = seen_ids.get(item["id"]) if item["id"] is not None else None
+            if match is None:
+                match = next((other for other in kept if bin(other["hash"] ^ item["hash"]).count("1") <= self.near_duplicate_bits), None)
+            if match is None:
+                kept.append(item)
+                if item["id"] is not None:
+                    seen_ids[item["id"]] = item
+            elif item["score"] > match["score"]:
+                match["score"] = item["score"]
+        return kept, len(items) - len(kept)
+
+    def assemble(self, sub_task_results: list[tuple]) -> tuple[str, dict]:
+        """
+        sub_task_results holds (sub_task, result, expert, strategy, documents) in plan order.
+        Returns the context string and a report of what was deduplicated, dropped and saved.
+        """
+        naive_context = "".join(format_sub_task(sub_task, expert, strategy, result) for sub_task, result, expert, strategy, _ in sub_task_results)
+        items = [
+            {**document, "sub_task": sub_task, "position": position, "hash": simhash(document["text"])}
+            for position, (sub_task, _, _, _, documents) in enumerate(sub_task_results) for document in documents
+        ]
+        self._score_unscored(items)
+        items, duplicates = self._deduplicate(items)
+
+        # Every sub-task first gets its best document, then the remaining budget goes to the highest scores.
+        by_score = sorted(items, key=lambda item: item["score"], reverse=True)
+        best_per_sub_task = {}
+        for item in by_score:
+            best_per_sub_task.setdefault(item["position"], item)
+        best_ids = {id(item) for item in best_per_sub_task.values()}
+        ordered = list(best_per_sub_task.values()) + [item for item in by_score if id(item) not in best_ids]
+
+        fallback_tokens = sum(
+            estimate_tokens(format_sub_task(sub_task, expert, strategy, result))
+            for sub_task, result, expert, strategy, documents in sub_task_results if not documents
+        )
+        budget, selected = self.max_tokens - fallback_tokens, []
+        for item in ordered:
+            cost = estimate_tokens(f"[{item['source']}] {item['text']}\n\n")
+            if cost <= budget:
+                selected.append(item)
+                budget -= cost
+
+        context = ""
+        for position, (sub_task, result, expert, strategy, documents) in enumerate(sub_task_results):
+            if not documents:
+                context += format_sub_task(sub_task, expert, strategy, result)
+                continue
+            chosen = sorted((item for item in selected if item["position"] == position), key=lambda item: item["score"], reverse=True)
+            body = "\n\n".join(f"[{item['source']}] {item['text']}" for item in chosen) or "(Its documents appear under another sub-task or did not fit the context budget.)"
+            context += format_sub_task(sub_task, expert, strategy, body)
+
+        tokens_before, tokens_after = estimate_tokens(naive_context), estimate_tokens(context)
+        return context, {
+            "documents": len(items) + duplicates, "duplicates": duplicates, "dropped": len(items) - len(selected),
+            "tokens_before": tokens_before, "tokens_after": tokens_after, "tokens_saved": max(0, tokens_before - tokens_after),
+        }
@@ -1,44 +1,154 @@
 # src/core/reasoning_loop.py
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from src.agents.meta_planner import MetaPlannerAgent
 from src.agents.adaptive_coordinator import AdaptiveCoordinator
 from src.agents.synthesis import SynthesisAgent
 from src.agents.post_interaction_analyzer import PostInteractionAnalyzer
 from src.agents.memory_agent import HydraMemoryAgent
+from src.utils.config_loader import get_config
+from src.services.component_registry import ComponentRegistry
+from src.core.semantic_cache import SemanticAnswerCache
+from src.core.context_assembly import ContextAssembler, format_sub_task
+from src.services.tracing import Tracer
 
 class ReasoningLoop:
     def __init__(self, gemini_api_key: str, user_id: str, session_id: str):
         self.user_id = user_id
         self.session_id = session_id
+        self.memory_agent = HydraMemoryAgent()
+        self.learning_worker = ComponentRegistry.get_learning_worker()
         self.planner = MetaPlannerAgent(gemini_api_key)
-        self.coordinator = AdaptiveCoordinator(gemini_api_key, user_id, session_id)
+        self.coordinator = AdaptiveCoordinator(gemini_api_key, user_id, session_id, memory_agent=self.memory_agent, learning_worker=self.learning_worker)
         self.synthesis_agent = SynthesisAgent(gemini_api_key)
         self.analyzer = PostInteractionAnalyzer(gemini_api_key)
-        self.memory_agent = HydraMemoryAgent()
+        config = get_config()
+        semantic_cache_config = config.get('semantic_cache', {})
+        self.semantic_cache = SemanticAnswerCache(self.memory_agent, semantic_cache_config, config['milvus']['collection_name']) if semantic_cache_config.get('enabled', False) else None
+        context_config = config.get('reasoning', {}).get('context', {})
+        self.context_assembler = ContextAssembler(context_config) if context_config.get('enabled', False) else None
+
+    def _run_sub_task(self, sub_task: str, callback) -> tuple[str, str, str, list[dict]]:
+        callback(f"Executing sub-task: '{sub_task}'", "Coordination")
+        with Tracer.span("subtask") as span:
+            try:
+                result, expert, strategy, documents = self.coordinator.delegate_task(sub_task)
+            except Exception as e:
+                result, expert, strategy, documents = f"Error: sub-task failed: {e}", "Unknown", "N/A", []
+            span.update(executor=expert, strategy=strategy, documents=len(documents))
+        callback(f"Sub-task complete. Used {expert}.", "Execution")
+        return result, expert, strategy, documents
+
+    def _execute_plan(self, plan: list[str], dependencies: list[list[int]], callback) -> list[tuple[str, str, str, list[dict]]]:
+        """
+        Runs the plan as a DAG: every sub-task starts as soon as the sub-tasks it depends on
+        have finished, with at most `max_parallel_subtasks` in flight. Results keep plan order.
+        """
+        max_workers = get_config().get('reasoning', {}).get('max_parallel_subtasks', 4)
+        results = [None] * len(plan)
+        waiting_on = [set(deps) for deps in dependencies]
+        dependents = [[j for j, deps in enumerate(dependencies) if i in deps] for i in range(len(plan))]
+
+        with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="hydra-subtask") as pool:
+            in_flight = {
+                pool.submit(Tracer.propagate(self._run_sub_task), plan[i], callback): i
+                for i in range(len(plan)) if not waiting_on[i]
+            }
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    i = in_flight.pop(future)
+                    results[i] = future.result()
+                    for j in dependents[i]:
+                        waiting_on[j].discard(i)
+                        if not waiting_on[j]:
+                            in_flight[pool.submit(Tracer.propagate(self._run_sub_task), plan[j], callback)] = j
+        return results
+
+    def run(self, query: str, callback, on_token=None, timings: dict = None) -> str:
+        """
+        Runs the full pipeline for a query. When on_token is given, the final answer is
+        streamed to it chunk by chunk as it is generated; the full text is still returned.
+        When timings is given, it is filled with the seconds spent in each stage.
+        """
+        with Tracer.span("query", profile=get_config()['profile_name'], user_id=self.user_id, session_id=self.session_id, query_chars=len(query)):
+            return self._run(query, callback, on_token, timings)
+
+    def _run(self, query: str, callback, on_token, timings: dict) -> str:
+        timings = {} if timings is None else timings
+        stage_start = time.perf_counter()
+
+        def end_stage(name: str):
+            nonlocal stage_start
+            now = time.perf_counter()
+            timings[name] = now - stage_start
+            stage_start = now
+
+        if self.semantic_cache is not None:
+            with Tracer.span("semantic_cache") as span:
+                cached = self.semantic_cache.lookup(query, self.user_id)
+                span["hit"] = cached is not None
+            end_stage("semantic_cache")
+            if cached is not None:
+                callback(f"Answered from semantic cache (matched '{cached['query']}', similarity {cached['similarity']:.2f}).", "Cache")
+                if on_token is not None:
+                    on_token(cached['answer'])
+                return cached['answer']
 
-    def run(self, query: str, callback) -> str:
         callback("Generating strategic plan...", "Planning")
-        plan = self.planner.generate_plan(query)
+        with Tracer.span("planning") as span:
+            plan, dependencies = self.planner.generate_plan_graph(query)
+            span.update(subtasks=len(plan), dependencies=sum(len(deps) for deps in dependencies))
+        end_stage("planning")
         callback(f"Plan created: {plan}", "Planning")
 
-        execution_context = ""
         full_transcript = f"User Query: {query}\nPlan: {plan}\n---\n"
         user_preferences = self.memory_agent.retrieve_preferences(self.user_id)
 
-        for sub_task in plan:
-            callback(f"Executing sub-task: '{sub_task}'", "Coordination")
-            result, expert, strategy = self.coordinator.delegate_task(sub_task)
-            
-            summary = f"Result for sub-task '{sub_task}' (using {expert}/{strategy}):\n{result}\n---\n"
-            execution_context += summary
-            full_transcript += summary
-            callback(f"Sub-task complete. Used {expert}.", "Execution")
-        
+        sub_task_results = [
+            (sub_task, result, expert, strategy, documents)
+            for sub_task, (result, expert, strategy, documents) in zip(plan, self._execute_plan(plan, dependencies, callback))
+        ]
+        for sub_task, result, expert, strategy, _ in sub_task_results:
+            full_transcript += format_sub_task(sub_task, expert, strategy, result)
+        end_stage("execution")
+
+        if self.context_assembler is not None:
+            with Tracer.span("context_assembly") as span:
+                execution_context, report = self.context_assembler.assemble(sub_task_results)
+                span.update(report)
+            end_stage("context_assembly")
+            callback(
+                f"Context assembled: {report['documents']} documents, {report['duplicates']} duplicates removed, {report['dropped']} left out; "
+                f"~{report['tokens_after']} tokens (saved ~{report['tokens_saved']}).", "Synthesis"
+            )
+        else:
+            execution_context = "".join(format_sub_task(sub_task, expert, strategy, result) for sub_task, result, expert, strategy, _ in sub_task_results)
+
         callback("Synthesizing final answer...", "Synthesis")
-        final_answer = self.synthesis_agent.run(query, execution_context, user_preferences)
+        with Tracer.span("synthesis", context_chars=len(execution_context), streamed=on_token is not None) as span:
+            if on_token is None:
+                final_answer = self.synthesis_agent.run(query, execution_context, user_preferences)
+            else:
+                answer_chunks = []
+                for chunk in self.synthesis_agent.stream(query, execution_context, user_preferences):
+                    answer_chunks.append(chunk)
+                    on_token(chunk)
+                final_answer = "".join(answer_chunks)
+            span["answer_chars"] = len(final_answer)
+        end_stage("synthesis")
         full_transcript += f"\nFinal Answer: {final_answer}"
 
-        callback("Analyzing session for self-improvement...", "Learning")
-        self.analyzer.analyze_and_learn(full_transcript, self.user_id, self.session_id)
-        self.memory_agent.save_interaction_summary(self.user_id, self.session_id, query, final_answer)
+        if self.learning_worker is not None:
+            # Learning happens in the background; the answer is returned right away.
+            callback("Queued session for self-improvement.", "Learning")
+            self.learning_worker.submit_analysis(full_transcript, self.user_id, self.session_id)
+            self.learning_worker.submit_memory(HydraMemoryAgent.interaction_summary_memory(self.user_id, self.session_id, query, final_answer))
+        else:
+            callback("Analyzing session for self-improvement...", "Learning")
+            with Tracer.span("learning"):
+                self.analyzer.analyze_and_learn(full_transcript, self.user_id, self.session_id)
+                self.memory_agent.save_interaction_summary(self.user_id, self.session_id, query, final_answer)
+        end_stage("learning")
 
-        return final_answer
\ No newline at end of file
+        return final_answer
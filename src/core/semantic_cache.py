@@ -0,0 +1,53 @@
+# src/core/semantic_cache.py
+import json
+import threading
+from src.agents.memory_agent import HydraMemoryAgent
+from src.services.milvus_setup import MEMORY_COLLECTION
+from src.retrieval.cache import collection_generation
+
+class SemanticAnswerCache:
+    """
+    Answers paraphrases of earlier questions without running the pipeline. The query is
+    embedded with the already-loaded BGE-M3 model and matched against the interaction
+    summaries in hydra_memory_store. Only answers produced against the knowledge
+    collection's current write generation qualify, so re-ingestion invalidates them.
+    """
+    def __init__(self, memory_agent: HydraMemoryAgent, cache_config: dict, collection_name: str):
+        self.memory_agent = memory_agent
+        self.threshold = cache_config.get('similarity_threshold', 0.92)
+        self.scope = cache_config.get('scope', 'user')
+        self.collection_name = collection_name
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _filter(self, user_id: str) -> str:
+        conditions = [
+            'memory_type == "interaction_summary"',
+            f'metadata["collection"] == {json.dumps(self.collection_name)}',
+            f'metadata["generation"] == {json.dumps(collection_generation(self.collection_name))}',
+        ]
+        if self.scope == 'user':
+            conditions.append(f'user_id == {json.dumps(user_id)}')
+        return " and ".join(conditions)
+
+    def lookup(self, query: str, user_id: str) -> dict | None:
+        """Returns {"answer", "query", "similarity"} for the closest earlier answer above the threshold."""
+        results = self.memory_agent.client.search(
+            collection_name=MEMORY_COLLECTION, data=[self.memory_agent._embed(query)], anns_field="vector",
+            filter=self._filter(user_id), limit=3, output_fields=["content", "metadata"]
+        )
+        for hit in (results[0] if results else []):
+            meta = hit['entity'].get('metadata') or {}
+            if hit['distance'] >= self.threshold and meta.get('complete', False):
+                with self._lock:
+                    self.hits += 1
+                return {"answer": hit['entity'].get('content'), "query": meta.get('query'), "similarity": float(hit['distance'])}
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / lookups if lookups else 0.0}
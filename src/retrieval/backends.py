@@ -0,0 +1,51 @@
+# src/retrieval/backends.py
+
+def _device(embedding_config: dict) -> str:
+    return "cuda" if embedding_config.get('use_fp16', False) else "cpu"
+
+def describe_backend(embedding_config: dict) -> str:
+    backend = embedding_config.get('backend', 'torch')
+    if backend == 'onnx_int8':
+        return "ONNX int8 (CPU)"
+    if backend == 'hashing':
+        return "feature hashing (no model, benchmarks only)"
+    return f"{_device(embedding_config).upper()} ({'FP16' if embedding_config.get('use_fp16', False) else 'FP32'})"
+
+def create_embedding_function(embedding_config: dict, intra_op_threads: int = None):
+    """Builds the BGE-M3 embedding function for the inference backend selected in the profile."""
+    backend = embedding_config.get('backend', 'torch')
+    if backend == 'onnx_int8':
+        from src.retrieval.onnx_backend import OnnxBGEM3EmbeddingFunction
+        return OnnxBGEM3EmbeddingFunction(embedding_config.get('onnx_model_dir', 'models/onnx'), intra_op_threads=intra_op_threads)
+    if backend == 'hashing':
+        from src.retrieval.hashing_backend import HashingEmbeddingFunction
+        return HashingEmbeddingFunction()
+    if backend != 'torch':
+        raise ValueError(f"Unknown embedding backend '{backend}'. Expected 'torch', 'onnx_int8' or 'hashing'.")
+    from pymilvus.model.hybrid import BGEM3EmbeddingFunction
+    use_fp16 = embedding_config.get('use_fp16', False)
+    return BGEM3EmbeddingFunction(use_fp16=use_fp16, device=_device(embedding_config))
+
+def create_reranker(embedding_config: dict, intra_op_threads: int = None):
+    """Builds the BGE reranker for the inference backend selected in the profile."""
+    backend = embedding_config.get('backend', 'torch')
+    if backend == 'onnx_int8':
+        from src.retrieval.onnx_backend import OnnxBGERerankFunction
+        return OnnxBGERerankFunction(embedding_config.get('onnx_model_dir', 'models/onnx'), intra_op_threads=intra_op_threads)
+    if backend == 'hashing':
+        from src.retrieval.hashing_backend import HashingRerankFunction
+        return HashingRerankFunction()
+    if backend != 'torch':
+        raise ValueError(f"Unknown embedding backend '{backend}'. Expected 'torch', 'onnx_int8' or 'hashing'.")
+    from pymilvus.model.reranker import BGERerankFunction
+    return BGERerankFunction(device=_device(embedding_config))
+
+def score_pairs(reranker, pairs: list[tuple[str, str]]) -> list[float]:
+    """Scores many (query, document) pairs in one batched cross-encoder call."""
+    if not pairs:
+        return []
+    if hasattr(reranker, 'score'):
+        return reranker.score(pairs)
+    # BGERerankFunction only takes a single query, so call its FlagReranker directly.
+    scores = reranker.reranker.compute_score([list(pair) for pair in pairs], batch_size=reranker.batch_size, normalize=reranker.normalize)
+    return [float(scores)] if isinstance(scores, (int, float)) else [float(s) for s in scores]
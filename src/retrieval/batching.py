@@ -0,0 +1,65 @@
+# src/retrieval/batching.py
+import time
+import threading
+from concurrent.futures import Future
+from src.services.tracing import Tracer
+
+class QueryBatcher:
+    """
+    Coalesces concurrent single-item calls into one batched call. While an earlier
+    batch is still running, the first caller of the next batch waits up to
+    max_wait_ms (or until the batch is full) for others to join; with nothing in
+    flight it runs at once. batch_fn then runs once on the whole batch and each
+    caller gets its result.
+    """
+    def __init__(self, batch_fn, max_batch_size: int = 16, max_wait_ms: float = 5):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.batches = 0
+        self.items = 0
+        self.waited_batches = 0
+        self._running = 0
+        self._pending = []
+        self._changed = threading.Condition(threading.Lock())
+
+    def submit(self, item):
+        future = Future()
+        with self._changed:
+            self._pending.append((item, future))
+            is_leader = len(self._pending) == 1
+            if len(self._pending) >= self.max_batch_size:
+                self._changed.notify_all()
+
+        if is_leader:
+            with self._changed:
+                # Only a batch still in flight makes it likely that more callers are on their way.
+                waited = self._running > 0
+                deadline = time.monotonic() + self.max_wait
+                while self._running and len(self._pending) < self.max_batch_size and time.monotonic() < deadline:
+                    self._changed.wait(deadline - time.monotonic())
+                batch, self._pending = self._pending, []
+                self._running += 1
+                self.batches += 1
+                self.items += len(batch)
+                self.waited_batches += waited
+            Tracer.annotate(batch_size=len(batch))
+            try:
+                results = self.batch_fn([queued_item for queued_item, _ in batch])
+                for (_, queued_future), result in zip(batch, results):
+                    queued_future.set_result(result)
+            except Exception as e:
+                for _, queued_future in batch:
+                    queued_future.set_exception(e)
+            finally:
+                with self._changed:
+                    self._running -= 1
+                    self._changed.notify_all()
+        return future.result()
+
+    def stats(self) -> dict:
+        with self._changed:
+            return {
+                "batches": self.batches, "items": self.items, "waited_batches": self.waited_batches,
+                "mean_batch_size": self.items / self.batches if self.batches else 0.0,
+            }
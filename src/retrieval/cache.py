@@ -0,0 +1,151 @@
+# src/retrieval/cache.py
+import os
+import time
+import atexit
+import pickle
+import threading
+from collections import OrderedDict
+
+GENERATIONS_DIR = os.getenv("HYDRA_CACHE_DIR", ".hydra/cache") + "/generations"
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+def collection_generation(collection_name: str) -> str:
+    """Returns the write generation of a collection, as stamped by ingestion."""
+    try:
+        with open(os.path.join(GENERATIONS_DIR, collection_name), "r") as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        return "0"
+
+def bump_collection_generation(collection_name: str):
+    """Marks a collection as written to, invalidating cached results in every process."""
+    os.makedirs(GENERATIONS_DIR, exist_ok=True)
+    path = os.path.join(GENERATIONS_DIR, collection_name)
+    with open(f"{path}.tmp", "w") as f:
+        f.write(str(time.time_ns()))
+    os.replace(f"{path}.tmp", path)
+
+class LRUCache:
+    """
+    Thread-safe LRU cache with per-entry TTL and an approximate memory cap
+    (entry sizes are measured by their pickled length). When persist_path is
+    set, entries are loaded on creation and written back at process exit.
+    """
+    def __init__(self, name: str, max_entries: int = 1024, max_bytes: int = 64 * 1024 * 1024, ttl_seconds: float = 3600, persist_path: str = None):
+        self.name = name
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.persist_path = persist_path
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        if persist_path:
+            self._load()
+            atexit.register(self.save)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] < time.time():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        size = len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, time.time() + self.ttl_seconds, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key):
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "name": self.name, "entries": len(self._entries), "bytes": self._bytes,
+                "hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def _load(self):
+        try:
+            with open(self.persist_path, "rb") as f:
+                entries = pickle.load(f)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return
+        now = time.time()
+        for key, (value, expires_at, size) in entries.items():
+            if expires_at > now:
+                self._entries[key] = (value, expires_at, size)
+                self._bytes += size
+
+    def save(self):
+        if not self.persist_path:
+            return
+        with self._lock:
+            entries = dict(self._entries)
+        os.makedirs(os.path.dirname(self.persist_path) or ".", exist_ok=True)
+        with open(f"{self.persist_path}.tmp", "wb") as f:
+            pickle.dump(entries, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(f"{self.persist_path}.tmp", self.persist_path)
+
+class RetrievalCache:
+    """
+    Two-level cache used by HyDRARetriever:
+    normalized query -> (dense, sparse) embedding, and
+    (query, profile, collection, top_k) -> reranked documents.
+    Result entries carry the collection's write generation, so they are
+    dropped as soon as ingestion writes to the collection.
+    """
+    def __init__(self, cache_config: dict):
+        max_bytes = int(cache_config.get('max_mb', 256) * 1024 * 1024)
+        ttl_seconds = cache_config.get('ttl_seconds', 3600)
+        persist_dir = cache_config.get('persist_dir') if cache_config.get('persist', False) else None
+        self.enabled = cache_config.get('enabled', True)
+        # Query embeddings never go stale and a dense vector alone is 4 KB, so they get a longer TTL and most of the budget.
+        self.embeddings = LRUCache(
+            "query_embeddings", max_entries=cache_config.get('max_entries', 2048), max_bytes=max_bytes // 4 * 3,
+            ttl_seconds=ttl_seconds * 24, persist_path=os.path.join(persist_dir, "query_embeddings.pkl") if persist_dir else None
+        )
+        self.results = LRUCache(
+            "retrieval_results", max_entries=cache_config.get('max_entries', 2048), max_bytes=max_bytes // 4,
+            ttl_seconds=ttl_seconds, persist_path=os.path.join(persist_dir, "retrieval_results.pkl") if persist_dir else None
+        )
+        self._generations = {}
+
+    def generation(self, collection_name: str) -> str:
+        """Returns the collection's current write generation, dropping stale results when it moved on."""
+        generation = collection_generation(collection_name)
+        previous = self._generations.get(collection_name)
+        if previous is not None and previous != generation:
+            self.results.clear()
+        self._generations[collection_name] = generation
+        return generation
+
+    def stats(self) -> list[dict]:
+        return [self.embeddings.stats(), self.results.stats()]
@@ -0,0 +1,170 @@
+# src/retrieval/chunk_store.py
+import os
+import mmap
+import shutil
+import threading
+import numpy as np
+
+CHUNK_STORE_DIR = os.getenv("HYDRA_CHUNK_STORE_DIR", ".hydra/chunks")
+DATA_FILE = "chunks.bin"
+INDEX_FILE = "index.bin"
+# One fixed-width index entry per appended chunk; a negative offset marks a deletion.
+INDEX_DTYPE = np.dtype([("id", "<i8"), ("offset", "<i8"), ("source_len", "<u4"), ("text_len", "<u4")])
+
+def chunk_store_path(collection_name: str) -> str:
+    return os.path.join(CHUNK_STORE_DIR, collection_name)
+
+def chunk_store_enabled(milvus_config: dict) -> bool:
+    return milvus_config.get('chunk_store', {}).get('enabled', False)
+
+def delete_chunk_store(collection_name: str):
+    """Removes a collection's chunk store (or, for an alias, the link to its version's store)."""
+    path = chunk_store_path(collection_name)
+    if os.path.islink(path):
+        os.remove(path)
+    elif os.path.isdir(path):
+        shutil.rmtree(path)
+
+def link_chunk_store(alias: str, collection_name: str):
+    """Points an alias's chunk store at a collection's store, atomically replacing a previous link."""
+    path = chunk_store_path(alias)
+    if os.path.isdir(path) and not os.path.islink(path):
+        shutil.rmtree(path)  # The store of a plain collection that is being replaced by the alias.
+    os.makedirs(chunk_store_path(collection_name), exist_ok=True)
+    os.symlink(os.path.abspath(chunk_store_path(collection_name)), f"{path}.tmp")
+    os.replace(f"{path}.tmp", path)
+
+class ChunkStore:
+    """
+    Append-only local store of chunk text and source, keyed by Milvus primary key, so
+    the knowledge collection only has to hold ids and vectors.
+
+    Records are appended as raw UTF-8 (source, then text) to chunks.bin, and a
+    fixed-width (id, offset, lengths) entry per record to index.bin, data first so the
+    index never points past it. Readers memory-map chunks.bin and decode straight from
+    the mapped pages; they pick up appends from other processes by reading only the new
+    tail of the index, and reload fully when the store is replaced (for an alias, when
+    its link is switched to another version). Deletions append tombstones; the space is
+    reclaimed when the collection is rebuilt into a new version.
+    """
+    def __init__(self, collection_name: str):
+        self.path = chunk_store_path(collection_name)
+        self._lock = threading.RLock()
+        self._entries = np.empty(0, dtype=INDEX_DTYPE)
+        self._live = np.empty(0, dtype=INDEX_DTYPE)
+        self._index_key = None
+        self._map = None
+
+    def _files(self) -> tuple[str, str]:
+        directory = os.path.realpath(self.path)
+        return os.path.join(directory, DATA_FILE), os.path.join(directory, INDEX_FILE)
+
+    def append(self, records: list[tuple[int, str, str]]):
+        """Stores (id, source, text) records."""
+        if not records:
+            return
+        data_path, index_path = self._files()
+        os.makedirs(os.path.dirname(data_path), exist_ok=True)
+        entries = np.empty(len(records), dtype=INDEX_DTYPE)
+        payload = bytearray()
+        with self._lock, open(data_path, "ab") as data_file:
+            offset = data_file.seek(0, os.SEEK_END)
+            for i, (chunk_id, source, text) in enumerate(records):
+                source_bytes, text_bytes = (source or "").encode("utf-8"), (text or "").encode("utf-8")
+                entries[i] = (chunk_id, offset + len(payload), len(source_bytes), len(text_bytes))
+                payload += source_bytes + text_bytes
+            data_file.write(payload)
+            data_file.flush()
+            os.fsync(data_file.fileno())
+            self._append_index(index_path, entries)
+
+    def delete(self, ids: list[int]):
+        if not ids:
+            return
+        entries = np.zeros(len(ids), dtype=INDEX_DTYPE)
+        entries["id"], entries["offset"] = ids, -1
+        with self._lock:
+            self._append_index(self._files()[1], entries)
+
+    @staticmethod
+    def _append_index(index_path: str, entries: np.ndarray):
+        os.makedirs(os.path.dirname(index_path), exist_ok=True)
+        with open(index_path, "ab") as index_file:
+            index_file.write(entries.tobytes())
+            index_file.flush()
+            os.fsync(index_file.fileno())
+
+    def _refresh(self):
+        data_path, index_path = self._files()
+        try:
+            stat = os.stat(index_path)
+        except FileNotFoundError:
+            if self._map is not None:
+                self._map.close()
+            self._entries, self._live, self._index_key, self._map = self._entries[:0], self._live[:0], None, None
+            return
+        complete = stat.st_size - stat.st_size % INDEX_DTYPE.itemsize  # Ignore a half-written last entry.
+        if self._index_key is not None and self._index_key[0] == stat.st_ino and self._index_key[1] == complete:
+            return
+        same_file = self._index_key is not None and self._index_key[0] == stat.st_ino and self._index_key[1] <= complete
+        start = self._index_key[1] if same_file else 0
+        with open(index_path, "rb") as index_file:
+            index_file.seek(start)
+            tail = np.frombuffer(index_file.read(complete - start), dtype=INDEX_DTYPE)
+        self._entries = np.concatenate([self._entries, tail]) if same_file else tail.copy()
+        self._index_key = (stat.st_ino, complete)
+
+        # The last entry for an id wins; tombstones then drop out.
+        order = np.argsort(self._entries["id"], kind="stable")
+        ids = self._entries["id"][order]
+        last = np.append(ids[1:] != ids[:-1], True) if len(ids) else np.empty(0, dtype=bool)
+        live = self._entries[order[last]]
+        self._live = live[live["offset"] >= 0]
+
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if os.path.exists(data_path) and os.path.getsize(data_path):
+            with open(data_path, "rb") as data_file:
+                self._map = mmap.mmap(data_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def get_many(self, ids: list[int]) -> dict[int, tuple[str, str]]:
+        """Returns {id: (source, text)} for the ids found in the store."""
+        with self._lock:
+            self._refresh()
+            if not len(self._live) or self._map is None:
+                return {}
+            wanted = np.asarray(ids, dtype=np.int64)
+            entries = self._live[np.minimum(np.searchsorted(self._live["id"], wanted), len(self._live) - 1)]
+            matched = (entries["id"] == wanted).tolist()
+            starts = entries["offset"].tolist()
+            middles = (entries["offset"] + entries["source_len"]).tolist()
+            ends = (entries["offset"] + entries["source_len"] + entries["text_len"]).tolist()
+            found = {}
+            view = memoryview(self._map)
+            try:
+                for i, chunk_id in enumerate(ids):
+                    if matched[i]:
+                        found[chunk_id] = (str(view[starts[i]:middles[i]], "utf-8"), str(view[middles[i]:ends[i]], "utf-8"))
+            finally:
+                view.release()
+            return found
+
+    def ids_for_source(self, source: str) -> list[int]:
+        """Ids of the live chunks of one source (a full scan; only needed without an ingestion manifest)."""
+        encoded = source.encode("utf-8")
+        with self._lock:
+            self._refresh()
+            if self._map is None:
+                return []
+            return [
+                int(entry["id"]) for entry in self._live
+                if entry["source_len"] == len(encoded) and self._map[int(entry["offset"]):int(entry["offset"]) + len(encoded)] == encoded
+            ]
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._refresh()
+            data_bytes = len(self._map) if self._map is not None else 0
+            live_bytes = int(self._live["source_len"].sum() + self._live["text_len"].sum()) if len(self._live) else 0
+            return {"chunks": len(self._live), "data_bytes": data_bytes, "dead_bytes": data_bytes - live_bytes, "index_entries": len(self._entries)}
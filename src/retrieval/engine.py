@@ -1,59 +1,174 @@
 # src/retrieval/engine.py
-import os
 from dotenv import load_dotenv
-from pymilvus import MilvusClient, AnnSearchRequest, RRFRanker
-from pymilvus.model.hybrid import BGEM3EmbeddingFunction
-from pymilvus.model.reranker import BGERerankFunction
+from pymilvus import AnnSearchRequest, RRFRanker
 from langchain_core.retrievers import BaseRetriever
 from langchain_core.callbacks import CallbackManagerForRetrieverRun
 from langchain_core.documents import Document
-from typing import List
+from typing import Any, List
 from src.utils.config_loader import get_config
+from src.services.component_registry import ComponentRegistry
+from src.retrieval.cache import normalize_query, collection_generation
+from src.retrieval.batching import QueryBatcher
+from src.retrieval.rerank_policy import AdaptiveRerankPolicy, RRF_K
+from src.retrieval.chunk_store import ChunkStore, chunk_store_enabled
+from src.services.tracing import Tracer
 
 load_dotenv()
 
 class HyDRARetriever(BaseRetriever):
     top_k_initial: int = 20
     top_k_final: int = 5
+    bge_m3_ef: Any = None
+    milvus_client: Any = None
+    reranker: Any = None
+    cache: Any = None
+    batcher: Any = None
+    rerank_policy: Any = None
+    chunk_store: Any = None
+    text_fields: Any = None
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        config = get_config()
-        embedding_config = config['embedding']
-        use_gpu = embedding_config['use_fp16']
-        
-        self.bge_m3_ef = BGEM3EmbeddingFunction(use_fp16=use_gpu, device="cuda" if use_gpu else "cpu")
-        self.milvus_client = MilvusClient(uri=os.getenv("MILVUS_URI"), token=os.getenv("MILVUS_TOKEN"))
-        self.reranker = BGERerankFunction(device="cuda" if use_gpu else "cpu")
+        # Models and the Milvus connection are borrowed from the process-wide registry.
+        self.bge_m3_ef = ComponentRegistry.get_embedding_function()
+        self.milvus_client = ComponentRegistry.get_milvus_client()
+        self.reranker = ComponentRegistry.get_reranker()
+        self.cache = ComponentRegistry.get_retrieval_cache()
+        self.rerank_policy = AdaptiveRerankPolicy(get_config().get('retrieval', {}).get('rerank', {}))
+        milvus_config = get_config()['milvus']
+        if chunk_store_enabled(milvus_config):
+            self.chunk_store = ChunkStore(milvus_config['collection_name'])
+            self.text_fields = {}
+        batching_config = get_config().get('retrieval', {}).get('batching', {})
+        self.batcher = QueryBatcher(
+            self.batch_retrieve,
+            max_batch_size=batching_config.get('max_batch_size', 16),
+            max_wait_ms=batching_config.get('max_wait_ms', 5)
+        )
 
-    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+    def _embed_queries(self, queries: list[str], normalized_queries: list[str]) -> list[tuple]:
+        """Returns (dense, sparse) per query, embedding all cache misses in a single forward pass."""
+        embedding_config = get_config()['embedding']
+        keys = [(nq, embedding_config.get('backend', 'torch'), embedding_config.get('use_fp16', False)) for nq in normalized_queries]
+        embeddings = [self.cache.embeddings.get(key) if self.cache.enabled else None for key in keys]
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        if missing:
+            with Tracer.span("embedding", texts=len(missing), backend=embedding_config.get('backend', 'torch')):
+                query_embeddings = self.bge_m3_ef([queries[i] for i in missing])
+            for row, i in enumerate(missing):
+                embeddings[i] = (query_embeddings['dense'][row], query_embeddings['sparse'][[row]])
+                if self.cache.enabled:
+                    self.cache.embeddings.put(keys[i], embeddings[i])
+        return embeddings
+
+    def _has_text_fields(self, collection_name: str) -> bool:
+        """Whether the collection still stores chunk text in Milvus, checked again after every write or alias switch."""
+        key = (collection_name, collection_generation(collection_name))
+        if key not in self.text_fields:
+            fields = {field['name'] for field in self.milvus_client.describe_collection(collection_name)['fields']}
+            self.text_fields = {key: "chunk_text" in fields}
+        return self.text_fields[key]
+
+    def _fetch_chunks(self, hits: list[dict]) -> list:
+        """
+        Fills in text and source from the local chunk store, only for hits that are about to be
+        reranked. Hits whose text can't be found keep no chunk_text; their ids are returned.
+        """
+        missing = [hit for hit in hits if "chunk_text" not in hit['entity']]
+        if not missing:
+            return []
+        collection_name = get_config()['milvus']['collection_name']
+        with Tracer.span("chunk_fetch", chunks=len(missing)) as span:
+            chunks = self.chunk_store.get_many([hit['id'] for hit in missing])
+            span["found"] = len(chunks)
+            unknown = [hit['id'] for hit in missing if hit['id'] not in chunks]
+            if unknown:
+                try:
+                    # Rows ingested before the chunk store was enabled still carry their text in Milvus.
+                    if self._has_text_fields(collection_name):
+                        rows = self.milvus_client.query(collection_name=collection_name, ids=unknown, output_fields=["chunk_text", "source"])
+                        chunks.update({row['id']: (row.get('source'), row.get('chunk_text') or "") for row in rows})
+                except Exception as e:
+                    span["error"] = f"{type(e).__name__}: {e}"
+                    print(f"Warning: Could not read {len(unknown)} chunk(s) of '{collection_name}' from Milvus: {e}")
+            unresolved = [hit['id'] for hit in missing if hit['id'] not in chunks]
+            span["unresolved"] = len(unresolved)
+        for hit in missing:
+            if hit['id'] in chunks:
+                source, text = chunks[hit['id']]
+                hit['entity'].update(chunk_text=text, source=source)
+        return unresolved
+
+    def batch_retrieve(self, queries: list[str]) -> list[List[Document]]:
+        """
+        Retrieves documents for several queries at once: one embedding forward pass for all
+        queries, one multi-vector hybrid_search, and batched reranker calls over the
+        (query, candidate) pairs the rerank policy selects. Results are returned in the
+        order of `queries`.
+        """
         config = get_config()
         milvus_config = config['milvus']
         collection_name = milvus_config['collection_name']
         search_params = milvus_config['search_params']
 
-        query_embeddings = self.bge_m3_ef([query])
-        dense_req = AnnSearchRequest(data=[query_embeddings['dense'][0]], anns_field="dense_vector", param=search_params, limit=self.top_k_initial)
-        sparse_req = AnnSearchRequest(data=[query_embeddings['sparse'][0]], anns_field="sparse_vector", param={"metric_type": "IP"}, limit=self.top_k_initial)
+        results = [None] * len(queries)
+        generation = self.cache.generation(collection_name) if self.cache.enabled else None
+        result_keys, pending = {}, {}
+        for i, query in enumerate(queries):
+            normalized_query = normalize_query(query)
+            result_key = (normalized_query, config['profile_name'], collection_name, self.top_k_initial, self.top_k_final, generation)
+            cached_documents = self.cache.results.get(result_key) if self.cache.enabled else None
+            if cached_documents is not None:
+                results[i] = list(cached_documents)
+            else:
+                # Identical queries inside one batch are only searched once.
+                result_keys.setdefault(normalized_query, result_key)
+                pending.setdefault(normalized_query, []).append(i)
 
-        initial_results = self.milvus_client.hybrid_search(
-            collection_name=collection_name, reqs=[sparse_req, dense_req],
-            rerank=RRFRanker(), limit=self.top_k_initial, output_fields=["chunk_text", "source"]
-        )
-        
-        if not initial_results or not initial_results[0]:
-            return []
+        if pending:
+            normalized_queries = list(pending)
+            unique_queries = [queries[pending[nq][0]] for nq in normalized_queries]
+            embeddings = self._embed_queries(unique_queries, normalized_queries)
+            dense_req = AnnSearchRequest(data=[dense for dense, _ in embeddings], anns_field="dense_vector", param=search_params, limit=self.top_k_initial)
+            sparse_req = AnnSearchRequest(data=[sparse for _, sparse in embeddings], anns_field="sparse_vector", param={"metric_type": "IP"}, limit=self.top_k_initial)
+
+            with Tracer.span("hybrid_search", collection=collection_name, queries=len(unique_queries), limit=self.top_k_initial) as span:
+                initial_results = self.milvus_client.hybrid_search(
+                    collection_name=collection_name, reqs=[sparse_req, dense_req],
+                    rerank=RRFRanker(RRF_K), limit=self.top_k_initial,
+                    # With a chunk store the response carries only ids and scores.
+                    output_fields=[] if self.chunk_store is not None else ["chunk_text", "source"]
+                ) or []
+                span["candidates"] = sum(len(hits) for hits in initial_results)
+
+            unresolved = set()
+            def fetch(hits: list[dict]):
+                unresolved.update(self._fetch_chunks(hits))
+
+            with Tracer.span("reranking", mode=self.rerank_policy.mode, candidates=sum(len(hits) for hits in initial_results)) as span:
+                scored, paths = self.rerank_policy.rerank(
+                    self.reranker, unique_queries, initial_results, self.top_k_final,
+                    fetch=fetch if self.chunk_store is not None else None
+                )
+                span.update(pairs=sum(len(pairs) for pairs in scored), paths=paths)
 
-        candidate_docs_text = [res.entity.get("chunk_text", "") for res in initial_results[0]]
-        reranked_results = self.reranker(query=query, documents=candidate_docs_text, top_k=self.top_k_final)
-
-        final_documents = []
-        for res in reranked_results:
-            original_doc_info = initial_results[0][res.index].entity
-            doc = Document(
-                page_content=res.text,
-                metadata={"source": original_doc_info.get("source"), "relevance_score": res.score}
-            )
-            final_documents.append(doc)
-            
-        return final_documents
\ No newline at end of file
+            for q, normalized_query in enumerate(normalized_queries):
+                final_documents = [
+                    Document(page_content=hit['entity'].get("chunk_text", ""), metadata={"id": hit.get("id"), "source": hit['entity'].get("source"), "relevance_score": score})
+                    for score, hit in sorted(scored[q], key=lambda item: item[0], reverse=True)[:self.top_k_final]
+                ]
+                # Results missing a candidate whose text couldn't be read are not cached, so the next search retries.
+                complete = not any(hit['id'] in unresolved for hit in initial_results[q])
+                if self.cache.enabled and final_documents and complete:
+                    self.cache.results.put(result_keys[normalized_query], list(final_documents))
+                for i in pending[normalized_query]:
+                    results[i] = list(final_documents)
+
+        return results
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        # Concurrent callers (e.g. parallel sub-tasks) are coalesced into one batch_retrieve call.
+        with Tracer.span("retrieval") as span:
+            documents = self.batcher.submit(query)
+            span["documents"] = len(documents)
+        return documents
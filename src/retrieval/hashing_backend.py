@@ -0,0 +1,60 @@
+# src/retrieval/hashing_backend.py
+import re
+import zlib
+import numpy as np
+
+TOKEN_PATTERN = re.compile(r"\w+")
+# BGE-M3's vocabulary size, so sparse rows have the same shape as the real model's.
+SPARSE_DIM = 250002
+
+def _tokens(text: str) -> list[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+def _hash(token: str) -> int:
+    return zlib.crc32(token.encode("utf-8"))
+
+class HashingEmbeddingFunction:
+    """
+    Deterministic, model-free stand-in for BGE-M3, used by the offline benchmarks.
+    Dense vectors are L2-normalized signed feature hashes of the tokens and sparse
+    vectors are log-scaled hashed term frequencies, in the same output layout as
+    BGEM3EmbeddingFunction. Lexical overlap drives similarity, so retrieval over a
+    synthetic corpus still behaves sensibly.
+    """
+    def __init__(self, dim: int = 1024):
+        self.dim = dim
+
+    def __call__(self, texts: list[str]) -> dict:
+        from scipy.sparse import csr_array
+
+        dense = np.zeros((len(texts), self.dim), dtype=np.float32)
+        indptr, indices, values = [0], [], []
+        for i, text in enumerate(texts):
+            counts = {}
+            for token in _tokens(text):
+                h = _hash(token)
+                dense[i, h % self.dim] += 1.0 if (h >> 16) & 1 else -1.0
+                counts[h % SPARSE_DIM] = counts.get(h % SPARSE_DIM, 0) + 1
+            indices.extend(counts.keys())
+            values.extend(float(np.log1p(count)) for count in counts.values())
+            indptr.append(len(indices))
+        norms = np.linalg.norm(dense, axis=1, keepdims=True)
+        dense /= np.where(norms == 0, 1.0, norms)
+        sparse = csr_array((values, indices, indptr), shape=(len(texts), SPARSE_DIM), dtype=np.float32)
+        return {"dense": list(dense), "sparse": sparse}
+
+    def encode_documents(self, documents: list[str]) -> dict:
+        return self(documents)
+
+    def encode_queries(self, queries: list[str]) -> dict:
+        return self(queries)
+
+class HashingRerankFunction:
+    """Token-overlap stand-in for the BGE cross-encoder: the share of query tokens found in the document."""
+
+    def score(self, pairs: list[tuple[str, str]]) -> list[float]:
+        scores = []
+        for query, document in pairs:
+            query_tokens, document_tokens = set(_tokens(query)), set(_tokens(document))
+            scores.append(len(query_tokens & document_tokens) / len(query_tokens) if query_tokens else 0.0)
+        return scores
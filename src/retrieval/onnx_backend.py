@@ -0,0 +1,227 @@
+# src/retrieval/onnx_backend.py
+import os
+import time
+import argparse
+import numpy as np
+
+EMBEDDING_SUBDIR = "bge_m3"
+RERANKER_SUBDIR = "bge_reranker"
+INT8_MODEL_FILE = "model_int8.onnx"
+
+def _import_runtime():
+    try:
+        import onnxruntime
+        from transformers import AutoTokenizer
+    except ImportError as e:
+        raise ImportError("The 'onnx_int8' embedding backend requires onnxruntime and transformers: pip install onnxruntime transformers") from e
+    return onnxruntime, AutoTokenizer
+
+def _create_session(model_path: str, intra_op_threads: int = None):
+    onnxruntime, _ = _import_runtime()
+    if not os.path.exists(model_path):
+        raise FileNotFoundError(f"ONNX model not found at '{model_path}'. Run `python -m src.retrieval.onnx_backend export` first.")
+    options = onnxruntime.SessionOptions()
+    options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+    if intra_op_threads:
+        options.intra_op_num_threads = intra_op_threads
+    return onnxruntime.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+
+class OnnxBGEM3EmbeddingFunction:
+    """
+    Int8-quantized BGE-M3 on ONNX Runtime. The encoder runs in ONNX; the dense (normalized CLS)
+    and sparse (ReLU of the sparse_linear head, max-pooled per token) heads are applied in NumPy,
+    so the output matches BGEM3EmbeddingFunction and the existing collection schema.
+    """
+    dim = 1024
+
+    def __init__(self, model_dir: str, batch_size: int = 16, max_length: int = 8192, intra_op_threads: int = None):
+        _, AutoTokenizer = _import_runtime()
+        model_dir = os.path.join(model_dir, EMBEDDING_SUBDIR)
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.session = _create_session(os.path.join(model_dir, INT8_MODEL_FILE), intra_op_threads)
+        self.sparse_weight = np.load(os.path.join(model_dir, "sparse_linear_weight.npy"))
+        self.sparse_bias = np.load(os.path.join(model_dir, "sparse_linear_bias.npy"))
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self.unused_tokens = {
+            self.tokenizer.cls_token_id, self.tokenizer.eos_token_id,
+            self.tokenizer.pad_token_id, self.tokenizer.unk_token_id,
+        }
+
+    def __call__(self, texts: list[str]) -> dict:
+        return self._encode(texts)
+
+    def encode_documents(self, documents: list[str]) -> dict:
+        return self._encode(documents)
+
+    def encode_queries(self, queries: list[str]) -> dict:
+        return self._encode(queries)
+
+    def _encode(self, texts: list[str]) -> dict:
+        from scipy.sparse import csr_array
+
+        dense, indptr, indices, values = [], [0], [], []
+        for start in range(0, len(texts), self.batch_size):
+            encoded = self.tokenizer(
+                texts[start:start + self.batch_size], padding=True, truncation=True,
+                max_length=self.max_length, return_tensors="np"
+            )
+            input_ids = encoded["input_ids"].astype(np.int64)
+            attention_mask = encoded["attention_mask"].astype(np.int64)
+            hidden = self.session.run(["last_hidden_state"], {"input_ids": input_ids, "attention_mask": attention_mask})[0]
+
+            cls = hidden[:, 0]
+            dense.extend(cls / np.linalg.norm(cls, axis=-1, keepdims=True))
+
+            token_weights = np.maximum(hidden @ self.sparse_weight.T + self.sparse_bias, 0)[..., 0]
+            for ids, weights, mask in zip(input_ids, token_weights, attention_mask):
+                lexical = {}
+                for token_id, weight in zip(ids[mask == 1], weights[mask == 1]):
+                    if token_id in self.unused_tokens or weight <= 0:
+                        continue
+                    lexical[int(token_id)] = max(lexical.get(int(token_id), 0.0), float(weight))
+                indices.extend(lexical.keys())
+                values.extend(lexical.values())
+                indptr.append(len(indices))
+
+        sparse = csr_array((values, indices, indptr), shape=(len(texts), len(self.tokenizer)), dtype=np.float32)
+        return {"dense": dense, "sparse": sparse}
+
+class OnnxBGERerankFunction:
+    """Int8-quantized BGE cross-encoder on ONNX Runtime, returning the same RerankResult objects as BGERerankFunction."""
+
+    def __init__(self, model_dir: str, batch_size: int = 32, max_length: int = 512, normalize: bool = True, intra_op_threads: int = None):
+        _, AutoTokenizer = _import_runtime()
+        model_dir = os.path.join(model_dir, RERANKER_SUBDIR)
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.session = _create_session(os.path.join(model_dir, INT8_MODEL_FILE), intra_op_threads)
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self.normalize = normalize
+
+    def score(self, pairs: list[tuple[str, str]]) -> list[float]:
+        scores = []
+        for start in range(0, len(pairs), self.batch_size):
+            batch = pairs[start:start + self.batch_size]
+            encoded = self.tokenizer(
+                [q for q, _ in batch], [d for _, d in batch], padding=True, truncation=True,
+                max_length=self.max_length, return_tensors="np"
+            )
+            logits = self.session.run(["logits"], {
+                "input_ids": encoded["input_ids"].astype(np.int64),
+                "attention_mask": encoded["attention_mask"].astype(np.int64),
+            })[0][:, 0]
+            if self.normalize:
+                logits = 1 / (1 + np.exp(-logits))
+            scores.extend(float(s) for s in logits)
+        return scores
+
+    def __call__(self, query: str, documents: list[str], top_k: int = 5) -> list:
+        from pymilvus.model.base import RerankResult
+
+        scores = self.score([(query, doc) for doc in documents])
+        ranked = sorted(range(len(documents)), key=lambda i: scores[i], reverse=True)[:top_k]
+        return [RerankResult(text=documents[i], score=scores[i], index=i) for i in ranked]
+
+def export_models(output_dir: str, embedding_model: str = "BAAI/bge-m3", reranker_model: str = "BAAI/bge-reranker-v2-m3"):
+    """Exports BGE-M3 and the reranker to ONNX and applies dynamic int8 weight quantization."""
+    import torch
+    from huggingface_hub import hf_hub_download
+    from transformers import AutoModel, AutoModelForSequenceClassification, AutoTokenizer
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+
+    class _EncoderOutput(torch.nn.Module):
+        def __init__(self, model, output):
+            super().__init__()
+            self.model, self.output = model, output
+
+        def forward(self, input_ids, attention_mask):
+            return getattr(self.model(input_ids=input_ids, attention_mask=attention_mask), self.output)
+
+    def _export(model, tokenizer, target_dir, output_name, sample):
+        os.makedirs(target_dir, exist_ok=True)
+        tokenizer.save_pretrained(target_dir)
+        fp32_path = os.path.join(target_dir, "model_fp32.onnx")
+        encoded = tokenizer(*sample, return_tensors="pt")
+        torch.onnx.export(
+            _EncoderOutput(model.eval(), output_name), (encoded["input_ids"], encoded["attention_mask"]), fp32_path,
+            input_names=["input_ids", "attention_mask"], output_names=[output_name],
+            dynamic_axes={"input_ids": {0: "batch", 1: "sequence"}, "attention_mask": {0: "batch", 1: "sequence"}, output_name: {0: "batch"}},
+            opset_version=17,
+        )
+        quantize_dynamic(fp32_path, os.path.join(target_dir, INT8_MODEL_FILE), weight_type=QuantType.QInt8, use_external_data_format=True)
+        print(f"Exported int8 model to '{target_dir}'.")
+
+    print(f"Exporting embedding model '{embedding_model}'...")
+    embedding_dir = os.path.join(output_dir, EMBEDDING_SUBDIR)
+    _export(AutoModel.from_pretrained(embedding_model), AutoTokenizer.from_pretrained(embedding_model),
+            embedding_dir, "last_hidden_state", (["HyDRA export sample"],))
+    sparse_linear = torch.load(hf_hub_download(repo_id=embedding_model, filename="sparse_linear.pt"), map_location="cpu")
+    np.save(os.path.join(embedding_dir, "sparse_linear_weight.npy"), sparse_linear["weight"].numpy())
+    np.save(os.path.join(embedding_dir, "sparse_linear_bias.npy"), sparse_linear["bias"].numpy())
+
+    print(f"Exporting reranker model '{reranker_model}'...")
+    _export(AutoModelForSequenceClassification.from_pretrained(reranker_model), AutoTokenizer.from_pretrained(reranker_model),
+            os.path.join(output_dir, RERANKER_SUBDIR), "logits", (["query"], ["HyDRA export sample"]))
+
+def _sparse_cosine(a, b) -> float:
+    dot = a.multiply(b).sum()
+    norm = np.sqrt(a.multiply(a).sum() * b.multiply(b).sum())
+    return float(dot / norm) if norm else 0.0
+
+def compare_backends(model_dir: str, texts: list[str], queries: list[str], top_k: int = 5, intra_op_threads: int = None):
+    """Prints accuracy (agreement with the FP32 models) and latency of the int8 ONNX backend."""
+    from pymilvus.model.hybrid import BGEM3EmbeddingFunction
+    from pymilvus.model.reranker import BGERerankFunction
+
+    def _timed(fn, *args, **kwargs):
+        start = time.perf_counter()
+        result = fn(*args, **kwargs)
+        return result, time.perf_counter() - start
+
+    reference_ef, onnx_ef = BGEM3EmbeddingFunction(use_fp16=False, device="cpu"), OnnxBGEM3EmbeddingFunction(model_dir, intra_op_threads=intra_op_threads)
+    reference_emb, reference_time = _timed(reference_ef, texts)
+    onnx_emb, onnx_time = _timed(onnx_ef, texts)
+    dense_cos = [float(np.dot(a, b)) for a, b in zip(reference_emb['dense'], onnx_emb['dense'])]
+    sparse_cos = [_sparse_cosine(reference_emb['sparse'][[i]], onnx_emb['sparse'][[i]]) for i in range(len(texts))]
+
+    reference_rr, onnx_rr = BGERerankFunction(device="cpu"), OnnxBGERerankFunction(model_dir, intra_op_threads=intra_op_threads)
+    overlaps, reference_rr_time, onnx_rr_time = [], 0.0, 0.0
+    for query in queries:
+        expected, elapsed = _timed(reference_rr, query=query, documents=texts, top_k=top_k)
+        reference_rr_time += elapsed
+        actual, elapsed = _timed(onnx_rr, query=query, documents=texts, top_k=top_k)
+        onnx_rr_time += elapsed
+        overlaps.append(len({r.index for r in expected} & {r.index for r in actual}) / max(1, len(expected)))
+
+    print(f"Embedding ({len(texts)} texts):  FP32 {reference_time:.2f}s | ONNX int8 {onnx_time:.2f}s | speedup x{reference_time / max(onnx_time, 1e-9):.2f}")
+    print(f"  dense cosine vs FP32:  mean {np.mean(dense_cos):.4f}, min {np.min(dense_cos):.4f}")
+    print(f"  sparse cosine vs FP32: mean {np.mean(sparse_cos):.4f}, min {np.min(sparse_cos):.4f}")
+    print(f"Reranking ({len(queries)} queries x {len(texts)} docs): FP32 {reference_rr_time:.2f}s | ONNX int8 {onnx_rr_time:.2f}s | speedup x{reference_rr_time / max(onnx_rr_time, 1e-9):.2f}")
+    print(f"  top-{top_k} overlap with FP32: mean {np.mean(overlaps):.3f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export and evaluate the int8 ONNX inference backend for BGE-M3 and the reranker.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="Export and quantize the models.")
+    export_parser.add_argument("--output", type=str, default="models/onnx", help="Directory to write the exported models to.")
+
+    compare_parser = subparsers.add_parser("compare", help="Compare accuracy and latency against the FP32 path.")
+    compare_parser.add_argument("--model_dir", type=str, default="models/onnx", help="Directory holding the exported models.")
+    compare_parser.add_argument("--texts", type=str, required=True, help="File with one passage per line.")
+    compare_parser.add_argument("--queries", type=str, default=None, help="File with one query per line (defaults to the first passages).")
+    compare_parser.add_argument("--threads", type=int, default=None, help="ONNX Runtime intra-op threads.")
+    args = parser.parse_args()
+
+    if args.command == "export":
+        export_models(args.output)
+    else:
+        with open(args.texts, "r") as f:
+            passages = [line.strip() for line in f if line.strip()]
+        if args.queries:
+            with open(args.queries, "r") as f:
+                sample_queries = [line.strip() for line in f if line.strip()]
+        else:
+            sample_queries = [p[:200] for p in passages[:10]]
+        compare_backends(args.model_dir, passages, sample_queries, intra_op_threads=args.threads)
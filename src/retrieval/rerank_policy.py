@@ -0,0 +1,122 @@
+# src/retrieval/rerank_policy.py
+import time
+import threading
+from src.retrieval.backends import score_pairs
+
+# k of the RRFRanker used by hybrid_search (also pymilvus' default).
+RRF_K = 60
+PATHS = ("full", "clear_winner", "cascade", "early_exit")
+
+class AdaptiveRerankPolicy:
+    """
+    Decides how much of the RRF candidate list goes through the cross-encoder.
+
+    "full" reranks every candidate, as before. "adaptive" first drops candidates whose
+    fused RRF score is below `min_score_ratio` of the best one. If the dense and sparse
+    lists both rank the top `top_k_final` candidates (an RRF score only one list can't
+    reach) and their fused scores clear the next candidate by `clear_margin` (as a share
+    of the best possible score), only those are reranked ("clear_winner"). Otherwise
+    candidates are reranked in RRF order, `batch_size` at a time after a first batch of
+    `top_k_final`, until `top_k_final` of them score at least `confident_score`
+    ("early_exit") or the list runs out ("cascade").
+
+    Reranker scores are kept on every path, since the executors and context assembly
+    rely on them. Counters estimate the time saved from the measured cost per pair.
+    """
+    def __init__(self, rerank_config: dict):
+        self.mode = rerank_config.get('mode', 'full')
+        self.min_score_ratio = rerank_config.get('min_score_ratio', 0.4)
+        self.clear_margin = rerank_config.get('clear_margin', 0.15)
+        self.batch_size = rerank_config.get('batch_size', 4)
+        self.confident_score = rerank_config.get('confident_score', 0.7)
+        self._stats = {path: {"queries": 0, "pairs_scored": 0, "pairs_skipped": 0} for path in PATHS}
+        self._seconds = 0.0
+        self._lock = threading.Lock()
+
+    def _cut(self, hits: list[dict], top_k_final: int) -> list[dict]:
+        if not hits:
+            return hits
+        floor = hits[0]['distance'] * self.min_score_ratio
+        return hits[:max(top_k_final, sum(1 for hit in hits if hit['distance'] >= floor))]
+
+    def _clear_winner(self, hits: list[dict], top_k_final: int) -> bool:
+        if len(hits) <= top_k_final:
+            return True
+        in_both_lists = all(hit['distance'] > 1.0 / (RRF_K + 1) for hit in hits[:top_k_final])
+        margin = (hits[top_k_final - 1]['distance'] - hits[top_k_final]['distance']) / (2.0 / (RRF_K + 1))
+        return in_both_lists and margin >= self.clear_margin
+
+    def _score(self, reranker, pairs: list[tuple[str, str]]) -> list[float]:
+        start = time.perf_counter()
+        scores = score_pairs(reranker, pairs)
+        with self._lock:
+            self._seconds += time.perf_counter() - start
+        return scores
+
+    def rerank(self, reranker, queries: list[str], initial_results: list[list[dict]], top_k_final: int, fetch=None) -> tuple[list[list[tuple]], dict]:
+        """
+        Reranks the hybrid_search hits (sorted by fused score) of each query. Pairs of all queries
+        still in play are scored together, one cross-encoder call per round. fetch(hits), when
+        given, fills in the text of the hits about to be scored (see HyDRARetriever._fetch_chunks);
+        hits it leaves without text are skipped rather than scored as empty strings.
+        Returns [(score, hit), ...] per query and the number of queries that took each path.
+        """
+        if self.mode == 'adaptive':
+            candidates = [self._cut(hits, top_k_final) for hits in initial_results]
+            clear = [self._clear_winner(hits, top_k_final) for hits in candidates]
+            candidates = [hits[:top_k_final] if is_clear else hits for hits, is_clear in zip(candidates, clear)]
+        else:
+            candidates, clear = initial_results, [False] * len(initial_results)
+
+        scored = [[] for _ in initial_results]
+        taken = [0] * len(initial_results)
+        done = [False] * len(initial_results)
+        while True:
+            owners = []
+            for q, hits in enumerate(candidates):
+                if done[q]:
+                    continue
+                start = taken[q]
+                size = len(hits) if self.mode != 'adaptive' or clear[q] else (top_k_final if start == 0 else self.batch_size)
+                owners.extend((q, hit) for hit in hits[start:start + size])
+                taken[q] = min(len(hits), start + size)
+            if not owners:
+                break
+            if fetch is not None:
+                fetch([hit for _, hit in owners])
+                owners = [(q, hit) for q, hit in owners if "chunk_text" in hit['entity']]
+            batch = [(queries[q], hit['entity'].get("chunk_text") or "") for q, hit in owners]
+            for (q, hit), score in zip(owners, self._score(reranker, batch) if batch else []):
+                scored[q].append((score, hit))
+            for q, hits in enumerate(candidates):
+                confident = sum(1 for score, _ in scored[q] if score >= self.confident_score)
+                done[q] = done[q] or taken[q] >= len(hits) or confident >= top_k_final
+
+        paths = {}
+        with self._lock:
+            for q, hits in enumerate(initial_results):
+                if self.mode != 'adaptive':
+                    path = "full"
+                elif clear[q]:
+                    path = "clear_winner"
+                else:
+                    path = "early_exit" if taken[q] < len(candidates[q]) else "cascade"
+                paths[path] = paths.get(path, 0) + 1
+                self._stats[path]["queries"] += 1
+                self._stats[path]["pairs_scored"] += len(scored[q])
+                self._stats[path]["pairs_skipped"] += len(hits) - len(scored[q])
+        return scored, paths
+
+    def stats(self) -> dict:
+        """Per path: how many queries took it, the pairs scored and skipped, and the reranking time the skipped pairs would have cost."""
+        with self._lock:
+            stats = {path: dict(counters) for path, counters in self._stats.items()}
+            pairs_scored = sum(counters["pairs_scored"] for counters in stats.values())
+            ms_per_pair = self._seconds * 1000 / pairs_scored if pairs_scored else 0.0
+        for counters in stats.values():
+            counters["saved_ms"] = counters["pairs_skipped"] * ms_per_pair
+        return {
+            "mode": self.mode, "paths": stats, "ms_per_pair": ms_per_pair,
+            "pairs_skipped": sum(counters["pairs_skipped"] for counters in stats.values()),
+            "saved_ms": sum(counters["saved_ms"] for counters in stats.values()),
+        }
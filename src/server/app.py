@@ -0,0 +1,252 @@
+# src/server/app.py
+import re
+import json
+import time
+import asyncio
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from src.core.reasoning_loop import ReasoningLoop
+from src.utils.config_loader import get_config
+from src.services.tracing import Tracer
+
+MAX_BODY_BYTES = 1024 * 1024
+# user_id and session_id end up in Milvus filters and VARCHAR(256) fields of the memory store.
+IDENTIFIER = re.compile(r"^[A-Za-z0-9_.:@-]{1,256}$")
+HEADER_TIMEOUT_SECONDS = 30
+
+STATUS_TEXT = {
+    200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large",
+    500: "Internal Server Error", 503: "Service Unavailable", 504: "Gateway Timeout",
+}
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+class HydraServer:
+    """
+    Headless asyncio HTTP/JSON server that runs many user/session pairs in one process.
+
+    Every session borrows the same warm models, Milvus client and retriever from the
+    ComponentRegistry, so concurrent queries also share the retriever's embedding and
+    reranking batches. The blocking pipeline runs on a bounded thread pool; requests
+    beyond `max_concurrent_queries` wait in a bounded queue and anything past that is
+    rejected with 503. Each request is bounded by `request_timeout_seconds`.
+
+    Endpoints:
+      POST /query   {"query", "user_id", "session_id"?, "stream"?} -> JSON, or SSE when stream is true
+      GET  /health  liveness and load
+      GET  /stats   request counters and average latency
+      GET  /metrics per-stage latency histograms (Prometheus text format)
+    """
+    def __init__(self, gemini_api_key: str, server_config: dict):
+        self.gemini_api_key = gemini_api_key
+        self.host = server_config.get('host', '127.0.0.1')
+        self.port = server_config.get('port', 8080)
+        self.max_concurrent = server_config.get('max_concurrent_queries', 4)
+        self.max_queued = server_config.get('max_queued', 16)
+        self.timeout = server_config.get('request_timeout_seconds', 120)
+        self.max_sessions = server_config.get('max_sessions', 1000)
+        self.executor = ThreadPoolExecutor(max_workers=self.max_concurrent, thread_name_prefix="hydra-query")
+        self.sessions = OrderedDict()
+        self.admitted = 0
+        self.running = 0
+        self.stats = {"completed": 0, "failed": 0, "rejected": 0, "timed_out": 0, "latency_seconds": 0.0}
+        self._slots = None
+
+    # --- Sessions ---
+
+    def _session(self, user_id: str, session_id: str) -> dict:
+        """Returns the session entry, evicting the least recently used idle session when full."""
+        key = (user_id, session_id)
+        if key not in self.sessions:
+            self.sessions[key] = {"loop": None, "lock": asyncio.Lock()}
+            while len(self.sessions) > self.max_sessions:
+                idle = next((k for k, s in self.sessions.items() if not s["lock"].locked() and k != key), None)
+                if idle is None:
+                    break
+                del self.sessions[idle]
+        self.sessions.move_to_end(key)
+        return self.sessions[key]
+
+    def _run_query(self, session: dict, user_id: str, session_id: str, query: str, callback, on_token) -> str:
+        if session["loop"] is None:
+            session["loop"] = ReasoningLoop(self.gemini_api_key, user_id, session_id)
+        return session["loop"].run(query, callback=callback, on_token=on_token)
+
+    async def _execute(self, user_id: str, session_id: str, query: str, callback, on_token=None) -> str:
+        """Admits the query, waits for a free worker and runs it, all within the request timeout."""
+        if self.admitted >= self.max_concurrent + self.max_queued:
+            self.stats["rejected"] += 1
+            raise HTTPError(503, "Server is at capacity, retry later.")
+        self.admitted += 1
+        start = time.perf_counter()
+        try:
+            answer = await asyncio.wait_for(self._run_when_free(user_id, session_id, query, callback, on_token), self.timeout)
+        except asyncio.TimeoutError:
+            self.stats["timed_out"] += 1
+            raise HTTPError(504, f"Query did not finish within {self.timeout}s.")
+        except HTTPError:
+            raise
+        except Exception as e:
+            self.stats["failed"] += 1
+            raise HTTPError(500, f"Query failed: {e}")
+        finally:
+            self.admitted -= 1
+        self.stats["completed"] += 1
+        self.stats["latency_seconds"] += time.perf_counter() - start
+        return answer
+
+    async def _run_when_free(self, user_id: str, session_id: str, query: str, callback, on_token) -> str:
+        session = self._session(user_id, session_id)
+        # Queries of one session run in order; different sessions run side by side.
+        async with session["lock"]:
+            await self._slots.acquire()
+            self.running += 1
+            future = asyncio.get_running_loop().run_in_executor(
+                self.executor, self._run_query, session, user_id, session_id, query, callback, on_token
+            )
+            # A timed-out query cannot be interrupted mid-call, so its slot is only freed once its thread is.
+            future.add_done_callback(self._release_slot)
+            return await asyncio.shield(future)
+
+    def _release_slot(self, _future):
+        self.running -= 1
+        self._slots.release()
+
+    # --- HTTP ---
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> tuple[str, str, bytes]:
+        request_line = await asyncio.wait_for(reader.readline(), HEADER_TIMEOUT_SECONDS)
+        try:
+            method, path, _ = request_line.decode("latin-1").split(" ", 2)
+        except ValueError:
+            raise HTTPError(400, "Malformed request line.")
+        headers = {}
+        while True:
+            line = await asyncio.wait_for(reader.readline(), HEADER_TIMEOUT_SECONDS)
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        length = int(headers.get("content-length", 0) or 0)
+        if length > MAX_BODY_BYTES:
+            raise HTTPError(413, f"Request body exceeds {MAX_BODY_BYTES} bytes.")
+        body = await reader.readexactly(length) if length else b""
+        return method.upper(), path.split("?", 1)[0], body
+
+    async def _send_json(self, writer: asyncio.StreamWriter, status: int, payload: dict):
+        body = json.dumps(payload).encode("utf-8")
+        headers = [f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}", "Content-Type: application/json",
+                   f"Content-Length: {len(body)}", "Connection: close"]
+        if status == 503:
+            headers.append("Retry-After: 1")
+        writer.write(("\r\n".join(headers) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
+
+    async def _send_event(self, writer: asyncio.StreamWriter, event: str, data: dict):
+        writer.write(f"event: {event}\ndata: {json.dumps(data)}\n\n".encode("utf-8"))
+        await writer.drain()
+
+    def _parse_query(self, body: bytes) -> dict:
+        try:
+            request = json.loads(body or b"{}")
+        except json.JSONDecodeError:
+            raise HTTPError(400, "Request body must be JSON.")
+        if not isinstance(request, dict) or not str(request.get("query", "")).strip() or not request.get("user_id"):
+            raise HTTPError(400, "'query' and 'user_id' are required.")
+        request.setdefault("session_id", f"{str(request['user_id'])[:248]}-default")
+        for field in ("user_id", "session_id"):
+            if not isinstance(request[field], str) or not IDENTIFIER.match(request[field]):
+                raise HTTPError(400, f"'{field}' must be 1-256 characters of letters, digits, '_', '-', '.', ':' or '@'.")
+        return request
+
+    async def _handle_query(self, writer: asyncio.StreamWriter, request: dict):
+        user_id, session_id, query = str(request["user_id"]), str(request["session_id"]), request["query"]
+        loop = asyncio.get_running_loop()
+
+        if not request.get("stream", False):
+            steps = []
+            start = time.perf_counter()
+            answer = await self._execute(user_id, session_id, query, lambda message, category: steps.append({"category": category, "message": message}))
+            await self._send_json(writer, 200, {
+                "user_id": user_id, "session_id": session_id, "answer": answer,
+                "steps": steps, "latency_seconds": round(time.perf_counter() - start, 3),
+            })
+            return
+
+        # Server-sent events: progress and tokens are pushed from the worker thread onto the event loop.
+        events = asyncio.Queue()
+        emit = lambda event, data: loop.call_soon_threadsafe(events.put_nowait, (event, data))
+        task = asyncio.ensure_future(self._execute(
+            user_id, session_id, query,
+            lambda message, category: emit("progress", {"category": category, "message": message}),
+            lambda chunk: emit("token", {"text": chunk}),
+        ))
+        task.add_done_callback(lambda _: events.put_nowait(None))
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-cache\r\nConnection: close\r\n\r\n")
+        start = time.perf_counter()
+        while True:
+            item = await events.get()
+            if item is None:
+                break
+            await self._send_event(writer, *item)
+        try:
+            answer = task.result()
+            await self._send_event(writer, "done", {
+                "user_id": user_id, "session_id": session_id, "answer": answer,
+                "latency_seconds": round(time.perf_counter() - start, 3),
+            })
+        except HTTPError as e:
+            await self._send_event(writer, "error", {"status": e.status, "error": str(e)})
+
+    async def _route(self, method: str, path: str, body: bytes, writer: asyncio.StreamWriter):
+        if path == "/health":
+            await self._send_json(writer, 200, {
+                "status": "ok", "profile": get_config()['profile_name'],
+                "running": self.running, "queued": self.admitted - self.running, "sessions": len(self.sessions),
+            })
+        elif path == "/stats":
+            completed = self.stats["completed"]
+            await self._send_json(writer, 200, {
+                **{k: v for k, v in self.stats.items() if k != "latency_seconds"},
+                "avg_latency_seconds": self.stats["latency_seconds"] / completed if completed else 0.0,
+                "running": self.running, "admitted": self.admitted, "sessions": len(self.sessions),
+            })
+        elif path == "/metrics":
+            body = Tracer.prometheus_text().encode("utf-8")
+            writer.write(
+                f"HTTP/1.1 200 OK\r\nContent-Type: text/plain; version=0.0.4\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1") + body
+            )
+            await writer.drain()
+        elif path == "/query":
+            if method != "POST":
+                raise HTTPError(405, "Use POST /query.")
+            await self._handle_query(writer, self._parse_query(body))
+        else:
+            raise HTTPError(404, f"No route for {path}.")
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            method, path, body = await self._read_request(reader)
+            await self._route(method, path, body, writer)
+        except HTTPError as e:
+            await self._send_json(writer, e.status, {"error": str(e)})
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError):
+            await self._send_json(writer, 400, {"error": "Malformed request."})
+        except ConnectionError:
+            pass  # The client went away; an in-flight query still finishes and is learned from.
+        finally:
+            writer.close()
+
+    async def serve_forever(self):
+        self._slots = asyncio.Semaphore(self.max_concurrent)
+        server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        print(f"HyDRA server listening on http://{self.host}:{self.port} "
+              f"(workers: {self.max_concurrent}, queue: {self.max_queued}, timeout: {self.timeout}s)")
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,134 @@
+# src/services/collection_versions.py
+import os
+import re
+import time
+from pymilvus import MilvusClient
+from src.utils.config_loader import ConfigLoader
+from src.services.ingestion_manifest import IngestionManifest
+from src.services.milvus_setup import alias_target, create_knowledge_collection
+from src.retrieval.cache import bump_collection_generation
+from src.retrieval.chunk_store import chunk_store_path, delete_chunk_store, link_chunk_store
+
+def connect() -> MilvusClient:
+    """A client for the configured Milvus (MILVUS_URI / MILVUS_TOKEN), like ingestion and the retriever use."""
+    return MilvusClient(uri=os.getenv("MILVUS_URI"), token=os.getenv("MILVUS_TOKEN"))
+
+def list_versions(client: MilvusClient, alias: str) -> list[str]:
+    """Versioned collections behind an alias, oldest first."""
+    # Versions are named after their creation time, to the second in older releases and to the microsecond since.
+    pattern = re.compile(rf"^{re.escape(alias)}_v\d{{14}}(\d{{6}})?$")
+    return sorted(name for name in client.list_collections() if pattern.match(name))
+
+def new_version_name(client: MilvusClient, alias: str) -> str:
+    """A version name that no existing collection uses."""
+    while True:
+        now = time.time()
+        version = f"{alias}_v{time.strftime('%Y%m%d%H%M%S', time.localtime(now))}{int(now % 1 * 1e6):06d}"
+        if not client.has_collection(version):
+            return version
+        time.sleep(1e-6)
+
+def wait_until_ready(client: MilvusClient, collection_name: str, timeout_seconds: float, poll_seconds: float = 5.0):
+    """Blocks until every index of the collection is built and the collection is loaded."""
+    deadline = time.monotonic() + timeout_seconds
+    while True:
+        indexes = [client.describe_index(collection_name=collection_name, index_name=name) for name in client.list_indexes(collection_name=collection_name)]
+        if all(str(index.get('state', 'Finished')) == 'Finished' and not index.get('pending_index_rows') for index in indexes):
+            break
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"Indexes of '{collection_name}' were not built within {timeout_seconds}s.")
+        time.sleep(poll_seconds)
+    client.load_collection(collection_name=collection_name, timeout=max(1.0, deadline - time.monotonic()))
+    if "Loaded" not in str(client.get_load_state(collection_name=collection_name).get('state')):
+        raise TimeoutError(f"'{collection_name}' did not finish loading.")
+
+def switch_alias(client: MilvusClient, alias: str, version: str):
+    """
+    Points the alias the retriever queries at a version. Milvus swaps an alias
+    atomically, so in-flight searches see either the old or the new collection.
+    """
+    current = alias_target(client, alias)
+    if current == version:
+        return
+    if current:
+        # Incremental ingests went through the alias; keep the old version's manifest in step for rollback.
+        IngestionManifest.copy(alias, current)
+        client.alter_alias(collection_name=version, alias=alias)
+    else:
+        if client.has_collection(alias):
+            # One-time migration from a plain collection: the name must be freed before it can become an alias.
+            print(f"Replacing the unversioned collection '{alias}' with an alias. Searches fail until the alias exists.")
+            client.drop_collection(alias)
+        client.create_alias(collection_name=version, alias=alias)
+    IngestionManifest.copy(version, alias)
+    if os.path.isdir(chunk_store_path(version)):
+        # Each version keeps its own chunk store; the alias's store is a link that follows the alias.
+        link_chunk_store(alias, version)
+    bump_collection_generation(alias)
+    print(f"Alias '{alias}' now points to '{version}'.")
+
+def prune_versions(client: MilvusClient, alias: str, keep_previous: int) -> list[str]:
+    """Drops all but the newest keep_previous versions that are not live. Returns what was dropped."""
+    current = alias_target(client, alias)
+    previous = [name for name in list_versions(client, alias) if name != current]
+    dropped = previous[:max(0, len(previous) - keep_previous)]
+    for name in dropped:
+        client.drop_collection(name)
+        IngestionManifest.delete(name)
+        delete_chunk_store(name)
+    return dropped
+
+def rebuild_collection(data_path: str, profile: str, keep_previous: int = None, batch_size: int = 128, workers: int = None, client: MilvusClient = None) -> str:
+    """
+    Blue/green rebuild of a profile's knowledge collection. A new versioned collection
+    is created with the profile's current index parameters and filled from data_path
+    while the live version keeps serving. Once its indexes are built and it is loaded,
+    the profile's collection name (an alias) is switched over, and all but the newest
+    keep_previous older versions are dropped. Returns the new version's name.
+    """
+    from data_processing.ingest import ingest_data
+    ConfigLoader.load(profile)
+    milvus_config = ConfigLoader.load()['milvus']
+    rebuild_config = milvus_config.get('rebuild', {})
+    alias = milvus_config['collection_name']
+    keep_previous = rebuild_config.get('keep_versions', 2) if keep_previous is None else keep_previous
+    client = client or connect()
+
+    version = new_version_name(client, alias)
+    print(f"Building '{version}' in the background; '{alias}' keeps serving '{alias_target(client, alias) or alias}'.")
+    create_knowledge_collection(client, version, milvus_config)
+    try:
+        summary = ingest_data(data_path, None, batch_size=batch_size, workers=workers, client=client, collection_name=version)
+        if summary is None:
+            raise ValueError(f"No documents were ingested from '{data_path}'.")
+        print(f"Waiting for the indexes of '{version}' to be built and loaded...")
+        wait_until_ready(client, version, rebuild_config.get('ready_timeout_seconds', 3600))
+    except BaseException:
+        # The live version was never touched; only the half-built one is discarded.
+        client.drop_collection(version)
+        IngestionManifest.delete(version)
+        delete_chunk_store(version)
+        raise
+
+    switch_alias(client, alias, version)
+    for name in prune_versions(client, alias, keep_previous):
+        print(f"Dropped old version '{name}'.")
+    return version
+
+def rollback_collection(profile: str, version: str = None, client: MilvusClient = None) -> str:
+    """Points the profile's alias back at a previous version (by default the newest one before the live version)."""
+    ConfigLoader.load(profile)
+    alias = ConfigLoader.load()['milvus']['collection_name']
+    client = client or connect()
+    versions = list_versions(client, alias)
+    current = alias_target(client, alias)
+    if version is None:
+        older = [name for name in versions if current is None or name < current]
+        if not older:
+            raise ValueError(f"No version of '{alias}' older than '{current}' is kept.")
+        version = older[-1]
+    elif version not in versions:
+        raise ValueError(f"'{version}' is not a kept version of '{alias}'. Available: {', '.join(versions) or 'none'}.")
+    client.load_collection(collection_name=version)
+    switch_alias(client, alias, version)
+    return version
@@ -0,0 +1,252 @@
+# src/services/component_registry.py
+import os
+import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pymilvus import MilvusClient
+from langchain_google_genai import ChatGoogleGenerativeAI
+from src.utils.config_loader import get_config
+from src.retrieval.backends import create_embedding_function, create_reranker, describe_backend
+from src.retrieval.cache import RetrievalCache
+from src.services.learning_worker import LearningWorker
+from src.services.llm_cache import LLMResponseCache, CachedLLM
+from src.services.memory_cache import UserMemoryCache
+from src.services.rate_limiter import RateLimiter, RateLimitedLLM
+from src.services.web_search import WebSearcher
+
+DEFAULT_LLM_MODEL = "gemini-1.5-pro-latest"
+
+class ComponentRegistry:
+    """
+    Process-wide registry of warm components. The BGE-M3 model, the reranker,
+    the Milvus client and the LLM clients are expensive to build, so they are
+    created once and borrowed by the ReasoningLoop and every agent.
+
+    Model components are keyed by the settings of the active deployment
+    profile, so switching profiles only loads what is actually different.
+    """
+    _components = {}
+    _overrides = {}
+    _load_stats = []
+    _lock = threading.RLock()
+    _llm_rate_limiter = None
+
+    @classmethod
+    def _get_or_create(cls, key: tuple, label: str, factory):
+        with cls._lock:
+            if key[0] in cls._overrides:
+                return cls._overrides[key[0]]
+            if key not in cls._components:
+                start = time.perf_counter()
+                cls._components[key] = factory()
+                elapsed = time.perf_counter() - start
+                cls._load_stats.append((label, elapsed))
+            return cls._components[key]
+
+    @staticmethod
+    def _backend_key() -> tuple:
+        embedding_config = get_config()['embedding']
+        return (
+            embedding_config.get('backend', 'torch'), embedding_config.get('use_fp16', False),
+            embedding_config.get('onnx_model_dir'),
+        )
+
+    @classmethod
+    def get_embedding_function(cls):
+        embedding_config = get_config()['embedding']
+        return cls._get_or_create(
+            ("embedding",) + cls._backend_key(),
+            f"BGE-M3 embedding {describe_backend(embedding_config)} [{get_config()['profile_name']}]",
+            lambda: create_embedding_function(embedding_config)
+        )
+
+    @classmethod
+    def get_reranker(cls):
+        embedding_config = get_config()['embedding']
+        return cls._get_or_create(
+            ("reranker",) + cls._backend_key(),
+            f"BGE reranker {describe_backend(embedding_config)} [{get_config()['profile_name']}]",
+            lambda: create_reranker(embedding_config)
+        )
+
+    @classmethod
+    def get_retrieval_cache(cls) -> RetrievalCache:
+        cache_config = get_config().get('retrieval', {}).get('cache', {})
+        return cls._get_or_create(
+            ("retrieval_cache", tuple(sorted(cache_config.items()))),
+            f"Retrieval cache [{get_config()['profile_name']}]",
+            lambda: RetrievalCache(cache_config)
+        )
+
+    @classmethod
+    def get_retriever(cls):
+        """
+        Returns the shared hybrid retriever. Sharing it across sessions lets its query batcher
+        coalesce embedding and reranking work from every in-flight query into one batch.
+        """
+        # Imported lazily: the retriever borrows its models from this registry.
+        from src.retrieval.engine import HyDRARetriever
+        return cls._get_or_create(
+            ("retriever", get_config()['profile_name']) + cls._backend_key(),
+            f"Hybrid retriever [{get_config()['profile_name']}]",
+            lambda: HyDRARetriever()
+        )
+
+    @classmethod
+    def get_web_searcher(cls) -> WebSearcher:
+        """Returns the shared web searcher, so its HTTP connection pool and result cache serve every session."""
+        web_config = get_config().get('web_search', {})
+        return cls._get_or_create(
+            ("web_searcher", json.dumps(web_config, sort_keys=True)),
+            f"Web searcher ({web_config.get('backend', 'duckduckgo')})",
+            lambda: WebSearcher(web_config)
+        )
+
+    @classmethod
+    def get_speculation_pool(cls) -> ThreadPoolExecutor:
+        """Returns the thread pool that runs speculative HyDE generation for every vector agent."""
+        max_workers = get_config().get('retrieval', {}).get('speculative', {}).get('max_workers', 4)
+        return cls._get_or_create(
+            ("speculation_pool", max_workers),
+            f"Speculative HyDE thread pool ({max_workers} workers)",
+            lambda: ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hydra-speculative")
+        )
+
+    @classmethod
+    def get_milvus_client(cls) -> MilvusClient:
+        uri, token = os.getenv("MILVUS_URI"), os.getenv("MILVUS_TOKEN")
+        return cls._get_or_create(
+            ("milvus", uri, token),
+            f"Milvus client ({uri})",
+            lambda: MilvusClient(uri=uri, token=token)
+        )
+
+    @classmethod
+    def get_llm(cls, temperature: float = 0.0, model: str = DEFAULT_LLM_MODEL, gemini_api_key: str = None, agent: str = None):
+        """
+        Returns the shared LLM client. Deterministic (temperature 0) calls made on behalf of
+        an agent go through the profile's response cache when it is enabled. Under a rate
+        limit only the calls that actually reach the API (cache misses) take a token.
+        """
+        api_key = gemini_api_key or os.getenv("GEMINI_API_KEY")
+        llm = cls._get_or_create(
+            ("llm", model, temperature, api_key),
+            f"LLM client ({model}, t={temperature})",
+            lambda: ChatGoogleGenerativeAI(model=model, google_api_key=api_key, temperature=temperature)
+        )
+        if cls._llm_rate_limiter is not None:
+            llm = RateLimitedLLM(llm, cls._llm_rate_limiter)
+        cache_config = get_config().get('llm_cache', {})
+        if agent is None or temperature != 0.0 or not cache_config.get('enabled', False):
+            return llm
+        ttls = cache_config.get('ttl_seconds', {})
+        return CachedLLM(llm, cls.get_llm_cache(), agent=agent, model=model, temperature=temperature,
+                         ttl_seconds=ttls.get(agent, ttls.get('default', 86400)))
+
+    @classmethod
+    def set_llm_rate_limit(cls, qps: float | None) -> RateLimiter | None:
+        """Caps LLM API calls across the whole process. Applies to clients borrowed after the call."""
+        with cls._lock:
+            cls._llm_rate_limiter = RateLimiter(qps) if qps else None
+            return cls._llm_rate_limiter
+
+    @classmethod
+    def get_llm_cache(cls) -> LLMResponseCache:
+        cache_config = get_config().get('llm_cache', {})
+        path = cache_config.get('path', '.hydra/llm_cache.sqlite')
+        return cls._get_or_create(
+            ("llm_cache", path),
+            f"LLM response cache ({path})",
+            lambda: LLMResponseCache(path, max_bytes=int(cache_config.get('max_mb', 512) * 1024 * 1024))
+        )
+
+    @classmethod
+    def get_memory_cache(cls) -> UserMemoryCache | None:
+        """Returns the per-user hot cache of preferences and policy rows, or None when the profile reads Milvus every time."""
+        cache_config = get_config().get('memory', {}).get('hot_cache', {})
+        if not cache_config.get('enabled', False):
+            return None
+        return cls._get_or_create(
+            ("memory_cache", tuple(sorted(cache_config.items()))),
+            f"Memory hot cache [{get_config()['profile_name']}]",
+            lambda: UserMemoryCache(cache_config)
+        )
+
+    @classmethod
+    def get_learning_worker(cls) -> LearningWorker | None:
+        """Returns the shared background learning worker, or None when the profile learns synchronously."""
+        learning_config = get_config().get('learning', {})
+        if not learning_config.get('background', True):
+            return None
+        wal_path = learning_config.get('wal_path', '.hydra/learning_wal.jsonl')
+        maintenance_config = get_config().get('memory', {}).get('maintenance')
+        return cls._get_or_create(
+            ("learning_worker", wal_path),
+            f"Learning worker ({wal_path})",
+            lambda: LearningWorker(
+                wal_path, queue_size=learning_config.get('queue_size', 256), batch_size=learning_config.get('batch_size', 32),
+                maintenance_config=maintenance_config, compact_every=learning_config.get('compact_every', 1000),
+                max_attempts=learning_config.get('max_attempts', 3), retry_backoff_seconds=learning_config.get('retry_backoff_seconds', 1.0)
+            )
+        )
+
+    @classmethod
+    def get_policy_router(cls):
+        """Returns the shared learned router, or None when the profile routes every sub-task through the LLM."""
+        routing_config = get_config().get('routing', {})
+        if routing_config.get('mode', 'llm') != 'learned':
+            return None
+        # Imported lazily: the router's memory agent borrows from this registry.
+        from src.agents.memory_agent import HydraMemoryAgent
+        from src.agents.router import PolicyRouter
+        return cls._get_or_create(
+            ("policy_router", tuple(sorted(routing_config.items()))),
+            f"Learned policy router [{get_config()['profile_name']}]",
+            lambda: PolicyRouter(HydraMemoryAgent(), routing_config)
+        )
+
+    @classmethod
+    def override(cls, kind: str, component):
+        """
+        Serves `component` for every request of one kind ("llm", "milvus", "embedding", ...),
+        whatever the profile asks for. Used by the offline benchmarks to swap in local stand-ins.
+        """
+        with cls._lock:
+            cls._overrides[kind] = component
+
+    @classmethod
+    def clear_overrides(cls):
+        with cls._lock:
+            cls._overrides.clear()
+
+    @classmethod
+    def shutdown(cls, timeout: float = 30.0) -> bool:
+        """Flushes background workers. Returns False if some jobs were left in their write-ahead log."""
+        with cls._lock:
+            workers = [c for key, c in cls._components.items() if key[0] == "learning_worker"]
+            searchers = [c for key, c in cls._components.items() if key[0] == "web_searcher"]
+            pools = [c for key, c in cls._components.items() if key[0] == "speculation_pool"]
+        for searcher in searchers:
+            searcher.close()
+        for pool in pools:
+            pool.shutdown(wait=False, cancel_futures=True)
+        return all([worker.close(timeout) for worker in workers])
+
+    @classmethod
+    def warm_up(cls) -> list[tuple[str, float]]:
+        """Eagerly loads the components needed by the active profile and returns their load times."""
+        cls.get_milvus_client()
+        cls.get_embedding_function()
+        cls.get_reranker()
+        cls.get_llm(temperature=0.0)
+        cls.get_llm(temperature=0.3)
+        cls.get_web_searcher()
+        # Starting the worker early also replays learning jobs left over from the last run.
+        cls.get_learning_worker()
+        return cls.load_stats()
+
+    @classmethod
+    def load_stats(cls) -> list[tuple[str, float]]:
+        with cls._lock:
+            return list(cls._load_stats)
@@ -0,0 +1,146 @@
+# src/services/ingestion_manifest.py
+import os
+import json
+import sqlite3
+import hashlib
+import threading
+
+MANIFEST_DIR = os.getenv("HYDRA_MANIFEST_DIR", ".hydra/manifests")
+
+def content_sha256(data: bytes | str) -> str:
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+def manifest_path(collection_name: str) -> str:
+    return os.path.join(MANIFEST_DIR, f"{collection_name}.sqlite")
+
+def legacy_manifest_path(collection_name: str) -> str:
+    return os.path.join(MANIFEST_DIR, f"{collection_name}.json")
+
+class IngestionManifest:
+    """
+    Records what has been ingested into a knowledge collection: for every source
+    file its content hash, and for every chunk its content hash and Milvus id.
+
+    The manifest lives in SQLite and is read one file at a time, so memory use does
+    not grow with the corpus. A file only gets its hash recorded once all of its new
+    chunks were inserted, so a failed or interrupted run is retried on the next
+    ingestion; chunks that were inserted before the interruption are recorded as
+    they go and are reused rather than inserted again.
+    """
+    def __init__(self, path: str, exists: bool):
+        self.path = path
+        self.exists = exists
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS files (source TEXT PRIMARY KEY, file_hash TEXT, pending_hash TEXT)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS chunks (source TEXT, chunk_hash TEXT, id INTEGER)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_chunks_source ON chunks(source)")
+        # Sources met during this run, to find the files that were removed from disk.
+        self._conn.execute("CREATE TEMP TABLE IF NOT EXISTS seen (source TEXT PRIMARY KEY)")
+        self._conn.commit()
+
+    @classmethod
+    def load(cls, collection_name: str) -> "IngestionManifest":
+        path = manifest_path(collection_name)
+        legacy_path = legacy_manifest_path(collection_name)
+        manifest = cls(path, os.path.exists(path) or os.path.exists(legacy_path))
+        if os.path.exists(legacy_path):
+            manifest._import_legacy(legacy_path)
+        # Hashes left pending by an interrupted run must not be confirmed by this one.
+        with manifest._lock:
+            manifest._conn.execute("UPDATE files SET pending_hash = NULL")
+            manifest._conn.commit()
+        return manifest
+
+    def _import_legacy(self, legacy_path: str):
+        """One-time migration from the single-JSON manifest of earlier versions."""
+        with open(legacy_path, "r") as f:
+            files = json.load(f).get("files", {})
+        with self._lock:
+            for source, entry in files.items():
+                self._conn.execute("INSERT OR REPLACE INTO files (source, file_hash) VALUES (?, ?)", (source, entry.get("file_hash")))
+                self._conn.execute("DELETE FROM chunks WHERE source = ?", (source,))
+                self._conn.executemany("INSERT INTO chunks (source, chunk_hash, id) VALUES (?, ?, ?)", [(source, h, i) for h, i in entry.get("chunks", [])])
+            self._conn.commit()
+        os.remove(legacy_path)
+
+    @staticmethod
+    def delete(collection_name: str):
+        """Forgets everything ingested into a collection, e.g. after it was dropped."""
+        path = manifest_path(collection_name)
+        for leftover in (path, f"{path}-journal", legacy_manifest_path(collection_name)):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+
+    @staticmethod
+    def copy(source_collection: str, target_collection: str):
+        """Makes target_collection's manifest a copy of source_collection's, or removes it if there is none."""
+        source_path, target_path = manifest_path(source_collection), manifest_path(target_collection)
+        if os.path.exists(legacy_manifest_path(source_collection)):
+            IngestionManifest.load(source_collection).close()
+        if not os.path.exists(source_path):
+            IngestionManifest.delete(target_collection)
+            return
+        os.makedirs(os.path.dirname(target_path), exist_ok=True)
+        if os.path.exists(f"{target_path}.tmp"):
+            os.remove(f"{target_path}.tmp")
+        source, target = sqlite3.connect(source_path), sqlite3.connect(f"{target_path}.tmp")
+        try:
+            source.backup(target)
+        finally:
+            source.close()
+            target.close()
+        os.replace(f"{target_path}.tmp", target_path)
+
+    def get(self, source: str) -> dict | None:
+        with self._lock:
+            row = self._conn.execute("SELECT file_hash FROM files WHERE source = ?", (source,)).fetchone()
+            if row is None:
+                return None
+            chunks = self._conn.execute("SELECT chunk_hash, id FROM chunks WHERE source = ? ORDER BY rowid", (source,)).fetchall()
+        return {"file_hash": row[0], "chunks": [[chunk_hash, chunk_id] for chunk_hash, chunk_id in chunks]}
+
+    def mark_seen(self, source: str):
+        with self._lock:
+            self._conn.execute("INSERT OR IGNORE INTO seen (source) VALUES (?)", (source,))
+
+    def unseen_sources(self) -> list[str]:
+        """Recorded sources that were not marked as seen in this run."""
+        with self._lock:
+            rows = self._conn.execute("SELECT source FROM files WHERE source NOT IN (SELECT source FROM seen) ORDER BY source").fetchall()
+        return [source for source, in rows]
+
+    def begin_file(self, source: str, file_hash: str, kept_chunks: list):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO files (source, file_hash, pending_hash) VALUES (?, NULL, ?)", (source, file_hash))
+            self._conn.execute("DELETE FROM chunks WHERE source = ?", (source,))
+            self._conn.executemany("INSERT INTO chunks (source, chunk_hash, id) VALUES (?, ?, ?)", [(source, h, i) for h, i in kept_chunks])
+
+    def add_chunks(self, source: str, chunks: list):
+        with self._lock:
+            self._conn.executemany("INSERT INTO chunks (source, chunk_hash, id) VALUES (?, ?, ?)", [(source, h, i) for h, i in chunks])
+
+    def mark_failed(self, source: str):
+        with self._lock:
+            self._conn.execute("UPDATE files SET pending_hash = NULL WHERE source = ?", (source,))
+
+    def remove(self, source: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM files WHERE source = ?", (source,))
+            self._conn.execute("DELETE FROM chunks WHERE source = ?", (source,))
+
+    def finalize(self):
+        with self._lock:
+            self._conn.execute("UPDATE files SET file_hash = pending_hash, pending_hash = NULL WHERE pending_hash IS NOT NULL")
+
+    def save(self):
+        with self._lock:
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
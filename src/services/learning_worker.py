@@ -0,0 +1,243 @@
+# src/services/learning_worker.py
+import os
+import glob
+import json
+import fcntl
+import time
+import uuid
+import queue
+import threading
+
+class LearningWorker:
+    """
+    Runs the HELP/SIMPSON learning steps (preference analysis, interaction summaries,
+    policy feedback) on a background thread, off the response critical path.
+
+    Every job is appended to a write-ahead log before it is queued and acknowledged
+    once processed. Each process writes its own log next to `wal_path` and holds a lock
+    on it while alive; on start, a worker takes over the logs of processes that exited
+    with jobs pending and replays them. The log is compacted every `compact_every`
+    acknowledgements, and analysis jobs are retried up to `max_attempts` times before
+    they are acknowledged as failed.
+
+    Memory writes are embedded and inserted in batches, and a bounded queue applies
+    backpressure to producers when the worker falls behind. Every `every_writes`
+    memories written for a user, the worker also runs memory maintenance for them.
+    """
+    _STOP = object()
+
+    def __init__(self, wal_path: str, queue_size: int = 256, batch_size: int = 32, maintenance_config: dict = None,
+                 compact_every: int = 1000, max_attempts: int = 3, retry_backoff_seconds: float = 1.0):
+        stem, ext = os.path.splitext(wal_path)
+        ext = ext or ".jsonl"
+        self.shared_wal_path = wal_path
+        self._log_pattern = f"{glob.escape(stem)}.*{ext}"
+        self.wal_path = f"{stem}.{os.getpid()}-{uuid.uuid4().hex[:8]}{ext}"
+        self.ack_path = f"{self.wal_path}.acks"
+        self.batch_size = batch_size
+        self.compact_every = compact_every
+        self.max_attempts = max(1, max_attempts)
+        self.retry_backoff_seconds = retry_backoff_seconds
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.processed = 0
+        self.failed = 0
+        self._analyzer = None
+        self._memory_agent = None
+        self._maintenance_config = maintenance_config
+        self._writes_since_maintenance = {}
+        self._acks_since_compaction = 0
+        self._file_lock = threading.Lock()
+        os.makedirs(os.path.dirname(wal_path) or ".", exist_ok=True)
+        self._lock_file = open(f"{self.wal_path}.lock", "w")
+        fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+        self._replay_jobs = self._recover()
+        self._thread = threading.Thread(target=self._run, name="hydra-learning-worker", daemon=True)
+        self._thread.start()
+
+    @staticmethod
+    def _pending_jobs(wal_path: str) -> list[dict]:
+        """The jobs in a log that were never acknowledged."""
+        acked = set()
+        if os.path.exists(f"{wal_path}.acks"):
+            with open(f"{wal_path}.acks", "r") as f:
+                acked = {line.strip() for line in f if line.strip()}
+        pending = []
+        if os.path.exists(wal_path):
+            with open(wal_path, "r") as f:
+                for line in f:
+                    try:
+                        job = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # A torn last line from a crash mid-write.
+                    if job["id"] not in acked:
+                        pending.append(job)
+        return pending
+
+    def _recover(self) -> list[dict]:
+        """Takes over the logs of exited processes and returns their pending jobs, now logged in this process's own log."""
+        orphans = [path for path in glob.glob(self._log_pattern) if path != self.wal_path]
+        if os.path.exists(self.shared_wal_path):
+            orphans.append(self.shared_wal_path)  # The single log of older versions.
+        pending, adopted = [], []
+        for path in orphans:
+            lock_file = open(f"{path}.lock", "w")
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                lock_file.close()  # The log of a live process.
+                continue
+            pending.extend(self._pending_jobs(path))
+            adopted.append((path, lock_file))
+        # The jobs are logged here before the old logs go: a crash in between replays them twice, never loses them.
+        if pending:
+            self._append(self.wal_path, [json.dumps(job) for job in pending])
+        for path, lock_file in adopted:
+            for leftover in (path, f"{path}.acks", f"{path}.lock"):
+                if os.path.exists(leftover):
+                    os.remove(leftover)
+            lock_file.close()
+        if pending:
+            print(f"LearningWorker: replaying {len(pending)} pending learning job(s) from {len(adopted)} earlier log(s).")
+        return pending
+
+    def _compact(self) -> int:
+        """Rewrites this process's log to its unacknowledged jobs, clears the acks and returns how many jobs remain."""
+        with self._file_lock:
+            pending = self._pending_jobs(self.wal_path)
+            with open(f"{self.wal_path}.tmp", "w") as f:
+                f.writelines(json.dumps(job) + "\n" for job in pending)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(f"{self.wal_path}.tmp", self.wal_path)
+            open(self.ack_path, "w").close()
+            self._acks_since_compaction = 0
+        return len(pending)
+
+    def _append(self, path: str, lines: list[str]):
+        with self._file_lock:
+            with open(path, "a") as f:
+                f.writelines(line + "\n" for line in lines)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def submit(self, job_type: str, **payload):
+        """Logs and queues a job. Blocks while the queue is full."""
+        job = {"id": uuid.uuid4().hex, "type": job_type, "payload": payload}
+        self._append(self.wal_path, [json.dumps(job)])
+        self.queue.put(job)
+
+    def submit_memory(self, memory: dict):
+        self.submit("memory", memory=memory)
+
+    def submit_analysis(self, transcript: str, user_id: str, session_id: str):
+        self.submit("analyze", transcript=transcript, user_id=user_id, session_id=session_id)
+
+    @property
+    def pending(self) -> int:
+        return self.queue.unfinished_tasks
+
+    def _agents(self):
+        # Imported lazily: the agents themselves borrow from the component registry.
+        from src.agents.memory_agent import HydraMemoryAgent
+        from src.agents.post_interaction_analyzer import PostInteractionAnalyzer
+        if self._memory_agent is None:
+            self._memory_agent = HydraMemoryAgent()
+            self._analyzer = PostInteractionAnalyzer(os.getenv("GEMINI_API_KEY"))
+        return self._memory_agent, self._analyzer
+
+    def _process(self, jobs: list[dict]) -> bool:
+        from src.agents.memory_agent import HydraMemoryAgent
+        memory_agent, analyzer = self._agents()
+        memories = []
+        for job in jobs:
+            payload = job["payload"]
+            if job["type"] == "memory":
+                memories.append(payload["memory"])
+                continue
+            for attempt in range(1, self.max_attempts + 1):
+                try:
+                    preferences = analyzer.infer_preferences(payload["transcript"])
+                    memories.extend(HydraMemoryAgent.preference_memory(payload["user_id"], p, payload["session_id"]) for p in preferences)
+                    break
+                except Exception as e:
+                    if attempt == self.max_attempts:
+                        # Acknowledged with the rest of the batch, so one bad transcript can't block the log forever.
+                        self.failed += 1
+                        print(f"LearningWorker: job '{job['type']}' failed after {attempt} attempt(s), dropping it: {e}")
+                    else:
+                        time.sleep(self.retry_backoff_seconds * 2 ** (attempt - 1))
+        try:
+            memory_agent.save_many(memories)
+        except Exception as e:
+            # Leave the jobs unacknowledged so they are replayed on the next start.
+            print(f"LearningWorker: failed to write {len(memories)} memories to Milvus: {e}")
+            return False
+        self._maintain(memory_agent, memories)
+        return True
+
+    def _maintain(self, memory_agent, memories: list[dict]):
+        every_writes = (self._maintenance_config or {}).get('every_writes', 0)
+        if not every_writes:
+            return
+        from src.services.memory_maintenance import MemoryMaintenance
+        for memory in memories:
+            user_id = memory["user_id"]
+            self._writes_since_maintenance[user_id] = self._writes_since_maintenance.get(user_id, 0) + 1
+            if self._writes_since_maintenance[user_id] < every_writes:
+                continue
+            self._writes_since_maintenance[user_id] = 0
+            try:
+                MemoryMaintenance(memory_agent.client, self._maintenance_config, cache=memory_agent.cache).run_user(user_id)
+            except Exception as e:
+                # The memories themselves were written; maintenance is retried after the next batch of writes.
+                print(f"LearningWorker: memory maintenance for '{user_id}' failed: {e}")
+
+    def _handle(self, jobs: list[dict]):
+        for start in range(0, len(jobs), self.batch_size):
+            batch = jobs[start:start + self.batch_size]
+            if self._process(batch):
+                self._append(self.ack_path, [job["id"] for job in batch])
+                self.processed += len(batch)
+                self._acks_since_compaction += len(batch)
+                if self.compact_every and self._acks_since_compaction >= self.compact_every:
+                    self._compact()
+
+    def _run(self):
+        self._handle(self._replay_jobs)
+        self._replay_jobs = []
+        stopping = False
+        while not stopping:
+            item = self.queue.get()
+            items = [item]
+            while len(items) < self.batch_size:
+                try:
+                    items.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            jobs = [job for job in items if job is not self._STOP]
+            stopping = len(jobs) != len(items)
+            try:
+                self._handle(jobs)
+            finally:
+                for _ in items:
+                    self.queue.task_done()
+
+    def flush(self, timeout: float = 30.0) -> bool:
+        """Waits until every queued job has been processed. Returns False on timeout."""
+        deadline = time.monotonic() + timeout
+        while self.queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.05)
+        return self.queue.unfinished_tasks == 0
+
+    def close(self, timeout: float = 30.0) -> bool:
+        """Flushes pending jobs and stops the worker. Unfinished jobs stay in the log."""
+        flushed = self.flush(timeout)
+        if flushed:
+            self.queue.put(self._STOP)
+            self._thread.join(timeout=5)
+            if not self._compact():
+                for path in (self.wal_path, self.ack_path, f"{self.wal_path}.lock"):
+                    os.remove(path)
+        # Releasing the lock lets the next worker take over whatever is left in the log.
+        self._lock_file.close()
+        return flushed
@@ -0,0 +1,122 @@
+# src/services/llm_cache.py
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from langchain_core.messages import AIMessage
+
+class LLMResponseCache:
+    """
+    Disk-backed (SQLite) cache of deterministic LLM responses, keyed by
+    (model, temperature, rendered prompt hash). Entries expire by a TTL chosen
+    per agent, and the least recently used ones are evicted once the store
+    exceeds its size cap. Hits, misses and the LLM time saved are tracked per agent.
+    """
+    def __init__(self, path: str, max_bytes: int = 512 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._stats = {}
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, agent TEXT, content TEXT, size INTEGER, "
+            "latency REAL, created_at REAL, last_access REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON responses(last_access)")
+        self._conn.commit()
+        self._bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    @staticmethod
+    def make_key(model: str, temperature: float, prompt: str) -> str:
+        return hashlib.sha256(f"{model}\x00{temperature}\x00{prompt}".encode("utf-8")).hexdigest()
+
+    def _agent_stats(self, agent: str) -> dict:
+        return self._stats.setdefault(agent, {"hits": 0, "misses": 0, "time_saved": 0.0})
+
+    def get(self, key: str, agent: str, ttl_seconds: float) -> str | None:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT content, latency, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            stats = self._agent_stats(agent)
+            if row is None or row[2] + ttl_seconds < now:
+                stats["misses"] += 1
+                return None
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            stats["hits"] += 1
+            stats["time_saved"] += row[1]
+            return row[0]
+
+    def put(self, key: str, agent: str, content: str, latency: float):
+        size = len(content.encode("utf-8"))
+        now = time.time()
+        with self._lock:
+            previous = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, agent, content, size, latency, created_at, last_access) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, agent, content, size, latency, now, now)
+            )
+            self._bytes += size - (previous[0] if previous else 0)
+            while self._bytes > self.max_bytes:
+                oldest = self._conn.execute("SELECT key, size FROM responses ORDER BY last_access LIMIT 64").fetchall()
+                if not oldest:
+                    break
+                self._conn.executemany("DELETE FROM responses WHERE key = ?", [(k,) for k, _ in oldest])
+                self._bytes -= sum(s for _, s in oldest)
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            result = {}
+            for agent, stats in self._stats.items():
+                lookups = stats["hits"] + stats["misses"]
+                result[agent] = {**stats, "hit_rate": stats["hits"] / lookups if lookups else 0.0}
+            return result
+
+class CachedLLM:
+    """
+    Drop-in wrapper around a chat model for deterministic (temperature 0) calls.
+    invoke() and batch() are served from the shared cache; stream() is passed through.
+    """
+    def __init__(self, llm, cache: LLMResponseCache, agent: str, model: str, temperature: float, ttl_seconds: float):
+        self.llm = llm
+        self.cache = cache
+        self.agent = agent
+        self.model = model
+        self.temperature = temperature
+        self.ttl_seconds = ttl_seconds
+
+    def _key(self, prompt) -> str:
+        return self.cache.make_key(self.model, self.temperature, str(prompt))
+
+    def invoke(self, prompt, *args, **kwargs) -> AIMessage:
+        key = self._key(prompt)
+        content = self.cache.get(key, self.agent, self.ttl_seconds)
+        if content is not None:
+            return AIMessage(content=content)
+        start = time.perf_counter()
+        response = self.llm.invoke(prompt, *args, **kwargs)
+        self.cache.put(key, self.agent, response.content, time.perf_counter() - start)
+        return response
+
+    def batch(self, prompts: list, *args, **kwargs) -> list:
+        keys = [self._key(prompt) for prompt in prompts]
+        responses = [self.cache.get(key, self.agent, self.ttl_seconds) for key in keys]
+        responses = [AIMessage(content=content) if content is not None else None for content in responses]
+        missing = [i for i, response in enumerate(responses) if response is None]
+        if missing:
+            start = time.perf_counter()
+            fresh = self.llm.batch([prompts[i] for i in missing], *args, **kwargs)
+            # Calls in a batch run concurrently, so each one is credited with the batch's wall time.
+            latency = time.perf_counter() - start
+            for i, response in zip(missing, fresh):
+                self.cache.put(keys[i], self.agent, response.content, latency)
+                responses[i] = response
+        return responses
+
+    def stream(self, prompt, *args, **kwargs):
+        return self.llm.stream(prompt, *args, **kwargs)
@@ -0,0 +1,97 @@
+# src/services/memory_cache.py
+import time
+import threading
+from collections import OrderedDict
+import numpy as np
+
+class UserMemoryCache:
+    """
+    In-process, per-user copy of the memories read on every query: preferences and the
+    policy rows (raw feedback plus aggregated statistics) behind routing. Each part is
+    loaded from Milvus on first use, updated in place when this process writes, and
+    reloaded after `ttl_seconds` to pick up writes from other processes. Policy
+    neighbours are then found with one NumPy product instead of a Milvus search.
+    """
+    POLICY_TYPES = ("policy_feedback", "policy_stats")
+
+    def __init__(self, cache_config: dict):
+        self.max_users = cache_config.get('max_users', 1000)
+        self.ttl_seconds = cache_config.get('ttl_seconds', 300)
+        self.hits = 0
+        self.misses = 0
+        self._users = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _entry(self, user_id: str) -> dict:
+        entry = self._users.get(user_id)
+        if entry is None:
+            entry = self._users[user_id] = {"preferences": None, "policy": None}
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+        self._users.move_to_end(user_id)
+        return entry
+
+    def _fresh(self, part) -> bool:
+        return part is not None and part["loaded_at"] + self.ttl_seconds > time.time()
+
+    def preferences(self, user_id: str, loader) -> list[str]:
+        """Returns the user's preferences, calling loader() -> list[str] on a miss."""
+        with self._lock:
+            part = self._entry(user_id)["preferences"]
+            if self._fresh(part):
+                self.hits += 1
+                return list(part["items"])
+            self.misses += 1
+        items = loader()
+        with self._lock:
+            self._entry(user_id)["preferences"] = {"items": list(items), "loaded_at": time.time()}
+        return items
+
+    def policy(self, user_id: str, loader) -> tuple[list[dict], np.ndarray]:
+        """Returns the user's policy rows and their vectors, calling loader() -> list[dict] (rows with a 'vector') on a miss."""
+        with self._lock:
+            part = self._entry(user_id)["policy"]
+            if self._fresh(part):
+                self.hits += 1
+                return part["rows"], part["vectors"]
+            self.misses += 1
+        rows = loader()
+        part = self._policy_part([{k: v for k, v in row.items() if k != "vector"} for row in rows], [row["vector"] for row in rows])
+        with self._lock:
+            self._entry(user_id)["policy"] = part
+        return part["rows"], part["vectors"]
+
+    @staticmethod
+    def _policy_part(rows: list[dict], vectors: list) -> dict:
+        matrix = np.asarray(vectors, dtype=np.float32) if vectors else np.zeros((0, 0), dtype=np.float32)
+        return {"rows": rows, "vectors": matrix, "loaded_at": time.time()}
+
+    def record(self, rows: list[dict]):
+        """Applies freshly written memory rows to the users whose parts are loaded."""
+        with self._lock:
+            for row in rows:
+                entry = self._users.get(row["user_id"])
+                if entry is None:
+                    continue
+                if row["memory_type"] == "preference" and entry["preferences"] is not None:
+                    entry["preferences"]["items"].append(row["content"])
+                elif row["memory_type"] in self.POLICY_TYPES and entry["policy"] is not None:
+                    policy = entry["policy"]
+                    stored = {k: v for k, v in row.items() if k != "vector"}
+                    vectors = list(policy["vectors"]) + [np.asarray(row["vector"], dtype=np.float32)]
+                    updated = self._policy_part(policy["rows"] + [stored], vectors)
+                    updated["loaded_at"] = policy["loaded_at"]
+                    entry["policy"] = updated
+
+    def invalidate(self, user_id: str = None):
+        """Drops one user's entry (e.g. after maintenance rewrote their rows), or every entry."""
+        with self._lock:
+            if user_id is None:
+                self._users.clear()
+            else:
+                self._users.pop(user_id, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {"users": len(self._users), "hits": self.hits, "misses": self.misses, "hit_rate": self.hits / lookups if lookups else 0.0}
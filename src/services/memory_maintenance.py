@@ -0,0 +1,172 @@
+# src/services/memory_maintenance.py
+import json
+import time
+import uuid
+import argparse
+import numpy as np
+from dotenv import load_dotenv
+from src.services.milvus_setup import MEMORY_COLLECTION
+
+# Milvus caps a single query at 16384 rows.
+QUERY_LIMIT = 16384
+DAY_SECONDS = 86400
+
+def _created_at(row: dict) -> float:
+    # Rows written before timestamps were recorded count as the oldest.
+    return float((row.get('metadata') or {}).get('created_at', 0.0))
+
+def _unit(vector) -> np.ndarray:
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+class MemoryMaintenance:
+    """
+    Keeps each user's slice of hydra_memory_store bounded:
+
+    - Raw policy_feedback rows older than `aggregate_after_hours` are folded into
+      policy_stats rows, one per (task cluster, executor, strategy). A row joins the
+      cluster whose centroid it is most similar to (at least `cluster_similarity`) and
+      adds to its count and score sum; the router reads the mean score weighted by count.
+    - interaction_summary rows older than `interaction_ttl_days` are deleted.
+    - Repeated preferences are kept once, and every memory type is capped at
+      `max_rows[type]` rows per user, dropping the oldest.
+
+    The user's hot cache entry is dropped afterwards so the next read sees the result.
+    """
+    def __init__(self, client, maintenance_config: dict, cache=None):
+        self.client = client
+        self.aggregate_after_seconds = maintenance_config.get('aggregate_after_hours', 24) * 3600
+        self.cluster_similarity = maintenance_config.get('cluster_similarity', 0.85)
+        self.interaction_ttl_seconds = maintenance_config.get('interaction_ttl_days', 30) * DAY_SECONDS
+        self.max_rows = maintenance_config.get('max_rows', {})
+        self.cache = cache
+
+    def _rows(self, user_id: str, memory_type: str, output_fields: list[str]) -> list[dict]:
+        return self.client.query(
+            collection_name=MEMORY_COLLECTION,
+            filter=f'user_id == {json.dumps(user_id)} and memory_type == {json.dumps(memory_type)}',
+            output_fields=output_fields, limit=QUERY_LIMIT
+        )
+
+    def _delete(self, ids: list) -> int:
+        if ids:
+            self.client.delete(collection_name=MEMORY_COLLECTION, ids=ids)
+        return len(ids)
+
+    def list_users(self) -> list[str]:
+        """Every user_id with memories, gathered a query page at a time."""
+        users = set()
+        while True:
+            condition = f'user_id not in {json.dumps(sorted(users))}' if users else 'user_id != ""'
+            rows = self.client.query(collection_name=MEMORY_COLLECTION, filter=condition, output_fields=["user_id"], limit=QUERY_LIMIT)
+            new_users = {row['user_id'] for row in rows} - users
+            if not new_users:
+                return sorted(users)
+            users |= new_users
+
+    def aggregate_policy(self, user_id: str, now: float) -> tuple[int, int]:
+        """Folds old policy feedback into policy_stats rows. Returns (feedback rows folded, stats rows written)."""
+        cutoff = now - self.aggregate_after_seconds
+        fields = ["id", "session_id", "content", "vector", "metadata"]
+        feedback = sorted((row for row in self._rows(user_id, "policy_feedback", fields) if _created_at(row) <= cutoff), key=_created_at)
+        if not feedback:
+            return 0, 0
+
+        clusters = {}
+        for row in self._rows(user_id, "policy_stats", fields):
+            meta = row.get('metadata') or {}
+            clusters.setdefault((meta.get('expert'), meta.get('strategy')), []).append({**row, "vector": _unit(row['vector'])})
+        changed = {}
+        for row in feedback:
+            meta = row.get('metadata') or {}
+            vector, score = _unit(row['vector']), float(meta.get('score', 0.0))
+            candidates = clusters.setdefault((meta.get('expert'), meta.get('strategy')), [])
+            similarities = [float(cluster['vector'] @ vector) for cluster in candidates]
+            best = int(np.argmax(similarities)) if similarities else -1
+            if best >= 0 and similarities[best] >= self.cluster_similarity:
+                cluster = candidates[best]
+                stats = cluster['metadata']
+                cluster['vector'] = _unit(cluster['vector'] * stats['count'] + vector)
+                stats['count'] += 1
+                stats['score_sum'] += score
+            else:
+                # A new cluster is named after the first sub-task that started it.
+                cluster = {
+                    "id": str(uuid.uuid4()), "session_id": "global", "content": row['content'], "vector": vector,
+                    "metadata": {"expert": meta.get('expert'), "strategy": meta.get('strategy'), "count": 1, "score_sum": score, "first_at": _created_at(row)},
+                }
+                candidates.append(cluster)
+            stats = cluster['metadata']
+            stats['score'] = stats['score_sum'] / stats['count']
+            stats['last_at'] = max(stats.get('last_at', 0.0), _created_at(row))
+            stats['created_at'] = now
+            changed[cluster['id']] = cluster
+
+        # Stats are written before the feedback is deleted: an interruption can double-count, never lose, feedback.
+        self.client.upsert(collection_name=MEMORY_COLLECTION, data=[{
+            "id": cluster['id'], "user_id": user_id, "session_id": cluster['session_id'], "memory_type": "policy_stats",
+            "content": cluster['content'], "vector": cluster['vector'].tolist(), "metadata": cluster['metadata'],
+        } for cluster in changed.values()])
+        return self._delete([row['id'] for row in feedback]), len(changed)
+
+    def expire_interactions(self, user_id: str, now: float) -> int:
+        cutoff = now - self.interaction_ttl_seconds
+        # Rows without a timestamp are left to the row cap rather than expired on sight.
+        return self._delete([
+            row['id'] for row in self._rows(user_id, "interaction_summary", ["id", "metadata"])
+            if 0.0 < _created_at(row) <= cutoff
+        ])
+
+    def deduplicate_preferences(self, user_id: str) -> int:
+        seen, duplicates = set(), []
+        for row in sorted(self._rows(user_id, "preference", ["id", "content", "metadata"]), key=_created_at, reverse=True):
+            key = " ".join(row['content'].lower().split())
+            if key in seen:
+                duplicates.append(row['id'])
+            seen.add(key)
+        return self._delete(duplicates)
+
+    def enforce_caps(self, user_id: str) -> int:
+        removed = 0
+        for memory_type, cap in self.max_rows.items():
+            rows = sorted(self._rows(user_id, memory_type, ["id", "metadata"]), key=_created_at)
+            removed += self._delete([row['id'] for row in rows[:max(0, len(rows) - cap)]])
+        return removed
+
+    def run_user(self, user_id: str, now: float = None) -> dict:
+        """Runs every maintenance step for one user and returns what each one changed."""
+        now = time.time() if now is None else now
+        try:
+            folded, stats_written = self.aggregate_policy(user_id, now)
+            report = {
+                "feedback_aggregated": folded, "stats_written": stats_written,
+                "interactions_expired": self.expire_interactions(user_id, now),
+                "preferences_deduplicated": self.deduplicate_preferences(user_id),
+                "capped": self.enforce_caps(user_id),
+            }
+        finally:
+            if self.cache is not None:
+                self.cache.invalidate(user_id)
+        return report
+
+    def run(self, users: list[str] = None) -> dict:
+        """Maintains the given users (by default all of them) and returns the summed report."""
+        totals = {}
+        for user_id in users or self.list_users():
+            for step, count in self.run_user(user_id).items():
+                totals[step] = totals.get(step, 0) + count
+        return totals
+
+if __name__ == "__main__":
+    from src.utils.config_loader import ConfigLoader
+    from src.services.component_registry import ComponentRegistry
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Aggregate, expire and cap HyDRA's memory store.")
+    parser.add_argument("--profile", type=str, required=True, help="Deployment profile whose memory.maintenance settings apply.")
+    parser.add_argument("--user", type=str, action="append", default=None, help="Only maintain this user (repeatable). Defaults to every user.")
+    args = parser.parse_args()
+    ConfigLoader.load(args.profile)
+    maintenance = MemoryMaintenance(ComponentRegistry.get_milvus_client(), ConfigLoader.load()['memory']['maintenance'])
+    totals = maintenance.run(args.user)
+    print("Memory maintenance complete: " + (", ".join(f"{step}={count}" for step, count in totals.items()) or "no users found") + ".")
@@ -4,48 +4,73 @@ import argparse
 from dotenv import load_dotenv
 from pymilvus import MilvusClient, DataType
 from src.utils.config_loader import ConfigLoader
+from src.services.ingestion_manifest import IngestionManifest
+from src.retrieval.cache import bump_collection_generation
+from src.retrieval.chunk_store import chunk_store_enabled, delete_chunk_store
 
 MEMORY_COLLECTION = "hydra_memory_store"
 
-def setup_milvus(profile: str='production_balanced'):
-    ConfigLoader.load(profile)
-    config = ConfigLoader.load()
-    milvus_config = config['milvus']
-    knowledge_collection_name = milvus_config['collection_name']
-
-    print("Connecting to Milvus...")
-    client = MilvusClient(uri='http://localhost:19530')
-    
-    if client.has_collection(knowledge_collection_name):
-        client.drop_collection(knowledge_collection_name)
-    
-    print(f"Creating knowledge collection: {knowledge_collection_name}")
-    knowledge_schema = MilvusClient.create_schema(auto_id=True, enable_dynamic_field=True)
-    knowledge_schema.add_field("id", DataType.INT64, is_primary=True)
-    knowledge_schema.add_field("source", DataType.VARCHAR, max_length=1024)
-    knowledge_schema.add_field("chunk_text", DataType.VARCHAR, max_length=8192)
-    knowledge_schema.add_field("dense_vector", DataType.FLOAT_VECTOR, dim=1024)
-    knowledge_schema.add_field("sparse_vector", DataType.SPARSE_FLOAT_VECTOR)
-
-    dense_index_config = milvus_config['dense_index']
-    index_params= client.prepare_index_params()
-    
+def dense_index_params(client: MilvusClient, dense_index_config: dict, field_name: str = "dense_vector"):
+    """Index parameters for the dense vector field, as described by a profile's milvus.dense_index block."""
+    index_params = client.prepare_index_params()
     index_params.add_index(
-        field_name="dense_vector",
+        field_name=field_name,
         index_type=dense_index_config['index_type'],
         metric_type=dense_index_config['metric_type'],
         params=dense_index_config['build_params']
     )
+    return index_params
+
+def alias_target(client: MilvusClient, alias: str) -> str | None:
+    """The collection an alias points to, or None when no such alias exists."""
+    try:
+        return client.describe_alias(alias=alias).get('collection_name')
+    except Exception:
+        return None
 
+def create_knowledge_collection(client: MilvusClient, collection_name: str, milvus_config: dict):
+    knowledge_schema = MilvusClient.create_schema(auto_id=True, enable_dynamic_field=True)
+    knowledge_schema.add_field("id", DataType.INT64, is_primary=True)
+    if not chunk_store_enabled(milvus_config):
+        knowledge_schema.add_field("source", DataType.VARCHAR, max_length=1024)
+        knowledge_schema.add_field("chunk_text", DataType.VARCHAR, max_length=8192)
+    # Otherwise text and source live in the local chunk store (src/retrieval/chunk_store.py).
+    knowledge_schema.add_field("dense_vector", DataType.FLOAT_VECTOR, dim=1024)
+    knowledge_schema.add_field("sparse_vector", DataType.SPARSE_FLOAT_VECTOR)
 
+    index_params = dense_index_params(client, milvus_config['dense_index'])
     index_params.add_index(field_name="sparse_vector", index_type="SPARSE_INVERTED_INDEX", metric_type="IP")
     
     client.create_collection(
-        collection_name=knowledge_collection_name,
+        collection_name=collection_name,
         schema=knowledge_schema,
         index_params=index_params
     )
-    print("Knowledge collection created successfully.")
+
+def setup_milvus(profile: str='production_balanced'):
+    ConfigLoader.load(profile)
+    config = ConfigLoader.load()
+    milvus_config = config['milvus']
+    knowledge_collection_name = milvus_config['collection_name']
+
+    print("Connecting to Milvus...")
+    client = MilvusClient(uri='http://localhost:19530')
+    
+    current_version = alias_target(client, knowledge_collection_name)
+    if current_version:
+        # Dropping a live alias target would take retrieval down; versioned collections are rebuilt side by side.
+        print(f"'{knowledge_collection_name}' is an alias of '{current_version}'. Use --rebuild for a zero-downtime rebuild.")
+    else:
+        if client.has_collection(knowledge_collection_name):
+            client.drop_collection(knowledge_collection_name)
+        # A fresh collection invalidates everything the ingestion manifest recorded.
+        IngestionManifest.delete(knowledge_collection_name)
+        delete_chunk_store(knowledge_collection_name)
+        bump_collection_generation(knowledge_collection_name)
+    
+        print(f"Creating knowledge collection: {knowledge_collection_name}")
+        create_knowledge_collection(client, knowledge_collection_name, milvus_config)
+        print("Knowledge collection created successfully.")
 
     if not client.has_collection(MEMORY_COLLECTION):
         print(f"Creating memory collection: {MEMORY_COLLECTION}")
@@ -78,5 +103,22 @@ if __name__ == "__main__":
     load_dotenv()
     parser = argparse.ArgumentParser(description="Initialize Milvus for HyDRA.")
     parser.add_argument("--profile", type=str, required=True, help="Deployment profile to use for setup.")
+    parser.add_argument("--rebuild", type=str, metavar="DATA_PATH", default=None, help="Zero-downtime rebuild: ingest DATA_PATH into a new versioned collection and switch the alias to it.")
+    parser.add_argument("--keep", type=int, default=None, help="Previous versions kept for rollback (defaults to the profile's milvus.rebuild.keep_versions).")
+    parser.add_argument("--rollback", type=str, nargs="?", const="", default=None, metavar="VERSION", help="Point the alias back at VERSION, or at the previous version.")
+    parser.add_argument("--list-versions", action="store_true", help="List the versioned collections behind the profile's alias.")
     args = parser.parse_args()
-    setup_milvus(args.profile)
+    if args.rebuild or args.rollback is not None or args.list_versions:
+        from src.services.collection_versions import connect, list_versions, rebuild_collection, rollback_collection
+        if args.rebuild:
+            rebuild_collection(args.rebuild, args.profile, keep_previous=args.keep)
+        elif args.rollback is not None:
+            rollback_collection(args.profile, args.rollback or None)
+        else:
+            alias = ConfigLoader.load(args.profile)['milvus']['collection_name']
+            client = connect()
+            live = alias_target(client, alias)
+            for name in list_versions(client, alias):
+                print(f"{'*' if name == live else ' '} {name}")
+    else:
+        setup_milvus(args.profile)
@@ -0,0 +1,46 @@
+# src/services/rate_limiter.py
+import time
+import threading
+
+class RateLimiter:
+    """Thread-safe token bucket: acquire() blocks until a call is allowed under `qps`."""
+    def __init__(self, qps: float, burst: int = None):
+        self.qps = qps
+        self.capacity = burst or max(1, int(qps))
+        self.tokens = float(self.capacity)
+        self.waited_seconds = 0.0
+        self.calls = 0
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.qps)
+            self._updated = now
+            self.tokens -= 1
+            self.calls += 1
+            # A negative balance is this caller's place in line; it sleeps outside the lock until its token accrues.
+            wait = -self.tokens / self.qps if self.tokens < 0 else 0.0
+            self.waited_seconds += wait
+        if wait:
+            time.sleep(wait)
+
+class RateLimitedLLM:
+    """Wraps a chat model so every underlying call (each prompt of a batch included) takes a token first."""
+    def __init__(self, llm, limiter: RateLimiter):
+        self.llm = llm
+        self.limiter = limiter
+
+    def invoke(self, prompt, *args, **kwargs):
+        self.limiter.acquire()
+        return self.llm.invoke(prompt, *args, **kwargs)
+
+    def batch(self, prompts: list, *args, **kwargs) -> list:
+        for _ in prompts:
+            self.limiter.acquire()
+        return self.llm.batch(prompts, *args, **kwargs)
+
+    def stream(self, prompt, *args, **kwargs):
+        self.limiter.acquire()
+        return self.llm.stream(prompt, *args, **kwargs)
@@ -0,0 +1,184 @@
+# src/services/tracing.py
+import os
+import json
+import time
+import uuid
+import random
+import threading
+import contextvars
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from src.utils.config_loader import get_config
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, float("inf"))
+
+_current_span = contextvars.ContextVar("hydra_current_span", default=None)
+
+def usage_attributes(message) -> dict:
+    """Token counts reported by the LLM on a response or stream chunk, if any."""
+    usage = getattr(message, "usage_metadata", None) or {}
+    return {k: usage[k] for k in ("input_tokens", "output_tokens") if usage.get(k) is not None}
+
+def histogram_percentile(histogram: dict, pct: float) -> float:
+    """Estimates a percentile as the upper bound of the bucket it falls in."""
+    target = histogram["count"] * pct / 100
+    cumulative = 0
+    for bound, count in zip(LATENCY_BUCKETS, histogram["buckets"]):
+        cumulative += count
+        if count and cumulative >= target:
+            return bound
+    return 0.0
+
+class Tracer:
+    """
+    Process-wide tracing for the reasoning pipeline. Tracer.span() times a stage,
+    nests it under the span active in the current context, and records its duration
+    in a per-(stage, profile) latency histogram. Sampled traces are also appended to
+    the profile's JSONL trace file, which is rotated once it reaches `trace_max_bytes`
+    (keeping `trace_backups` older files as <path>.1, <path>.2, ...).
+
+    Work handed to another thread must be wrapped with Tracer.propagate() so its
+    spans keep their parent.
+    """
+    _histograms = {}
+    _errors = {}
+    _trace_files = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    @contextmanager
+    def span(cls, name: str, **attributes):
+        """Times the enclosed block. Yields the span's attribute dict, which may be filled in."""
+        parent = _current_span.get()
+        observability = get_config().get('observability', {})
+        current = {
+            "trace_id": parent["trace_id"] if parent else uuid.uuid4().hex,
+            "span_id": uuid.uuid4().hex[:16],
+            "parent_id": parent["span_id"] if parent else None,
+            "sampled": parent["sampled"] if parent else random.random() < observability.get('trace_sample_rate', 1.0),
+            "attributes": dict(attributes),
+        }
+        token = _current_span.set(current)
+        start_time, start = time.time(), time.perf_counter()
+        error = None
+        try:
+            yield current["attributes"]
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            duration = time.perf_counter() - start
+            _current_span.reset(token)
+            cls._observe(name, get_config()['profile_name'], duration, error is not None)
+            if current["sampled"] and observability.get('trace_path'):
+                cls._write(observability['trace_path'], {
+                    "trace_id": current["trace_id"], "span_id": current["span_id"], "parent_id": current["parent_id"],
+                    "name": name, "start": start_time, "duration_ms": round(duration * 1000, 3),
+                    "attributes": current["attributes"], "error": error,
+                }, observability.get('trace_max_bytes', 64 * 1024 * 1024), observability.get('trace_backups', 3))
+
+    @staticmethod
+    def annotate(**attributes):
+        """Adds attributes to the innermost active span, if any."""
+        current = _current_span.get()
+        if current is not None:
+            current["attributes"].update(attributes)
+
+    @staticmethod
+    def propagate(fn):
+        """Binds fn to a copy of the caller's context, so spans it opens on another thread keep their parent."""
+        context = contextvars.copy_context()
+        return lambda *args, **kwargs: context.run(fn, *args, **kwargs)
+
+    @classmethod
+    def _observe(cls, name: str, profile: str, duration: float, failed: bool):
+        with cls._lock:
+            histogram = cls._histograms.setdefault((name, profile), {"buckets": [0] * len(LATENCY_BUCKETS), "count": 0, "sum": 0.0})
+            histogram["buckets"][next(i for i, bound in enumerate(LATENCY_BUCKETS) if duration <= bound)] += 1
+            histogram["count"] += 1
+            histogram["sum"] += duration
+            if failed:
+                cls._errors[(name, profile)] = cls._errors.get((name, profile), 0) + 1
+
+    @classmethod
+    def _write(cls, path: str, record: dict, max_bytes: int = None, backups: int = 3):
+        line = json.dumps(record, default=str) + "\n"
+        with cls._lock:
+            if path not in cls._trace_files:
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+                cls._trace_files[path] = open(path, "a", buffering=1)
+            trace_file = cls._trace_files[path]
+            if max_bytes and trace_file.tell() and trace_file.tell() + len(line) > max_bytes:
+                trace_file.close()
+                for i in range(backups - 1, 0, -1):
+                    if os.path.exists(f"{path}.{i}"):
+                        os.replace(f"{path}.{i}", f"{path}.{i + 1}")
+                if backups > 0:
+                    os.replace(path, f"{path}.1")
+                # Without backups the file simply starts over.
+                trace_file = cls._trace_files[path] = open(path, "a" if backups > 0 else "w", buffering=1)
+            trace_file.write(line)
+
+    @classmethod
+    def snapshot(cls) -> dict:
+        """Copies the histograms, keyed by (stage, profile)."""
+        with cls._lock:
+            return {key: {"buckets": list(h["buckets"]), "count": h["count"], "sum": h["sum"]} for key, h in cls._histograms.items()}
+
+    @staticmethod
+    def difference(current: dict, baseline: dict) -> dict:
+        """Histograms of what was recorded between two snapshots."""
+        result = {}
+        for key, histogram in current.items():
+            before = baseline.get(key, {"buckets": [0] * len(LATENCY_BUCKETS), "count": 0, "sum": 0.0})
+            if histogram["count"] > before["count"]:
+                result[key] = {
+                    "buckets": [now - then for now, then in zip(histogram["buckets"], before["buckets"])],
+                    "count": histogram["count"] - before["count"], "sum": histogram["sum"] - before["sum"],
+                }
+        return result
+
+    @classmethod
+    def prometheus_text(cls) -> str:
+        """Renders the stage histograms in the Prometheus text exposition format."""
+        lines = [
+            "# HELP hydra_stage_duration_seconds Latency of HyDRA pipeline stages.",
+            "# TYPE hydra_stage_duration_seconds histogram",
+        ]
+        for (name, profile), histogram in sorted(cls.snapshot().items()):
+            labels = f'stage="{name}",profile="{profile}"'
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS, histogram["buckets"]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'hydra_stage_duration_seconds_bucket{{{labels},le="{le}"}} {cumulative}')
+            lines.append(f"hydra_stage_duration_seconds_sum{{{labels}}} {histogram['sum']:.6f}")
+            lines.append(f"hydra_stage_duration_seconds_count{{{labels}}} {histogram['count']}")
+        lines += ["# HELP hydra_stage_errors_total Pipeline stages that raised.", "# TYPE hydra_stage_errors_total counter"]
+        with cls._lock:
+            errors = dict(cls._errors)
+        for (name, profile), count in sorted(errors.items()):
+            lines.append(f'hydra_stage_errors_total{{stage="{name}",profile="{profile}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+    @classmethod
+    def serve_metrics(cls, port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+        """Exposes GET /metrics on a background thread, for the TUI and batch modes."""
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = cls.prometheus_text().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=server.serve_forever, name="hydra-metrics", daemon=True).start()
+        return server
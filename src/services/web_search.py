@@ -0,0 +1,195 @@
+# src/services/web_search.py
+import re
+import asyncio
+import threading
+from html.parser import HTMLParser
+import httpx
+from src.retrieval.cache import LRUCache, normalize_query
+from src.services.tracing import Tracer
+
+STOPWORDS = {
+    "a", "an", "the", "of", "in", "on", "for", "to", "and", "or", "is", "are", "was", "were", "be", "by", "with",
+    "about", "what", "which", "who", "how", "does", "do", "did", "say", "says", "latest", "recent", "news",
+}
+INSTRUCTION_PREFIX = re.compile(r"^\s*(?:please\s+)?(?:search|look\s+up|find|research)(?:\s+(?:the\s+web|online|the\s+internet))?(?:\s+for)?\s*[:\-]?\s*", re.IGNORECASE)
+SKIPPED_TAGS = {"script", "style", "noscript", "head", "nav", "footer", "svg"}
+
+def query_variants(query: str, count: int) -> list[str]:
+    """The query as given, as bare keywords, and without its instruction prefix; up to `count`, without repeats."""
+    stripped = INSTRUCTION_PREFIX.sub("", query).strip()
+    keywords = " ".join(word for word in re.findall(r"[\w'-]+", stripped) if word.lower() not in STOPWORDS)
+    variants, seen = [], set()
+    for variant in (query.strip(), keywords, stripped):
+        if variant and normalize_query(variant) not in seen:
+            seen.add(normalize_query(variant))
+            variants.append(variant)
+    return variants[:max(1, count)]
+
+class _TextExtractor(HTMLParser):
+    def __init__(self):
+        super().__init__()
+        self.parts = []
+        self._skipping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIPPED_TAGS:
+            self._skipping += 1
+
+    def handle_endtag(self, tag):
+        if tag in SKIPPED_TAGS and self._skipping:
+            self._skipping -= 1
+
+    def handle_data(self, data):
+        if not self._skipping and data.strip():
+            self.parts.append(data.strip())
+
+def extract_text(page_html: str, max_chars: int) -> str:
+    """Readable text of an HTML page, without scripts, styles and navigation."""
+    extractor = _TextExtractor()
+    try:
+        extractor.feed(page_html)
+    except Exception:
+        pass  # Malformed markup: keep whatever was parsed.
+    return " ".join(" ".join(extractor.parts).split())[:max_chars]
+
+class DuckDuckGoBackend:
+    name = "duckduckgo"
+
+    async def search(self, http: httpx.AsyncClient, query: str, max_results: int) -> list[dict]:
+        # DDGS is synchronous, so each call runs on its own thread with its own session.
+        from duckduckgo_search import DDGS
+        return await asyncio.to_thread(lambda: DDGS().text(query, max_results=max_results) or [])
+
+class HTTPSearchBackend:
+    """
+    Any JSON search endpoint answering GET <url>?q=...&max_results=N with a list of
+    {"title", "body", "href"} objects, or SearXNG-style {"results": [{"title", "content", "url"}]}.
+    Also used by the offline benchmark's local stub server.
+    """
+    name = "http"
+
+    def __init__(self, url: str):
+        self.url = url
+
+    async def search(self, http: httpx.AsyncClient, query: str, max_results: int) -> list[dict]:
+        response = await http.get(self.url, params={"q": query, "max_results": max_results, "format": "json"})
+        response.raise_for_status()
+        payload = response.json()
+        rows = payload.get("results", []) if isinstance(payload, dict) else payload
+        return [
+            {"title": row.get("title"), "body": row.get("body") or row.get("content"), "href": row.get("href") or row.get("url")}
+            for row in rows[:max_results]
+        ]
+
+def create_search_backend(web_config: dict):
+    backend = web_config.get('backend', 'duckduckgo')
+    if backend == 'duckduckgo':
+        return DuckDuckGoBackend()
+    if backend == 'http':
+        if not web_config.get('url'):
+            raise ValueError("The 'http' web search backend needs web_search.url.")
+        return HTTPSearchBackend(web_config['url'])
+    raise ValueError(f"Unknown web search backend '{backend}'. Expected 'duckduckgo' or 'http'.")
+
+class WebSearcher:
+    """
+    Web search shared by every DeepSearchAgent. Query variants are searched concurrently,
+    each within its own deadline and retry budget, and their results are merged by rank.
+    The top pages can then be fetched and reduced to text in parallel. All I/O runs on one
+    background event loop with a pooled HTTP client, and merged results are kept in a TTL
+    cache keyed by the normalized query.
+    """
+    def __init__(self, web_config: dict, backend=None):
+        self.backend = backend or create_search_backend(web_config)
+        self.max_results = web_config.get('max_results', 5)
+        self.variants = web_config.get('variants', 2)
+        self.timeout = web_config.get('timeout_seconds', 8)
+        self.retries = web_config.get('retries', 1)
+        self.fetch_pages = web_config.get('fetch_pages', 0)
+        self.fetch_timeout = web_config.get('fetch_timeout_seconds', 5)
+        self.max_page_chars = web_config.get('max_page_chars', 4000)
+        self.max_connections = web_config.get('max_connections', 20)
+        cache_config = web_config.get('cache', {})
+        self.cache = LRUCache(
+            "web_search", max_entries=cache_config.get('max_entries', 512),
+            max_bytes=int(cache_config.get('max_mb', 32) * 1024 * 1024), ttl_seconds=cache_config.get('ttl_seconds', 1800)
+        ) if cache_config.get('enabled', True) else None
+        self.stats = {"searches": 0, "backend_calls": 0, "timeouts": 0, "errors": 0, "pages_fetched": 0, "page_failures": 0}
+        # Built up front: creating the client (and its TLS context) takes a noticeable fraction of a second.
+        self._http = httpx.AsyncClient(
+            timeout=max(self.timeout, self.fetch_timeout), follow_redirects=True,
+            limits=httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections),
+            headers={"User-Agent": "Mozilla/5.0 (compatible; HyDRA DeepSearchAgent)"},
+        )
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="hydra-web-search", daemon=True)
+        self._thread.start()
+
+    def search(self, query: str) -> list[dict]:
+        """Blocking entry point for executor threads. Raises if every variant failed."""
+        key = (normalize_query(query), self.backend.name, self.max_results, self.variants, self.fetch_pages)
+        cached = self.cache.get(key) if self.cache is not None else None
+        Tracer.annotate(cached=cached is not None)
+        if cached is not None:
+            return [dict(result) for result in cached]
+        results, variants = asyncio.run_coroutine_threadsafe(self._search(query), self._loop).result()
+        Tracer.annotate(variants=variants, pages=sum(1 for result in results if result.get("content")))
+        if results and self.cache is not None:
+            self.cache.put(key, results)
+        return results
+
+    async def _call(self, variant: str) -> list[dict]:
+        error = None
+        for attempt in range(self.retries + 1):
+            self.stats["backend_calls"] += 1
+            try:
+                return await asyncio.wait_for(self.backend.search(self._http, variant, self.max_results), self.timeout)
+            except asyncio.TimeoutError:
+                self.stats["timeouts"] += 1
+                error = TimeoutError(f"web search timed out after {self.timeout}s")
+            except Exception as e:
+                self.stats["errors"] += 1
+                error = e
+            if attempt < self.retries:
+                await asyncio.sleep(0.25 * 2 ** attempt)
+        raise error
+
+    async def _fetch(self, result: dict):
+        try:
+            response = await asyncio.wait_for(self._http.get(result["href"]), self.fetch_timeout)
+            response.raise_for_status()
+            if "html" in response.headers.get("content-type", "html"):
+                result["content"] = extract_text(response.text, self.max_page_chars)
+            else:
+                result["content"] = response.text[:self.max_page_chars]
+            self.stats["pages_fetched"] += 1
+        except Exception:
+            self.stats["page_failures"] += 1  # The snippet is still there.
+
+    async def _search(self, query: str) -> tuple[list[dict], int]:
+        self.stats["searches"] += 1
+        variants = query_variants(query, self.variants)
+        outcomes = await asyncio.gather(*(self._call(variant) for variant in variants), return_exceptions=True)
+        ranked_lists = [outcome for outcome in outcomes if not isinstance(outcome, BaseException)]
+        if not ranked_lists:
+            raise outcomes[0]
+
+        # Interleave by rank so every variant contributes its best hits first.
+        merged, seen = [], set()
+        for rank in range(max(len(results) for results in ranked_lists)):
+            for results in ranked_lists:
+                if rank < len(results):
+                    key = results[rank].get("href") or results[rank].get("title")
+                    if key not in seen:
+                        seen.add(key)
+                        merged.append(dict(results[rank]))
+        merged = merged[:self.max_results]
+
+        to_fetch = [result for result in merged[:self.fetch_pages] if str(result.get("href", "")).startswith(("http://", "https://"))]
+        if to_fetch:
+            await asyncio.gather(*(self._fetch(result) for result in to_fetch))
+        return merged, len(variants)
+
+    def close(self):
+        asyncio.run_coroutine_threadsafe(self._http.aclose(), self._loop).result(timeout=5)
+        self._loop.call_soon_threadsafe(self._loop.stop)
@@ -1,22 +1,134 @@
 # src/tui/handler.py
 import os
+import time
 import uuid
 from rich.console import Console
 from rich.markdown import Markdown
 from rich.panel import Panel
+from rich.table import Table
+from rich.live import Live
 from src.core.reasoning_loop import ReasoningLoop
 from src.utils.config_loader import ConfigLoader
 from src.agents.memory_agent import HydraMemoryAgent
+from src.services.component_registry import ComponentRegistry
+from src.services.tracing import Tracer, LATENCY_BUCKETS, histogram_percentile
+
+STAGE_ORDER = [
+    "query", "semantic_cache", "planning", "subtask", "routing", "executor", "strategy_selection", "hyde",
+    "retrieval", "embedding", "hybrid_search", "reranking", "web_search", "context_assembly", "synthesis", "learning", "analyzer",
+]
+SPARK_BLOCKS = " ▁▂▃▄▅▆▇█"
 
 class TUIHandler:
     def __init__(self, user_id: str, profile: str):
         self.user_id = user_id
         self.session_id = str(uuid.uuid4())
         self.console = Console()
-        self.memory_agent = HydraMemoryAgent()
         ConfigLoader.load(profile)
+        self.warm_up_components()
+        self.memory_agent = HydraMemoryAgent()
+        self.hydra_loop = None
+        self.stats_baseline = Tracer.snapshot()
         self.print_welcome_message()
 
+    def warm_up_components(self):
+        with self.console.status("[bold yellow]Loading models and connections...[/bold yellow]", spinner="dots"):
+            ComponentRegistry.warm_up()
+        self.print_component_stats()
+
+    def print_component_stats(self):
+        table = Table(title="Component Load Times", show_header=True, header_style="bold cyan")
+        table.add_column("Component")
+        table.add_column("Load Time (s)", justify="right")
+        for label, seconds in ComponentRegistry.load_stats():
+            table.add_row(label, f"{seconds:.2f}")
+        self.console.print(table)
+
+    def print_cache_stats(self):
+        table = Table(title="Retrieval Cache", show_header=True, header_style="bold cyan")
+        for column in ["Cache", "Entries", "Size (MB)", "Hits", "Misses", "Hit Rate", "Evictions"]:
+            table.add_column(column, justify="left" if column == "Cache" else "right")
+        for stats in ComponentRegistry.get_retrieval_cache().stats():
+            table.add_row(
+                stats['name'], str(stats['entries']), f"{stats['bytes'] / 1024 / 1024:.1f}", str(stats['hits']),
+                str(stats['misses']), f"{stats['hit_rate']:.0%}", str(stats['evictions'])
+            )
+        self.console.print(table)
+
+        rerank = ComponentRegistry.get_retriever().rerank_policy.stats()
+        if rerank['mode'] == 'adaptive':
+            paths = ", ".join(f"{path}: {counters['queries']}" for path, counters in rerank['paths'].items() if path != "full")
+            self.console.print(
+                f"Adaptive reranking: {paths} | [cyan]{rerank['pairs_skipped']}[/cyan] pairs skipped, "
+                f"~[cyan]{rerank['saved_ms'] / 1000:.1f} s[/cyan] saved"
+            )
+
+        batching = ComponentRegistry.get_retriever().batcher.stats()
+        if batching['batches']:
+            self.console.print(
+                f"Query batching: [cyan]{batching['items']}[/cyan] queries in [cyan]{batching['batches']}[/cyan] batches "
+                f"(mean size {batching['mean_batch_size']:.1f})"
+            )
+
+        if ConfigLoader.load().get('llm_cache', {}).get('enabled', False):
+            llm_table = Table(title="LLM Response Cache", show_header=True, header_style="bold cyan")
+            for column in ["Agent", "Hits", "Misses", "Hit Rate", "Time Saved (s)"]:
+                llm_table.add_column(column, justify="left" if column == "Agent" else "right")
+            for agent, stats in ComponentRegistry.get_llm_cache().stats().items():
+                llm_table.add_row(agent, str(stats['hits']), str(stats['misses']), f"{stats['hit_rate']:.0%}", f"{stats['time_saved']:.1f}")
+            self.console.print(llm_table)
+
+        if self.hydra_loop is not None and self.hydra_loop.semantic_cache is not None:
+            stats = self.hydra_loop.semantic_cache.stats()
+            self.console.print(
+                f"Semantic answer cache (this session): [cyan]{stats['hits']}[/cyan] hits, "
+                f"[cyan]{stats['misses']}[/cyan] misses ({stats['hit_rate']:.0%})"
+            )
+
+    def print_router_stats(self):
+        router = ComponentRegistry.get_policy_router()
+        if router is None:
+            self.console.print("Learned routing is disabled for this profile (routing.mode: llm).")
+            return
+        stats = router.stats()
+        agreement = f"{stats['agreement_rate']:.0%} of {stats['compared']}" if stats['agreement_rate'] is not None else "n/a"
+        self.console.print(Panel(
+            f"Routed locally: [cyan]{stats['routed']}[/cyan] ({stats['routed_rate']:.0%}) | LLM fallbacks: [cyan]{stats['fallbacks']}[/cyan]\n"
+            f"Avg. routing latency: [cyan]{stats['avg_latency_ms']:.1f} ms[/cyan] | Agreement with LLM: [cyan]{agreement}[/cyan]",
+            title="Learned Router", border_style="cyan", expand=False
+        ))
+
+    def print_stage_stats(self):
+        histograms = {}
+        for (stage, _profile), histogram in Tracer.difference(Tracer.snapshot(), self.stats_baseline).items():
+            merged = histograms.setdefault(stage, {"buckets": [0] * len(LATENCY_BUCKETS), "count": 0, "sum": 0.0})
+            merged["buckets"] = [a + b for a, b in zip(merged["buckets"], histogram["buckets"])]
+            merged["count"] += histogram["count"]
+            merged["sum"] += histogram["sum"]
+        if not histograms:
+            self.console.print("No pipeline stages have run in this session yet.")
+            return
+
+        table = Table(title="Stage Latency (this session)", show_header=True, header_style="bold cyan")
+        for column in ["Stage", "Count", "Mean (s)", "p50 (s)", "p95 (s)", "Histogram"]:
+            table.add_column(column, justify="right" if column in ["Count", "Mean (s)", "p50 (s)", "p95 (s)"] else "left")
+        for stage in sorted(histograms, key=lambda s: STAGE_ORDER.index(s) if s in STAGE_ORDER else len(STAGE_ORDER)):
+            histogram = histograms[stage]
+            peak = max(histogram["buckets"])
+            spark = "".join(SPARK_BLOCKS[round(count / peak * (len(SPARK_BLOCKS) - 1))] for count in histogram["buckets"])
+            table.add_row(
+                stage, str(histogram["count"]), f"{histogram['sum'] / histogram['count']:.2f}",
+                f"≤{histogram_percentile(histogram, 50):g}", f"≤{histogram_percentile(histogram, 95):g}", f"[cyan]{spark}[/cyan]"
+            )
+        self.console.print(table)
+        self.console.print(f"[dim]Histogram buckets (s): {', '.join(f'{b:g}' for b in LATENCY_BUCKETS)}[/dim]")
+
+    def get_reasoning_loop(self) -> ReasoningLoop:
+        # The loop only borrows warm components, but it is still reused until the session or profile changes.
+        if self.hydra_loop is None:
+            self.hydra_loop = ReasoningLoop(os.getenv("GEMINI_API_KEY"), self.user_id, self.session_id)
+        return self.hydra_loop
+
     def print_welcome_message(self):
         profile_name = ConfigLoader.load().get('profile_name', 'N/A')
         welcome_panel = Panel(
@@ -34,6 +146,10 @@ class TUIHandler:
   [cyan]/profile [name][/cyan]   - View or switch the deployment profile.
   [cyan]/pref [preference][/cyan]  - Set a user preference for personalization.
   [cyan]/new[/cyan]             - Start a new chat session (clears history).
+  [cyan]/components[/cyan]      - Show load times of the shared models and clients.
+  [cyan]/cache[/cyan]           - Show retrieval, LLM and semantic answer cache counters.
+  [cyan]/router[/cyan]          - Show learned routing latency and LLM agreement.
+  [cyan]/stats[/cyan]           - Show per-stage latency histograms for this session.
   [cyan]/quit[/cyan] or [cyan]/exit[/cyan] - Exit the HyDRA TUI.
         """
         self.console.print(Panel(help_text, title="Help", border_style="yellow"))
@@ -48,6 +164,8 @@ class TUIHandler:
             if arg:
                 try:
                     ConfigLoader.load(arg)
+                    self.warm_up_components()
+                    self.hydra_loop = None
                     self.console.print(Panel(f"Switched to profile: [bold cyan]{arg}[/bold cyan]", border_style="green"))
                 except ValueError as e:
                     self.console.print(Panel(f"[bold red]Error: {e}[/bold red]", border_style="red"))
@@ -61,12 +179,60 @@ class TUIHandler:
                 self.console.print(Panel("[bold red]Usage: /pref [your preference text][/bold red]", border_style="red"))
         elif cmd == "/new":
             self.session_id = str(uuid.uuid4())
+            self.hydra_loop = None
+            self.stats_baseline = Tracer.snapshot()
             self.console.print(Panel(f"New session started: [cyan]{self.session_id}[/cyan]", border_style="green"))
+        elif cmd == "/components": self.print_component_stats()
+        elif cmd == "/cache": self.print_cache_stats()
+        elif cmd == "/router": self.print_router_stats()
+        elif cmd == "/stats": self.print_stage_stats()
         else:
             self.console.print(Panel(f"[bold red]Unknown command: '{cmd}'.[/bold red]", border_style="red"))
         
         return True
 
+    def answer_panel(self, answer: str) -> Panel:
+        return Panel(
+            Markdown(answer), title="[bold green]HyDRA's Answer[/bold green]",
+            border_style="green", title_align="left"
+        )
+
+    def run_query(self, query: str):
+        """Runs a query, switching from the spinner to a live Markdown view once the answer starts streaming."""
+        start_time = time.perf_counter()
+        first_token_time = None
+        answer_chunks = []
+        live = None
+        status = self.console.status("[bold yellow]HyDRA is thinking...[/bold yellow]", spinner="dots")
+
+        def update_tui_callback(message: str, category: str):
+            status.update(f"[bold yellow]HyDRA is thinking... ([italic]{category}[/italic])[/bold yellow]")
+            self.console.print(f"[dim cyan] -> {message}[/dim cyan]")
+
+        def render_token(chunk: str):
+            nonlocal live, first_token_time
+            if live is None:
+                first_token_time = time.perf_counter()
+                status.stop()
+                live = Live(self.answer_panel(""), console=self.console, refresh_per_second=12, vertical_overflow="visible")
+                live.start()
+            answer_chunks.append(chunk)
+            live.update(self.answer_panel("".join(answer_chunks)))
+
+        status.start()
+        try:
+            final_answer = self.get_reasoning_loop().run(query, callback=update_tui_callback, on_token=render_token)
+        finally:
+            status.stop()
+            if live is not None:
+                live.stop()
+
+        if live is None:
+            self.console.print(self.answer_panel(final_answer))
+        total_time = time.perf_counter() - start_time
+        ttft = f"{first_token_time - start_time:.2f}s" if first_token_time else "n/a"
+        self.console.print(f"[dim]Time to first token: {ttft} | Total time: {total_time:.2f}s[/dim]")
+
     def start_chat(self):
         while True:
             try:
@@ -75,20 +241,16 @@ class TUIHandler:
                     if not self.handle_command(query): break
                     continue
 
-                with self.console.status("[bold yellow]HyDRA is thinking...[/bold yellow]", spinner="dots") as status:
-                    def update_tui_callback(message: str, category: str):
-                        status.update(f"[bold yellow]HyDRA is thinking... ([italic]{category}[/italic])[/bold yellow]")
-                        self.console.print(f"[dim cyan] -> {message}[/dim cyan]")
-
-                    gemini_api_key = os.getenv("GEMINI_API_KEY")
-                    hydra_loop = ReasoningLoop(gemini_api_key, self.user_id, self.session_id)
-                    final_answer = hydra_loop.run(query, callback=update_tui_callback)
-
-                self.console.print(Panel(
-                    Markdown(final_answer), title="[bold green]HyDRA's Answer[/bold green]",
-                    border_style="green", title_align="left"
-                ))
+                self.run_query(query)
 
             except (KeyboardInterrupt, EOFError): break
         
-        self.console.print("\n[bold yellow]Exiting HyDRA. Goodbye![/bold yellow]")
\ No newline at end of file
+        self.shutdown()
+        self.console.print("\n[bold yellow]Exiting HyDRA. Goodbye![/bold yellow]")
+
+    def shutdown(self):
+        """Flushes background learning so the session's memories are written before exit."""
+        with self.console.status("[bold yellow]Saving what HyDRA learned this session...[/bold yellow]", spinner="dots"):
+            flushed = ComponentRegistry.shutdown()
+        if not flushed:
+            self.console.print("[dim]Some learning tasks are still pending; they will be resumed on the next start.[/dim]")
\ No newline at end of file
@@ -1,6 +1,7 @@
 # src/utils/config_loader.py
 import yaml
 import os
+import functools
 
 class ConfigLoader:
     _config = None
@@ -28,4 +29,13 @@ def get_config():
     config = ConfigLoader.load()
     if config is None:
         raise RuntimeError("Configuration has not been loaded. Call ConfigLoader.load() first.")
-    return config
\ No newline at end of file
+    return config
+
+@functools.lru_cache(maxsize=None)
+def _load_agent_configs() -> dict:
+    with open("configs/agents.yaml", 'r') as f:
+        return yaml.safe_load(f)
+
+def get_agent_config(agent_name: str) -> dict:
+    """Returns the prompt section for an agent. agents.yaml is parsed once per process."""
+    return _load_agent_configs()[agent_name]